@@ -0,0 +1,162 @@
+# backend/advanced_embeddings.py
+import copy
+import threading
+import numpy as np
+from sentence_transformers import SentenceTransformer
+import torch
+from transformers import AutoTokenizer, AutoModel
+from query_context import QueryContext, embedding_key
+from finance_vocabulary import finance_vocabulary
+
+class FinancialEmbedder:
+    # Modèles spécialisés auxquels detect_domain peut router un texte (sinon: modèle général)
+    ROUTED_DOMAINS = ('finance', 'actuarial')
+    
+    def __init__(self):
+        # Modèle général pour fallback
+        self.general_model = SentenceTransformer('all-MiniLM-L6-v2')
+        
+        # Tentative de chargement de modèles spécialisés
+        self.specialized_models = self._load_specialized_models()
+        
+        # Lexique financier étendu pour l'adaptation
+        self.finance_terms = self._load_finance_vocabulary()
+        
+        # Tokenizers dédiés au comptage (découpage des documents), créés au premier usage
+        self._token_counters = None
+        self._token_lock = threading.Lock()
+    
+    def _load_specialized_models(self):
+        """Charge des modèles spécialisés si disponibles"""
+        models = {}
+        try:
+            # Modèle pour documents financiers
+            models['finance'] = SentenceTransformer('nickprock/finbert-tone')
+            print("✅ Modèle financier chargé")
+        except:
+            print("⚠️  Modèle financier non disponible")
+        
+        try:
+            # Modèle multilingue
+            models['multilingual'] = SentenceTransformer('sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2')
+            print("✅ Modèle multilingue chargé")
+        except:
+            print("⚠️  Modèle multilingue non disponible")
+            
+        return models
+    
+    def _load_finance_vocabulary(self):
+        """Vocabulaire spécialisé finance/actuariat"""
+        return finance_vocabulary()
+    
+    def get_embedding(self, text, model_type='auto'):
+        """Génère des embeddings adaptés au domaine (mis en cache dans le QueryContext le cas échéant)"""
+        if isinstance(text, QueryContext):
+            return text.cached(embedding_key(self, model_type), lambda: self._encode(text, model_type))
+        return self._encode(text, model_type)
+    
+    def _encode(self, text, model_type):
+        if model_type == 'auto':
+            model_type = self.detect_domain(text)
+        
+        text = str(text)
+        if model_type in self.specialized_models:
+            try:
+                embedding = self.specialized_models[model_type].encode(text)
+                # Amélioration avec pondération domaine
+                embedding = self.enhance_domain_relevance(embedding, text)
+                return embedding
+            except:
+                pass
+        
+        # Fallback au modèle général
+        return self.general_model.encode(text)
+    
+    def get_embeddings(self, texts, model_type='auto', batch_size=32):
+        """Génère les embeddings d'une liste de textes en lots (même routage que get_embedding)"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, self.general_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        
+        # Regroupement des textes par modèle pour un seul encode() par modèle
+        groups = {}
+        for position, text in enumerate(texts):
+            text_model = self.detect_domain(text) if model_type == 'auto' else model_type
+            if text_model not in self.specialized_models:
+                text_model = 'general'
+            groups.setdefault(text_model, []).append(position)
+        
+        embeddings = [None] * len(texts)
+        for text_model, positions in groups.items():
+            batch = [texts[position] for position in positions]
+            encoded = None
+            if text_model != 'general':
+                try:
+                    encoded = self.specialized_models[text_model].encode(batch, batch_size=batch_size)
+                    encoded = [self.enhance_domain_relevance(embedding, text) for embedding, text in zip(encoded, batch)]
+                except:
+                    encoded = None
+            if encoded is None:
+                encoded = self.general_model.encode(batch, batch_size=batch_size)
+            for position, embedding in zip(positions, encoded):
+                embeddings[position] = embedding
+        
+        return np.array(embeddings, dtype=np.float32)
+    
+    def routed_models(self):
+        """Modèles pouvant encoder un chunk: modèle général et modèles spécialisés atteints par le routage"""
+        return [self.general_model] + [
+            self.specialized_models[domain] for domain in self.ROUTED_DOMAINS if domain in self.specialized_models
+        ]
+    
+    @property
+    def max_tokens(self):
+        """Tokens de texte vus par chacun des modèles routés (au-delà, le texte est tronqué à l'encodage)"""
+        return min(
+            model.max_seq_length - model.tokenizer.num_special_tokens_to_add()
+            for model in self.routed_models()
+        )
+    
+    def count_tokens(self, texts, batch_size=256):
+        """Nombre de tokens de chaque texte (maximum sur les tokenizers des modèles routés), par lots"""
+        texts = list(texts)
+        counts = np.zeros(len(texts), dtype=np.int64)
+        with self._token_lock:
+            if self._token_counters is None:
+                # Copies: l'encodage, dans un autre thread, modifie les réglages du tokenizer de chaque modèle
+                self._token_counters = list({
+                    id(model.tokenizer): copy.deepcopy(model.tokenizer) for model in self.routed_models()
+                }.values())
+            for tokenizer in self._token_counters:
+                for start in range(0, len(texts), batch_size):
+                    input_ids = tokenizer(
+                        texts[start:start + batch_size], add_special_tokens=False, truncation=False,
+                        return_attention_mask=False, verbose=False
+                    )['input_ids']
+                    lengths = np.fromiter((len(ids) for ids in input_ids), dtype=np.int64, count=len(input_ids))
+                    np.maximum(counts[start:start + len(lengths)], lengths, out=counts[start:start + len(lengths)])
+        return counts
+    
+    def detect_domain(self, text):
+        """Détecte le domaine du texte"""
+        if isinstance(text, QueryContext):
+            return text.cached(('embedder_domain', id(self)), lambda: self._detect_domain(text.normalized))
+        return self._detect_domain(text.lower())
+    
+    def _detect_domain(self, text_lower):
+        finance_score = sum(1 for term in self.finance_terms['risk_terms'] + 
+                          self.finance_terms['regulation_terms'] if term in text_lower)
+        actuarial_score = sum(1 for term in self.finance_terms['actuarial_terms'] if term in text_lower)
+        
+        if actuarial_score > finance_score:
+            return 'actuarial'
+        elif finance_score > 2:
+            return 'finance'
+        else:
+            return 'general'
+    
+    def enhance_domain_relevance(self, embedding, text):
+        """Améliore la pertinence des embeddings pour le domaine"""
+        # Technique simple d'augmentation pour les termes clés
+        boost_factor = 1.1  # Augmentation légère
+        return embedding * boost_factor
\ No newline at end of file
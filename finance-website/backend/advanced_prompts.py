@@ -0,0 +1,107 @@
+# backend/advanced_prompts.py
+from query_context import QueryContext
+
+
+class AdvancedPromptEngine:
+    def __init__(self):
+        self.domain_experts = {
+            'risk_management': {
+                'persona': "Expert en Risk Management certifié FRM avec 15 ans d'expérience",
+                'style': "Technique et prudent, focus sur les mesures quantitatives",
+                'key_topics': ['VaR', 'CVaR', 'stress testing', 'capital allocation', 'liquidity risk']
+            },
+            'actuarial': {
+                'persona': "Actuaire Fellow avec expertise en modélisation actuarielle",
+                'style': "Précis et méthodique, utilisation de modèles stochastiques", 
+                'key_topics': ['mortality', 'reserving', 'pricing', 'Solvency II', 'IFRS 17']
+            },
+            'regulation': {
+                'persona': "Spécialiste en conformité réglementaire financière",
+                'style': "Structuré et normatif, référence aux textes officiels",
+                'key_topics': ['Bâle III/IV', 'IFRS', 'reporting', 'compliance', 'audit']
+            },
+            'quantitative': {
+                'persona': "Quantitative Analyst expert en modèles financiers",
+                'style': "Mathématique et technique, utilisation de formules et algorithmes",
+                'key_topics': ['derivatives', 'pricing models', 'monte carlo', 'optimization']
+            }
+        }
+    
+    def _topic_scores(self, text_lower, weight):
+        """Poids x nombre de sujets clés de chaque domaine présents dans le texte"""
+        return {
+            domain: weight * sum(1 for topic in info['key_topics'] if topic.lower() in text_lower)
+            for domain, info in self.domain_experts.items()
+        }
+    
+    def score_domains(self, query, context=''):
+        """Score de chaque domaine pour la requête (et le contexte)"""
+        if isinstance(query, QueryContext):
+            # Score de la requête calculé une seule fois par QueryContext
+            domain_scores = dict(query.cached(
+                ('domain_scores', id(self)), lambda: self._topic_scores(query.normalized, 2)
+            ))
+        else:
+            domain_scores = self._topic_scores(query.lower(), 2)
+        
+        if context:
+            for domain, score in self._topic_scores(context.lower(), 1).items():
+                domain_scores[domain] += score
+        
+        return domain_scores
+    
+    def detect_domain(self, query, context):
+        """Détecte le domaine dominant de la requête"""
+        domain_scores = self.score_domains(query, context)
+        return max(domain_scores, key=domain_scores.get) if domain_scores else 'general'
+    
+    def detect_domain_with_confidence(self, query, context=''):
+        """Domaine dominant et part du score total qu'il représente (0 si aucun terme reconnu)"""
+        domain_scores = self.score_domains(query, context)
+        total = sum(domain_scores.values())
+        if not total:
+            return 'general', 0.0
+        domain = max(domain_scores, key=domain_scores.get)
+        return domain, domain_scores[domain] / total
+    
+    def create_dynamic_prompt(self, query, context, conversation_history, domain):
+        """Crée un prompt dynamique et contextuel"""
+        expert_info = self.domain_experts.get(domain, self.domain_experts['general'])
+        
+        prompt_template = """
+# IDENTITÉ PROFESSIONNELLE
+Tu es {persona}. Tu réponds exclusivement en français.
+
+# STYLE DE RÉPONSE ATTENDU
+{style}
+
+# CONTEXTE DOCUMENTAIRE (Sources spécialisées)
+{context}
+
+# HISTORIQUE DE LA CONVERSATION
+{history}
+
+# QUESTION ACTUELLE
+{query}
+
+# INSTRUCTIONS DE RÉPONSE
+1. Structure avec des sections claires (Analyse, Recommandations, Considérations)
+2. Utilise une terminologie technique exacte
+3. Inclus des exemples concrets quand c'est pertinent
+4. Mentionne les implications pratiques
+5. Sois précis et évite les généralités
+6. Si le contexte est insuffisant, indique-le clairement
+
+# FORMAT DE SORTIE
+**Analyse Technique** : [Analyse détaillée basée sur le contexte]
+**Recommandations Opérationnelles** : [Conseils pratiques d'implémentation]  
+**Aspects Réglementaires** : [Considérations conformité le cas échéant]
+**Risques & Limites** : [Points de vigilance importants]
+"""
+        return prompt_template.format(
+            persona=expert_info['persona'],
+            style=expert_info['style'],
+            context=context[:6000],  # Limiter la taille
+            history=conversation_history[-1000:],  # Historique récent
+            query=query
+        )
\ No newline at end of file
@@ -0,0 +1,386 @@
+# backend/benchmark_ingestion.py
+"""
+Benchmark de l'ingestion (extraction, nettoyage, découpage, embeddings, index, persistance) sur un
+corpus fixe de documents générés (PDF, DOCX, texte).
+
+Usage:
+    python benchmark_ingestion.py --documents 30 --pages 20 --output benchmark_ingestion.json
+    python benchmark_ingestion.py --parse-workers 0 --profile ingestion.prof
+"""
+import argparse
+import cProfile
+import hashlib
+import json
+import os
+import platform
+import pstats
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import textwrap
+import time
+from datetime import datetime
+from benchmark_search import (REGULATIONS, BenchmarkKnowledgeBase, HashingEmbedder, SyntheticCorpusGenerator,
+                              current_rss_mb, peak_rss_mb)
+from ingestion_pipeline import DOCX_AVAILABLE, PDF_AVAILABLE, IngestionPipeline
+
+if DOCX_AVAILABLE:
+    import docx
+
+BENCHMARK_VERSION = 1
+
+FORMATS = ('pdf', 'docx', 'txt')
+
+# Page de table de mortalité (une page sur TABLE_PAGE_INTERVAL): exerce l'extraction de tableaux
+TABLE_PAGE_INTERVAL = 10
+
+
+class DocumentCorpusGenerator:
+    """Documents synthétiques de style actuariel et réglementaire, écrits aux formats demandés"""
+
+    def __init__(self, seed=42, paragraphs_per_page=6):
+        self.seed = seed
+        self.paragraphs_per_page = paragraphs_per_page
+        self.text_generator = SyntheticCorpusGenerator(seed)
+
+    def pages(self, rng, document_id, count):
+        """Texte de chaque page (paragraphes séparés par une ligne vide)"""
+        regulation = REGULATIONS[document_id % len(REGULATIONS)]
+        pages = []
+        for page_number in range(1, count + 1):
+            if page_number % TABLE_PAGE_INTERVAL == 0:
+                pages.append(self.table_page(rng, page_number))
+                continue
+            paragraphs = [f"Article {rng.randint(1, 300)} - {regulation}"]
+            paragraphs.extend(self.text_generator._chunk_text(rng, regulation)
+                              for _ in range(self.paragraphs_per_page))
+            pages.append('\n\n'.join(paragraphs))
+        return pages
+
+    @staticmethod
+    def table_page(rng, page_number):
+        first_age = (page_number // TABLE_PAGE_INTERVAL - 1) * 40 % 80
+        lines = ["Table TH00-02 - mortalité par âge", "Âge lx qx"]
+        survivors = 100000 - first_age * 700
+        for age in range(first_age, first_age + 40):
+            rate = min(0.5, 0.0005 * 1.09 ** age * rng.uniform(0.95, 1.05))
+            lines.append(f"{age} {survivors} {rate:.6f}")
+            survivors = max(1, int(survivors * (1 - rate)))
+        return '\n'.join(lines)
+
+    def generate(self, directory, documents, pages_per_document, formats):
+        """Écrit le corpus (formats attribués à tour de rôle); retourne [(chemin, format, pages)]"""
+        rng = random.Random(self.seed)
+        corpus = []
+        for document_id in range(documents):
+            document_format = formats[document_id % len(formats)]
+            pages = self.pages(rng, document_id, pages_per_document)
+            path = os.path.join(directory, f"{REGULATIONS[document_id % len(REGULATIONS)].replace(' ', '_')}"
+                                           f"_rapport_{document_id}.{document_format}")
+            if document_format == 'pdf':
+                page_count = write_pdf(path, pages)
+            elif document_format == 'docx':
+                page_count = write_docx(path, pages)
+            else:
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write('\n\n'.join(pages))
+                page_count = len(pages)
+            corpus.append((path, document_format, page_count))
+        return corpus
+
+
+def _pdf_string(text):
+    return text.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def write_pdf(path, pages, font_size=10, leading=12, line_chars=95, lines_per_page=62):
+    """PDF texte minimal (Helvetica, WinAnsi), sans dépendance; une page trop longue continue sur
+    la suivante. Retourne le nombre de pages écrites."""
+    pdf_pages = []
+    for text in pages:
+        lines = [line for paragraph in text.split('\n')
+                 for line in (textwrap.wrap(paragraph, line_chars) or [''])]
+        pdf_pages.extend(lines[first:first + lines_per_page] for first in range(0, len(lines), lines_per_page))
+
+    objects = [b'<< /Type /Catalog /Pages 2 0 R >>', None,
+               b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>']
+    page_refs = []
+    for lines in pdf_pages:
+        content = b'BT /F1 %d Tf %d TL 50 792 Td ' % (font_size, leading)
+        content += b''.join(b'(' + _pdf_string(line) + b") '\n" for line in lines) + b'ET'
+        objects.append(b'<< /Length %d >>\nstream\n' % len(content) + content + b'\nendstream')
+        objects.append(b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] '
+                       b'/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>' % (len(objects)))
+        page_refs.append(b'%d 0 R' % len(objects))
+    objects[1] = b'<< /Type /Pages /Kids [' + b' '.join(page_refs) + b'] /Count %d >>' % len(page_refs)
+
+    with open(path, 'wb') as f:
+        f.write(b'%PDF-1.4\n')
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b'%d 0 obj\n' % number + body + b'\nendobj\n')
+        xref = f.tell()
+        f.write(b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1))
+        f.write(b''.join(b'%010d 00000 n \n' % offset for offset in offsets))
+        f.write(b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref))
+    return len(pdf_pages)
+
+
+def write_docx(path, pages):
+    document = docx.Document()
+    for page_number, text in enumerate(pages):
+        if page_number:
+            document.add_page_break()
+        for paragraph in text.split('\n\n'):
+            document.add_paragraph(paragraph)
+    document.save(path)
+    return len(pages)
+
+
+def corpus_fingerprint(corpus):
+    """Empreinte du contenu du corpus: deux résultats ne sont comparables que sur la même empreinte"""
+    digest = hashlib.sha256()
+    for path, _, _ in corpus:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def directory_bytes(directory):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names)
+
+
+def save_knowledge_base(knowledge_base, directory):
+    """Étape de persistance: chunks, vecteurs, manifeste et tableaux sur disque"""
+    knowledge_base.chunks.save(os.path.join(directory, 'chunks'))
+    if getattr(knowledge_base, 'vector_store', None) is not None:
+        knowledge_base.vector_store.save(os.path.join(directory, 'vectors'))
+    knowledge_base.manifest.save(directory)
+    if getattr(knowledge_base, 'table_store', None) is not None:
+        knowledge_base.table_store.save(directory)
+
+
+def cpu_times():
+    """(CPU du processus, CPU des processus enfants terminés), utilisateur + système"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime
+
+
+class ProfiledIngestionPipeline(IngestionPipeline):
+    """Pipeline dont les threads d'étape sont profilés (cProfile), pour un dump unique
+
+    Avant Python 3.12, un profileur ne voit que son thread: chaque étape a le sien, fusionné
+    ensuite. À partir de 3.12, le profileur du thread principal couvre tous les threads. Les
+    processus d'extraction ne sont pas profilés (--parse-workers 0 pour extraire dans le thread).
+    """
+
+    PER_THREAD = sys.version_info < (3, 12)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.profiles = []
+
+    def _profiled(self, stage, *args):
+        if not self.PER_THREAD:
+            return stage(*args)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return stage(*args)
+        finally:
+            profile.disable()
+            self.profiles.append(profile)
+
+    def _parse_stage(self, *args):
+        return self._profiled(super()._parse_stage, *args)
+
+    def _chunk_stage(self, *args):
+        return self._profiled(super()._chunk_stage, *args)
+
+    def _embed_stage(self, *args):
+        return self._profiled(super()._embed_stage, *args)
+
+
+# Attentes entre étapes (files bloquantes): du temps d'inactivité, pas un coût
+IDLE_FUNCTIONS = ("<method 'acquire' of '_thread.lock' objects>", "<method 'acquire' of '_thread.RLock' objects>")
+
+
+def profile_summary(stats, limit=25):
+    """Fonctions les plus coûteuses (temps propre), pour le rapport JSON"""
+    rows = []
+    for (filename, line, function), (_, calls, own_seconds, cumulative_seconds, _) in stats.stats.items():
+        if function in IDLE_FUNCTIONS:
+            continue
+        rows.append({
+            'function': f"{os.path.basename(filename)}:{line}({function})",
+            'calls': calls,
+            'own_seconds': round(own_seconds, 3),
+            'cumulative_seconds': round(cumulative_seconds, 3)
+        })
+    rows.sort(key=lambda row: (-row['own_seconds'], row['function']))
+    return rows[:limit]
+
+
+def benchmark_run(paths, embedder, pipeline_options, work_directory, profile_path=None):
+    """Une ingestion complète du corpus dans une base vide, puis sa persistance"""
+    pipeline_class = ProfiledIngestionPipeline if profile_path else IngestionPipeline
+    pipeline = pipeline_class(embedder, **pipeline_options)
+    profile = cProfile.Profile() if profile_path else None
+
+    rss_before = current_rss_mb()
+    cpu_before, children_cpu_before = cpu_times()
+    start = time.perf_counter()
+    if profile is not None:
+        profile.enable()
+    try:
+        knowledge_base, report = pipeline.ingest(BenchmarkKnowledgeBase([]), paths)
+
+        persist_directory = os.path.join(work_directory, 'knowledge_base')
+        shutil.rmtree(persist_directory, ignore_errors=True)
+        persist_start, persist_cpu_start = time.perf_counter(), time.thread_time()
+        save_knowledge_base(knowledge_base, persist_directory)
+        persist_seconds = time.perf_counter() - persist_start
+        persist_cpu_seconds = time.thread_time() - persist_cpu_start
+    finally:
+        if profile is not None:
+            profile.disable()
+    total_seconds = time.perf_counter() - start
+    cpu_after, children_cpu_after = cpu_times()
+
+    stages = {name: dict(stage) for name, stage in report['stages'].items()}
+    stages['persist'] = {
+        'busy_seconds': round(persist_seconds, 3),
+        'cpu_seconds': round(persist_cpu_seconds, 3),
+        'bytes': directory_bytes(persist_directory)
+    }
+    result = {
+        'documents': report['documents'],
+        'pages': report['pages'],
+        'chunks': report['chunks'],
+        'tables': report['tables'],
+        'errors': report['errors'],
+        'chunk_token_limit': report['chunk_token_limit'],
+        'ingestion_seconds': report['wall_seconds'],
+        'total_seconds': round(total_seconds, 3),
+        'pages_per_second': report['pages_per_second'],
+        'chunks_per_second': report['chunks_per_second'],
+        'stages': stages,
+        'cpu_seconds': {
+            'process': round(cpu_after - cpu_before, 3),
+            'parse_workers': round(children_cpu_after - children_cpu_before, 3)
+        },
+        'memory_mb': {
+            'rss_before': round(rss_before, 1),
+            'rss_after': round(current_rss_mb(), 1),
+            'peak_rss': round(peak_rss_mb(), 1),
+            'peak_rss_parse_workers': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+            'vectors': round(knowledge_base.vector_store.nbytes() / 1024 ** 2, 1)
+            if getattr(knowledge_base, 'vector_store', None) is not None else 0.0,
+            'chunk_store': round(knowledge_base.chunks.nbytes() / 1024 ** 2, 1)
+        }
+    }
+
+    if profile is not None:
+        stats = pstats.Stats(profile)
+        for stage_profile in pipeline.profiles:
+            stats.add(stage_profile)
+        stats.dump_stats(profile_path)
+        result['profile'] = {'path': profile_path, 'top_functions': profile_summary(stats)}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'ingestion sur un corpus de documents générés")
+    parser.add_argument('--documents', type=int, default=30)
+    parser.add_argument('--pages', type=int, default=20, help="pages par document")
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS))
+    parser.add_argument('--embedder', choices=['hashing', 'financial'], default='hashing',
+                        help="hashing: sans modèle (pipeline seul); financial: FinancialEmbedder réel")
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help="processus d'extraction (0: extraction dans le thread du pipeline)")
+    parser.add_argument('--embed-batch-size', type=int, default=64)
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', default=None, help="répertoire du corpus (temporaire par défaut)")
+    parser.add_argument('--profile', default=None, help="fichier de dump cProfile (pstats)")
+    parser.add_argument('--output', default='benchmark_ingestion.json')
+    args = parser.parse_args()
+
+    # Formats non extractibles dans cet environnement: écartés et signalés dans le rapport
+    unavailable = {'pdf': None if PDF_AVAILABLE else "pypdf non installé",
+                   'docx': None if DOCX_AVAILABLE else "python-docx non installé"}
+    skipped_formats = {name: unavailable[name] for name in args.formats if unavailable.get(name)}
+    formats = [name for name in args.formats if name not in skipped_formats]
+    if not formats:
+        parser.error(f"aucun format utilisable: {skipped_formats}")
+
+    if args.embedder == 'financial':
+        from advanced_embeddings import FinancialEmbedder
+        embedder = FinancialEmbedder()
+    else:
+        embedder = HashingEmbedder()
+
+    pipeline_options = {'embed_batch_size': args.embed_batch_size}
+    if args.parse_workers is not None:
+        pipeline_options['parse_workers'] = args.parse_workers
+
+    work_directory = args.work_dir or tempfile.mkdtemp(prefix='benchmark_ingestion_')
+    corpus_directory = os.path.join(work_directory, 'corpus')
+    shutil.rmtree(corpus_directory, ignore_errors=True)
+    os.makedirs(corpus_directory)
+    try:
+        print(f"📄 Génération de {args.documents} documents ({', '.join(formats)})...")
+        corpus = DocumentCorpusGenerator(args.seed).generate(corpus_directory, args.documents, args.pages, formats)
+        paths = [path for path, _, _ in corpus]
+
+        results = []
+        for run in range(args.repeat):
+            # Profil sur la dernière exécution seulement
+            profile_path = args.profile if args.profile and run == args.repeat - 1 else None
+            results.append(benchmark_run(paths, embedder, pipeline_options, work_directory, profile_path))
+            print(f"✅ Exécution {run + 1}: {results[-1]['pages_per_second']} pages/s, "
+                  f"{results[-1]['chunks_per_second']} chunks/s, total {results[-1]['total_seconds']}s")
+
+        report = {
+            'benchmark': 'ingestion',
+            'version': BENCHMARK_VERSION,
+            'created_at': datetime.now().isoformat(),
+            'config': {
+                'documents': args.documents,
+                'pages_per_document': args.pages,
+                'formats': formats,
+                'embedder': args.embedder,
+                'pipeline_options': pipeline_options,
+                'repeat': args.repeat,
+                'seed': args.seed
+            },
+            'corpus': {
+                'fingerprint': corpus_fingerprint(corpus),
+                'documents_by_format': {name: sum(1 for _, document_format, _ in corpus if document_format == name)
+                                        for name in formats},
+                'source_pages': sum(page_count for _, _, page_count in corpus),
+                'bytes': directory_bytes(corpus_directory),
+                'skipped_formats': skipped_formats
+            },
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count()
+            },
+            'results': results
+        }
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+    print(f"📊 Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
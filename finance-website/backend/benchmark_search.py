@@ -0,0 +1,318 @@
+# backend/benchmark_search.py
+"""
+Benchmark de la recherche hybride sur un corpus actuariel synthétique.
+
+Usage:
+    python benchmark_search.py --sizes 10000 100000 1000000 --output benchmark_search.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+from finance_vocabulary import finance_vocabulary
+from query_context import QueryContext, embedding_key
+
+BENCHMARK_VERSION = 1
+
+REGULATIONS = ['Solvabilité II', 'IFRS 17', 'CRR', 'Bâle III', 'IFRS 9', 'Solvency II']
+RISKS_FR = ['marché', 'souscription vie', 'souscription non-vie', 'contrepartie', 'opérationnel', 'liquidité']
+RISKS_EN = ['market', 'life underwriting', 'non-life underwriting', 'counterparty default', 'operational', 'liquidity']
+TOPICS_FR = [
+    "la meilleure estimation des provisions techniques", "la marge de risque", "le capital de solvabilité requis",
+    "la table de mortalité TH00-02", "la courbe des taux sans risque", "le ratio de solvabilité",
+    "la marge sur services contractuels", "l'ajustement pour risque non financier", "le stress test de liquidité",
+    "la valeur en risque à 99,5 %", "les rentes viagères", "le provisionnement Chain Ladder",
+]
+TOPICS_EN = [
+    "the best estimate of technical provisions", "the risk margin", "the solvency capital requirement",
+    "the TH00-02 mortality table", "the risk-free yield curve", "the solvency ratio",
+    "the contractual service margin", "the risk adjustment for non-financial risk", "the liquidity stress test",
+    "the 99.5% value at risk", "life annuities", "Chain Ladder reserving",
+]
+TEMPLATES_FR = [
+    "Le capital de solvabilité requis au titre du risque de {risk} est calculé selon la formule standard. "
+    "L'entreprise évalue {topic} et documente les hypothèses retenues dans son rapport ORSA.",
+    "Conformément à {regulation}, {topic} fait l'objet d'une revue annuelle par la fonction actuarielle. "
+    "Les écarts significatifs sont expliqués au conseil d'administration.",
+    "Article {article}\n{topic_title}\n1. Les entreprises d'assurance et de réassurance calculent {topic} "
+    "en tenant compte du risque de {risk}.",
+    "Au {year}, {topic} s'élève à {amount} millions d'euros, en hausse de {pct} % par rapport à l'exercice précédent.",
+]
+TEMPLATES_EN = [
+    "The solvency capital requirement for {risk} risk is computed using the standard formula. "
+    "The undertaking assesses {topic} and documents its assumptions in the ORSA report.",
+    "Under {regulation}, {topic} is reviewed annually by the actuarial function. "
+    "Material deviations are reported to the board.",
+    "Article {article}\n{topic_title}\n1. Insurance and reinsurance undertakings shall calculate {topic} "
+    "taking into account {risk} risk.",
+    "As at {year}, {topic} amounts to EUR {amount} million, up {pct}% compared with the previous year.",
+]
+BOILERPLATE = (
+    "Ce document est publié à titre d'information. Toute reproduction, même partielle, est interdite "
+    "sans l'autorisation préalable écrite de l'éditeur. This document is provided for information only."
+)
+
+
+class SyntheticCorpusGenerator:
+    """Chunks synthétiques FR/EN de style actuariel et réglementaire, et requêtes associées"""
+
+    def __init__(self, seed=42, chunks_per_document=50, boilerplate_rate=0.05):
+        self.seed = seed
+        self.chunks_per_document = chunks_per_document
+        self.boilerplate_rate = boilerplate_rate
+
+    def _chunk_text(self, rng, document_regulation):
+        french = rng.random() < 0.6
+        templates, topics, risks = (TEMPLATES_FR, TOPICS_FR, RISKS_FR) if french else (TEMPLATES_EN, TOPICS_EN, RISKS_EN)
+        sentences = []
+        for _ in range(rng.randint(2, 5)):
+            topic = rng.choice(topics)
+            sentences.append(rng.choice(templates).format(
+                risk=rng.choice(risks),
+                topic=topic,
+                topic_title=topic[0].upper() + topic[1:],
+                regulation=document_regulation,
+                article=rng.randint(1, 300),
+                year=rng.randint(2016, 2025),
+                amount=rng.randint(10, 9000),
+                pct=rng.randint(1, 40),
+            ))
+        return ' '.join(sentences)
+
+    def generate(self, size):
+        """Liste de chunks {'chunk', 'metadata'} regroupés en documents"""
+        rng = random.Random(self.seed)
+        chunks = []
+        for chunk_id in range(size):
+            document_id = chunk_id // self.chunks_per_document
+            document_regulation = REGULATIONS[document_id % len(REGULATIONS)]
+            if rng.random() < self.boilerplate_rate:
+                text = BOILERPLATE
+            else:
+                text = self._chunk_text(rng, document_regulation)
+            chunks.append({
+                'chunk': text,
+                'metadata': {
+                    'source': f"{document_regulation.replace(' ', '_')}_rapport_{document_id}.pdf",
+                    'page': (chunk_id % self.chunks_per_document) // 3 + 1
+                }
+            })
+        return chunks
+
+    def generate_queries(self, count):
+        """Charge de requêtes: courtes, questions FR/EN, citations"""
+        rng = random.Random(self.seed + 1)
+        queries = []
+        for _ in range(count):
+            kind = rng.random()
+            if kind < 0.3:
+                queries.append(rng.choice(["SCR", "CSM", "marge de risque", "best estimate"]) + ' ' + rng.choice(RISKS_FR))
+            elif kind < 0.6:
+                queries.append(f"Comment est calculé {rng.choice(TOPICS_FR)} pour le risque de {rng.choice(RISKS_FR)} ?")
+            elif kind < 0.85:
+                queries.append(f"How is {rng.choice(TOPICS_EN)} assessed under {rng.choice(REGULATIONS)}?")
+            else:
+                queries.append(f"Article {rng.randint(1, 300)} {rng.choice(['Solvabilité II', 'CRR'])}")
+        return queries
+
+
+class HashingEmbedder:
+    """Embedder déterministe sans modèle (hashing signé des mots), pour mesurer l'infrastructure seule"""
+
+    WORD_RE = re.compile(r'\w+')
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+        self.finance_terms = finance_vocabulary()
+
+    def get_embedding(self, text, model_type='auto'):
+        if isinstance(text, QueryContext):
+            return text.cached(embedding_key(self, model_type), lambda: self.get_embedding(text.query))
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in self.WORD_RE.findall(text.lower()):
+            hashed = zlib.crc32(word.encode('utf-8'))
+            vector[hashed % self.dimension] += 1.0 if (hashed >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get_embeddings(self, texts, model_type='auto', batch_size=32):
+        return np.array([self.get_embedding(text) for text in texts], dtype=np.float32).reshape(-1, self.dimension)
+
+    def detect_domain(self, text):
+        return 'general'
+
+
+class BenchmarkKnowledgeBase:
+    """Base de connaissances minimale (chunks seulement) pour AdvancedHybridSearch"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.metadata = [chunk['metadata'] for chunk in chunks]
+        self.index = None
+
+
+def current_rss_mb():
+    """RSS courant (Linux), sinon pic RSS du processus"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Pic RSS du processus (RUSAGE_CHILDREN: du plus gros processus enfant terminé)"""
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss en Ko sous Linux, en octets sous macOS
+    return peak / 1024 ** 2 if platform.system() == 'Darwin' else peak / 1024
+
+
+def percentiles(values):
+    if not values:
+        return {}
+    values = np.asarray(values, dtype=np.float64)
+    return {
+        'p50': round(float(np.percentile(values, 50)), 3),
+        'p95': round(float(np.percentile(values, 95)), 3),
+        'p99': round(float(np.percentile(values, 99)), 3),
+        'mean': round(float(values.mean()), 3),
+        'count': int(len(values))
+    }
+
+
+def run_query(engine, query, top_k=5, short_query_words=4):
+    """Même enchaînement que EnhancedRAGChatbot.enhanced_search; retourne (latence ms, étapes ms)"""
+    start = time.perf_counter()
+    query = QueryContext(query)
+    results = engine.citation_search(query, top_k=top_k)
+    citation_ms = (time.perf_counter() - start) * 1000
+    if results:
+        return citation_ms, {'citation': citation_ms}
+
+    engine.hybrid_search(query, top_k=top_k, expand=len(query.normalized.split()) <= short_query_words)
+    total_ms = (time.perf_counter() - start) * 1000
+    stages = dict(engine.last_search_stats.get('timings_ms', {}))
+    stages['citation'] = citation_ms
+    return total_ms, stages
+
+
+def benchmark_size(size, queries, concurrency_levels, embedder, engine_options):
+    """Construit l'index pour une taille de corpus puis mesure latence et débit"""
+    from hybrid_search import AdvancedHybridSearch
+
+    generator = SyntheticCorpusGenerator()
+    start = time.perf_counter()
+    chunks = generator.generate(size)
+    generation_s = time.perf_counter() - start
+
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    engine = AdvancedHybridSearch(BenchmarkKnowledgeBase(chunks), embedder=embedder, **engine_options)
+    build_s = time.perf_counter() - start
+    del chunks
+    rss_after = current_rss_mb()
+
+    # Latence séquentielle (après une requête de chauffe)
+    run_query(engine, queries[0])
+    totals, stages = [], {}
+    for query in queries:
+        total_ms, query_stages = run_query(engine, query)
+        totals.append(total_ms)
+        for stage, value in query_stages.items():
+            stages.setdefault(stage, []).append(value)
+
+    # Débit à plusieurs niveaux de concurrence
+    throughput = []
+    for concurrency in concurrency_levels:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            start = time.perf_counter()
+            latencies = [total_ms for total_ms, _ in pool.map(lambda query: run_query(engine, query), queries)]
+            wall_s = time.perf_counter() - start
+        throughput.append({
+            'concurrency': concurrency,
+            'queries_per_second': round(len(queries) / wall_s, 2),
+            'latency_ms': percentiles(latencies)
+        })
+
+    return {
+        'corpus_size': size,
+        'indexed_chunks': int(len(engine.indexed_ids)),
+        'corpus_generation_s': round(generation_s, 3),
+        'index_build_s': round(build_s, 3),
+        'index_build_stages_s': {stage: round(value, 3) for stage, value in engine.build_timings.items()},
+        'memory_mb': {
+            'rss_before_build': round(rss_before, 1),
+            'rss_after_build': round(rss_after, 1),
+            'peak_rss': round(peak_rss_mb(), 1),
+            'embeddings': round(engine.vector_store.nbytes() / 1024 ** 2, 1),
+            'chunk_store': round(engine.chunk_store.nbytes() / 1024 ** 2, 1)
+        },
+        'latency_ms': {
+            'total': percentiles(totals),
+            'stages': {stage: percentiles(values) for stage, values in sorted(stages.items())}
+        },
+        'throughput': throughput
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de AdvancedHybridSearch sur corpus synthétique")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--embedder', choices=['hashing', 'financial'], default='hashing',
+                        help="hashing: sans modèle (infrastructure seule); financial: FinancialEmbedder réel")
+    parser.add_argument('--binary-prefilter', action='store_true')
+    parser.add_argument('--no-dedup', action='store_true')
+    parser.add_argument('--output', default='benchmark_search.json')
+    args = parser.parse_args()
+
+    if args.embedder == 'financial':
+        from advanced_embeddings import FinancialEmbedder
+        embedder = FinancialEmbedder()
+    else:
+        embedder = HashingEmbedder()
+
+    engine_options = {'binary_prefilter': args.binary_prefilter, 'deduplicate': not args.no_dedup}
+    queries = SyntheticCorpusGenerator().generate_queries(args.queries)
+
+    results = []
+    for size in args.sizes:
+        print(f"⏱️  Corpus de {size} chunks...")
+        results.append(benchmark_size(size, queries, args.concurrency, embedder, engine_options))
+        print(f"✅ {size} chunks: build {results[-1]['index_build_s']}s, "
+              f"p95 {results[-1]['latency_ms']['total'].get('p95')} ms")
+
+    report = {
+        'benchmark': 'hybrid_search',
+        'version': BENCHMARK_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'config': {
+            'sizes': args.sizes,
+            'queries': args.queries,
+            'concurrency': args.concurrency,
+            'embedder': args.embedder,
+            'engine_options': engine_options
+        },
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count()
+        },
+        'results': results
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, sort_keys=True, ensure_ascii=False)
+    print(f"📊 Résultats écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# backend/binary_index.py
+import numpy as np
+
+try:
+    import faiss
+    FAISS_BINARY_AVAILABLE = hasattr(faiss, 'IndexBinaryFlat')
+except ImportError:
+    FAISS_BINARY_AVAILABLE = False
+
+# Table de popcount pour numpy < 2.0 (sans np.bitwise_count)
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def binarize(embeddings):
+    """Embeddings -> codes binaires (signe de chaque composante), 1 bit par dimension"""
+    return np.packbits(np.asarray(embeddings) > 0, axis=-1)
+
+
+class BinaryPrefilter:
+    """Premier étage de recherche en distance de Hamming sur embeddings binarisés, re-scoré en float"""
+
+    def __init__(self, embeddings, candidates=300, use_faiss=True):
+        self.dimension = embeddings.shape[1]
+        self.candidates = candidates
+        self.codes = binarize(embeddings)
+        self.float_bytes = int(embeddings.shape[0] * embeddings.shape[1] * 4)
+
+        self.index = None
+        if use_faiss and FAISS_BINARY_AVAILABLE and self.dimension % 8 == 0:
+            self.index = faiss.IndexBinaryFlat(self.dimension)
+            self.index.add(self.codes)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def hamming_candidates(self, query_embedding, n):
+        """Positions des n codes les plus proches en distance de Hamming"""
+        n = min(n, len(self.codes))
+        query_code = binarize(query_embedding.reshape(1, -1))
+        if self.index is not None:
+            _, positions = self.index.search(query_code, n)
+            return positions[0][positions[0] >= 0]
+
+        xor = np.bitwise_xor(self.codes, query_code)
+        if hasattr(np, 'bitwise_count'):
+            distances = np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+        else:
+            distances = _POPCOUNT_TABLE[xor].sum(axis=1, dtype=np.int32)
+        positions = np.argpartition(distances, n - 1)[:n] if n < len(distances) else np.arange(len(distances))
+        return positions[np.argsort(distances[positions], kind='stable')]
+
+    def search(self, query_embedding, embeddings, top_k, candidates=None):
+        """Candidats Hamming puis re-scoring exact (produit scalaire) sur les vecteurs float"""
+        positions = self.hamming_candidates(query_embedding, max(top_k, candidates or self.candidates))
+        scores = embeddings[positions] @ query_embedding.reshape(-1)
+        order = np.argsort(-scores)[:top_k]
+        return scores[order].reshape(1, -1), positions[order].reshape(1, -1)
+
+    def measure_recall(self, embeddings, sample_size=100, top_k=10, seed=0):
+        """Recall@k du préfiltre comparé à la recherche exacte, sur des chunks tirés comme requêtes"""
+        if not len(embeddings):
+            return 0.0
+        rng = np.random.RandomState(seed)
+        queries = embeddings[rng.choice(len(embeddings), min(sample_size, len(embeddings)), replace=False)]
+        k = min(top_k, len(embeddings))
+
+        hits = 0
+        for query in queries:
+            exact = np.argpartition(-(embeddings @ query), k - 1)[:k]
+            _, approx = self.search(query, embeddings, k)
+            hits += len(np.intersect1d(exact, approx[0]))
+        return hits / (len(queries) * k)
+
+    def report(self):
+        """Mémoire du premier étage comparée aux vecteurs float"""
+        binary_bytes = int(self.codes.nbytes)
+        return {
+            'vectors': len(self.codes),
+            'candidates': self.candidates,
+            'backend': 'faiss.IndexBinaryFlat' if self.index is not None else 'numpy popcount',
+            'binary_bytes': binary_bytes,
+            'float_bytes': self.float_bytes,
+            'memory_reduction': round(self.float_bytes / binary_bytes, 1) if binary_bytes else 0
+        }
@@ -0,0 +1,1254 @@
+# backend/chat_api_rag.py
+from flask import Flask, request, jsonify
+from werkzeug.utils import secure_filename
+import ollama
+import os
+import threading
+import time
+import uuid
+import copy
+import hmac
+import shutil
+import logging
+from datetime import datetime
+from knowledge_base import FinanceActuarialKnowledgeBase
+from chunk_store import attach_chunk_store
+from query_context import QueryContext
+from index_snapshots import IndexSnapshotManager
+from ingestion_jobs import IngestionJobQueue, job_to_json, QUEUED, RUNNING, DONE, FAILED
+from ingestion_manifest import file_digest
+from watch_folder import FolderWatcher
+from document_summaries import DocumentSummarizer, SummaryCache, iter_documents
+from pymongo import MongoClient
+
+# --- Import des nouveaux modules améliorés ---
+try:
+    from advanced_embeddings import FinancialEmbedder
+    from hybrid_search import AdvancedHybridSearch
+    from advanced_prompts import AdvancedPromptEngine
+    from evaluation_system import RAGEvaluator
+    from ingestion_pipeline import IngestionPipeline, SUPPORTED_EXTENSIONS
+    from knowledge_snapshot import SnapshotError, export_snapshot, load_snapshot, unpack_snapshot, read_snapshot
+    RAG_ENHANCED = True
+    print("✅ Tous les modules RAG avancés chargés avec succès")
+except ImportError as e:
+    print(f"⚠️  Certains modules RAG avancés non disponibles: {e}")
+    RAG_ENHANCED = False
+
+# --- MongoDB Setup ---
+mongo_client = MongoClient("mongodb://localhost:27017/")
+mongo_db = mongo_client["finance_chatbot"]
+conversations_collection = mongo_db["conversations"]
+ingestion_jobs_collection = mongo_db["ingestion_jobs"]
+
+# Documents envoyés via /api/documents (conservés: un job interrompu est repris sur ces fichiers)
+UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploaded_documents')
+
+# Dossiers surveillés (séparés par os.pathsep): tout dépôt, modification ou suppression y est ingéré
+WATCH_FOLDERS = [folder for folder in os.environ.get('INGESTION_WATCH_FOLDERS', '').split(os.pathsep) if folder]
+
+# Résumés de documents en cache (par empreinte du contenu et modèle); appels Ollama simultanés au plus
+SUMMARY_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'document_summaries')
+SUMMARY_CONCURRENCY = int(os.environ.get('SUMMARY_CONCURRENCY', '4'))
+
+# Snapshots exportés (POST /api/snapshots); KB_SNAPSHOT: snapshot (répertoire ou archive .tar) sur
+# lequel démarrer une réplique, sans réextraire ni réencoder les documents
+SNAPSHOT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kb_snapshots')
+KB_SNAPSHOT = os.environ.get('KB_SNAPSHOT') or None
+# Import à chaud (POST /api/snapshots/import) désactivé sans jeton; seuls les snapshots de SNAPSHOT_FOLDER
+SNAPSHOT_IMPORT_TOKEN = os.environ.get('SNAPSHOT_IMPORT_TOKEN') or None
+
+# Point de reprise: snapshot de l'index écrit en arrière-plan après les jobs d'ingestion (au plus un par
+# intervalle); au démarrage il est rechargé et seuls les jobs terminés depuis sont réingérés
+CHECKPOINT_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index_checkpoints')
+CHECKPOINT_INTERVAL = float(os.environ.get('INDEX_CHECKPOINT_INTERVAL', '300'))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+app = Flask(__name__)
+
+# Requêtes courtes (ex: "SCR marché") étendues en plusieurs reformulations
+SHORT_QUERY_WORDS = 4
+
+# Configuration CORS
+@app.after_request
+def after_request(response):
+    response.headers.add('Access-Control-Allow-Origin', '*')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-Requested-With')
+    response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return response
+
+class EnhancedRAGChatbot:
+    def __init__(self):
+        self.client = ollama.Client()
+        self.knowledge_base = FinanceActuarialKnowledgeBase()
+        # Les chunks sont conservés en colonnes (buffer texte + métadonnées encodées)
+        self.chunk_store = attach_chunk_store(self.knowledge_base)
+        self.available_models = []
+        self.current_model = None
+        self.ollama_available = False
+        
+        # Nouveaux composants RAG avancés
+        self.rag_enhanced = RAG_ENHANCED
+        if self.rag_enhanced:
+            try:
+                self.embedder = FinancialEmbedder()
+                # Partagé avec les moteurs de recherche (domaine de la requête détecté une seule fois)
+                self.prompt_engine = AdvancedPromptEngine()
+                # Ingestion en arrière-plan: la moitié des cœurs, processus d'extraction moins prioritaires
+                self.ingestion = IngestionPipeline(
+                    self.embedder, parse_workers=max(1, (os.cpu_count() or 2) // 2), niceness=10,
+                    source_roots=WATCH_FOLDERS
+                )
+                self.jobs = IngestionJobQueue(ingestion_jobs_collection, self.run_ingestion_job)
+                self.summary_cache = SummaryCache(SUMMARY_FOLDER)
+                self.summarizer = None
+                self._summary_lock = threading.Lock()
+                self._summary_rerun = False
+                self.summary_status = {'running': False, 'last_run': None}
+                # Moteur de recherche accessible via un snapshot échangeable à chaud
+                self.snapshots = IndexSnapshotManager()
+                self._checkpoint_lock = threading.Lock()
+                self._checkpoint_pending = None
+                self._checkpoint_at = 0.0
+                # Jobs appliqués au snapshot actif mais pas encore marqués terminés: identifiant -> created_at
+                self._applied_jobs = {}
+                if KB_SNAPSHOT:
+                    self.snapshots.rebuild(lambda: self.load_snapshot_engine(KB_SNAPSHOT), self.on_snapshot_swap)
+                elif not self.restore_checkpoint():
+                    # Premier démarrage: documents locaux et tous les jobs terminés
+                    self.snapshots.rebuild(lambda: self.build_replayed_engine(self.knowledge_base),
+                                           self.on_snapshot_swap)
+                self.jobs.start()
+                self.watcher = None
+                if WATCH_FOLDERS:
+                    self.watcher = FolderWatcher(WATCH_FOLDERS, self.submit_folder_changes,
+                                                 extensions=SUPPORTED_EXTENSIONS)
+                    self.watcher.start()
+                self.evaluator = RAGEvaluator(embedder=self.embedder)
+                print("🔧 Tous les composants RAG avancés initialisés")
+            except Exception as e:
+                print(f"❌ Erreur initialisation composants RAG: {e}")
+                self.rag_enhanced = False
+        
+        self.initialize_ollama()
+        self.conversation_memory = {}  # Mémoire conversationnelle simple
+        if self.rag_enhanced:
+            # Documents sans résumé en cache résumés en arrière-plan (les autres sont appliqués aussitôt)
+            self.summarize_documents()
+    
+    @property
+    def search_engine(self):
+        """Moteur du snapshot actif (à lire une seule fois par requête)"""
+        return self.snapshots.current
+    
+    def build_search_engine(self, knowledge_base=None, previous=None):
+        """Nouveau moteur; modèles partagés avec le snapshot actif
+
+        Sans base, les index sont reconstruits sur les stores du snapshot actif (ni réextraction, ni
+        réencodage). previous: moteur dont knowledge_base prolonge la base (ingestion), mis à jour au
+        lieu d'être reconstruit
+        """
+        current = self.snapshots.current
+        if knowledge_base is None and current is not None:
+            # Copie: le moteur en construction rattache ses stores à sa base, pas à celle du snapshot servi;
+            # il renseigne la colonne des domaines et compresse un store à lui (blocs compressés partagés),
+            # le store servi n'est jamais modifié
+            knowledge_base = copy.copy(current.kb)
+            knowledge_base.chunks = current.chunk_store.extended(())
+        elif knowledge_base is None:
+            knowledge_base = self.knowledge_base
+        engine = AdvancedHybridSearch(
+            knowledge_base,
+            embedder=self.embedder,
+            cross_encoder=current._cross_encoder if current is not None else None,
+            prompt_engine=self.prompt_engine,
+            previous=previous
+        )
+        self.apply_cached_summaries(engine)
+        return engine
+    
+    def with_uploaded_documents(self, knowledge_base, after=None):
+        """Base + documents des jobs d'ingestion terminés (envois, dossiers surveillés), dans leur ordre,
+        après la date de création after si donnée; un fichier supprimé depuis n'est pas réintégré.
+        Retourne (base, date de création du dernier job réintégré ou after)"""
+        query = {'status': 'done'}
+        if after is not None:
+            query['created_at'] = {'$gt': after}
+        jobs = list(ingestion_jobs_collection.find(query).sort('created_at', 1))
+        chunks = 0
+        for job in jobs:
+            paths = [path for path in job['paths'] if os.path.exists(path)]
+            knowledge_base, report = self.ingestion.ingest(knowledge_base, paths, removed=job.get('removed', ()))
+            chunks += report['chunks']
+        if jobs:
+            logger.info(f"📥 {len(jobs)} jobs d'ingestion réintégrés ({chunks} chunks)")
+            after = jobs[-1]['created_at']
+        return knowledge_base, after
+    
+    def build_replayed_engine(self, knowledge_base, previous=None, after=None):
+        """Moteur sur la base complétée des jobs terminés après after; point de reprise si des jobs ont
+        été réintégrés (ils ne le seront plus au prochain démarrage)"""
+        extended, jobs_through = self.with_uploaded_documents(knowledge_base, after)
+        if previous is not None and extended is knowledge_base:
+            return previous
+        engine = self.build_search_engine(extended, previous=previous)
+        if jobs_through is not None and jobs_through != after:
+            jobs_through = self.applied_jobs_through()
+            if jobs_through is not None:
+                self.save_checkpoint(engine, jobs_through)
+        return engine
+    
+    def restore_checkpoint(self):
+        """Démarre sur le dernier point de reprise; seuls les jobs terminés depuis sont réingérés.
+        False si aucun point de reprise n'est utilisable (absent, illisible ou autre embedder)"""
+        directories = sorted(
+            name for name in os.listdir(CHECKPOINT_FOLDER) if not name.endswith('.partial')
+        ) if os.path.isdir(CHECKPOINT_FOLDER) else []
+        if not directories:
+            return False
+        directory = os.path.join(CHECKPOINT_FOLDER, directories[-1])
+        
+        def build():
+            jobs_through = read_snapshot(directory).get('metadata', {}).get('jobs_through')
+            engine = self.load_snapshot_engine(directory)
+            after = datetime.fromisoformat(jobs_through) if jobs_through else None
+            # Jobs terminés après le point de reprise: index du snapshot restauré mis à jour
+            return self.build_replayed_engine(engine.kb, previous=engine, after=after)
+        
+        try:
+            self.snapshots.rebuild(build, self.on_snapshot_swap)
+        except Exception as e:
+            logger.warning(f"⚠️  Point de reprise {directory} inutilisable, reconstruction complète: {e}")
+            return False
+        return True
+    
+    def applied_jobs_through(self, applied_job=None):
+        """Date de création jusqu'à laquelle tous les jobs sont dans le moteur en construction (None: aucune)
+
+        Appelé pendant la construction d'un snapshot (les constructions sont sérialisées): le moteur
+        contient tous les jobs terminés et ceux déjà appliqués. Avec plusieurs workers, un job peut
+        être appliqué avant un job créé plus tôt et encore en cours: le point de reprise s'arrête au
+        dernier job appliqué qui précède le plus ancien job non appliqué, sans quoi celui-ci ne serait
+        jamais réintégré au redémarrage. applied_job: job appliqué par cette construction.
+        """
+        if applied_job is not None:
+            self._applied_jobs[applied_job['_id']] = applied_job['created_at']
+        unfinished = list(ingestion_jobs_collection.find({'status': {'$in': [QUEUED, RUNNING]}}))
+        unfinished_ids = {job['_id'] for job in unfinished}
+        # Jobs appliqués depuis marqués terminés: plus besoin de les suivre
+        for job_id in [job_id for job_id in self._applied_jobs if job_id not in unfinished_ids]:
+            del self._applied_jobs[job_id]
+        
+        blocking = [job['created_at'] for job in unfinished if job['_id'] not in self._applied_jobs]
+        query = {'status': {'$in': [DONE, FAILED]}}
+        applied = list(self._applied_jobs.values())
+        if blocking:
+            first_unapplied = min(blocking)
+            query['created_at'] = {'$lt': first_unapplied}
+            applied = [created_at for created_at in applied if created_at < first_unapplied]
+        applied += [job['created_at'] for job in ingestion_jobs_collection.find(query).sort('created_at', -1).limit(1)]
+        return max(applied) if applied else None
+    
+    def save_checkpoint(self, engine, jobs_through):
+        """Écrit en arrière-plan le point de reprise d'un moteur incluant les jobs créés jusqu'à
+        jobs_through; au plus un export par CHECKPOINT_INTERVAL, le moteur le plus récent demandé"""
+        self._checkpoint_pending = (engine, jobs_through)
+        if not self._checkpoint_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                while self._checkpoint_pending is not None:
+                    time.sleep(max(0.0, self._checkpoint_at + CHECKPOINT_INTERVAL - time.time()))
+                    engine, jobs_through = self._checkpoint_pending
+                    self._checkpoint_pending = None
+                    directory = os.path.join(CHECKPOINT_FOLDER, datetime.now().strftime('checkpoint-%Y%m%d-%H%M%S-%f'))
+                    os.makedirs(CHECKPOINT_FOLDER, exist_ok=True)
+                    snapshot = export_snapshot(engine, directory, metadata={'jobs_through': jobs_through.isoformat()})
+                    self._checkpoint_at = time.time()
+                    # Points de reprise précédents supprimés (un moteur servi en memory-map garde ses fichiers ouverts)
+                    for name in os.listdir(CHECKPOINT_FOLDER):
+                        if os.path.join(CHECKPOINT_FOLDER, name) != directory and not name.endswith('.partial'):
+                            shutil.rmtree(os.path.join(CHECKPOINT_FOLDER, name), ignore_errors=True)
+                    logger.info(f"💾 Point de reprise {directory} écrit en {snapshot['export_seconds']:.1f}s")
+            except Exception as e:
+                logger.error(f"Erreur écriture du point de reprise: {e}")
+            finally:
+                self._checkpoint_lock.release()
+        
+        threading.Thread(target=run, name='index-checkpoint', daemon=True).start()
+        return True
+    
+    def run_ingestion_job(self, job, on_progress):
+        """Traite un job d'ingestion: base étendue puis nouveau snapshot (le snapshot actif sert les requêtes)"""
+        result = {}
+        
+        def build():
+            # Base lue sous le verrou de construction: jobs et réindexations s'appliquent l'un après l'autre
+            on_progress({'phase': 'ingesting'})
+            knowledge_base, result['ingestion'] = self.ingestion.ingest(
+                self.knowledge_base, job['paths'], on_progress=on_progress, removed=job.get('removed', ())
+            )
+            on_progress({'phase': 'indexing'})
+            # Index du snapshot actif complétés avec les seuls chunks ajoutés ou supprimés
+            engine = self.build_search_engine(knowledge_base, previous=self.snapshots.current)
+            result['jobs_through'] = self.applied_jobs_through(applied_job=job)
+            return engine
+        
+        snapshot = self.snapshots.rebuild(build, self.on_snapshot_swap)
+        result['index_snapshot'] = snapshot.info()
+        # Point de reprise jusqu'au plus ancien job encore en file ou en cours (workers > 1)
+        jobs_through = result.pop('jobs_through')
+        if jobs_through is not None:
+            self.save_checkpoint(snapshot.engine, jobs_through)
+        return result
+    
+    def submit_folder_changes(self, changed, deleted):
+        """Lot de changements d'un dossier surveillé: un job d'ingestion incrémentale (un seul snapshot)"""
+        # Documents désignés par leur chemin relatif au dossier surveillé (homonymes distincts)
+        source = self.ingestion.document_source
+        manifest = getattr(self.knowledge_base, 'manifest', None)
+        if manifest is not None:
+            # Fichiers déjà ingérés à l'identique (scan initial, date modifiée sans changement) ignorés
+            changed = [path for path in changed if not manifest.is_unchanged(source(path), file_digest(path))]
+            deleted = [path for path in deleted if source(path) in manifest.documents]
+        if not changed and not deleted:
+            return None
+        job_id = self.jobs.submit(changed, {'origin': 'watch_folder'},
+                                  removed=[source(path) for path in deleted])
+        logger.info(f"👀 Dossier surveillé: {len(changed)} fichiers modifiés, {len(deleted)} supprimés (job {job_id})")
+        return job_id
+    
+    def on_snapshot_swap(self, snapshot):
+        """La base de connaissances exposée suit le snapshot actif"""
+        self.knowledge_base = snapshot.engine.kb
+        self.chunk_store = snapshot.engine.chunk_store
+        logger.info(f"🔁 Snapshot d'index v{snapshot.version} actif ({len(self.chunk_store)} chunks)")
+        # Nouveaux documents résumés en arrière-plan (les résumés en cache sont déjà appliqués)
+        self.summarize_documents()
+    
+    def apply_cached_summaries(self, engine):
+        """Résumés en cache des documents du moteur appliqués à son index documentaire"""
+        if engine.document_index is None or not self.current_model:
+            return 0
+        summaries = {}
+        for source, digest, _ in iter_documents(engine.kb, engine.chunk_store):
+            entry = self.summary_cache.get(digest, self.current_model)
+            if entry is not None:
+                summaries[source] = entry['summary']
+        return engine.apply_document_summaries(summaries)
+    
+    def summarize_documents(self, sources=None):
+        """Résume en arrière-plan les documents sans résumé en cache (map-reduce, appels Ollama
+        concurrents) puis les applique à l'index documentaire du snapshot actif; False si Ollama est
+        indisponible ou si un résumé est déjà en cours (il reprendra alors sur le snapshot le plus récent)"""
+        if not self.ollama_available or not self.current_model:
+            return False
+        if not self._summary_lock.acquire(blocking=False):
+            self._summary_rerun = True
+            return False
+        
+        def run():
+            targets = sources
+            try:
+                self.summary_status['running'] = True
+                while True:
+                    self._summary_rerun = False
+                    engine = self.search_engine
+                    self.summarizer = DocumentSummarizer(self.client, self.current_model, self.summary_cache,
+                                                         max_concurrency=SUMMARY_CONCURRENCY)
+                    results, errors = self.summarizer.summarize_many(
+                        iter_documents(engine.kb, engine.chunk_store, targets), engine.chunk_store.text
+                    )
+                    applied = 0
+                    if self.search_engine is engine:
+                        applied = engine.apply_document_summaries(
+                            {source: entry['summary'] for source, entry in results.items()}
+                        )
+                    else:
+                        # Snapshot échangé entre-temps: nouveau passage sur le snapshot actif (résumés en cache)
+                        self._summary_rerun = True
+                    self.summary_status['last_run'] = dict(
+                        self.summarizer.report(), documents_applied=applied, errors=errors,
+                        finished_at=datetime.now().isoformat()
+                    )
+                    logger.info(f"📝 Résumés: {self.summarizer.stats['documents']} nouveaux, "
+                                f"{self.summarizer.stats['cache_hits']} en cache, {applied} appliqués")
+                    if not self._summary_rerun:
+                        break
+                    targets = None
+            except Exception as e:
+                logger.error(f"Erreur résumé des documents: {e}")
+                self.summary_status['last_error'] = str(e)
+            finally:
+                self.summary_status['running'] = False
+                self._summary_lock.release()
+        
+        threading.Thread(target=run, name='document-summaries', daemon=True).start()
+        return True
+    
+    def document_summary(self, source):
+        """Résumé en cache d'un document du snapshot actif (None si absent ou pas encore résumé)"""
+        engine = self.search_engine
+        for _, digest, _ in iter_documents(engine.kb, engine.chunk_store, [source]):
+            return self.summary_cache.get(digest, self.current_model) if self.current_model else None
+        return None
+    
+    def snapshot_directory(self, path):
+        """Répertoire d'un snapshot; une archive .tar est d'abord déballée (et vérifiée) dans SNAPSHOT_FOLDER"""
+        if not os.path.isfile(path):
+            return path
+        directory = os.path.join(SNAPSHOT_FOLDER, os.path.splitext(os.path.basename(path))[0])
+        if not os.path.isdir(directory):
+            os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+            unpack_snapshot(path, directory)
+        return directory
+    
+    def load_snapshot_engine(self, path):
+        """Moteur restauré d'un snapshot exporté (stores en memory-map, index repris tels quels)"""
+        directory = self.snapshot_directory(path)
+        current = self.snapshots.current
+        engine = load_snapshot(directory, self.embedder,
+                               cross_encoder=current._cross_encoder if current is not None else None,
+                               prompt_engine=self.prompt_engine)
+        self.apply_cached_summaries(engine)
+        logger.info(f"📦 Snapshot {directory} importé en {engine.build_timings['snapshot_load_s']:.2f}s "
+                    f"({len(engine.chunk_store)} chunks)")
+        return engine
+    
+    def export_snapshot(self):
+        """Exporte le snapshot d'index actif dans SNAPSHOT_FOLDER; retourne (répertoire, description)"""
+        snapshot = self.snapshots.active
+        directory = os.path.join(SNAPSHOT_FOLDER, datetime.now().strftime('kb-%Y%m%d-%H%M%S') + f"-v{snapshot.version}")
+        os.makedirs(SNAPSHOT_FOLDER, exist_ok=True)
+        return directory, export_snapshot(snapshot.engine, directory)
+    
+    def import_snapshot(self, path):
+        """Remplace la base servie par un snapshot importé (échange à chaud)"""
+        return self.snapshots.rebuild(lambda: self.load_snapshot_engine(path), self.on_snapshot_swap)
+    
+    def reindex(self):
+        """Reconstruit les index sur les stores du snapshot actif, en arrière-plan (TF-IDF réajusté,
+        déduplication refaite); le snapshot actif sert les requêtes jusqu'à l'échange"""
+        return self.snapshots.rebuild_async(self.build_search_engine, self.on_snapshot_swap)
+    
+    def initialize_ollama(self):
+        """Initialise Ollama avec la base de connaissances - VERSION CORRIGÉE"""
+        try:
+            logger.info("🚀 Initialisation du chatbot RAG amélioré...")
+            
+            # CORRECTION: Récupérer les modèles disponibles avec gestion d'erreur
+            try:
+                models_response = self.client.list()
+                logger.info(f"📡 Réponse brute d'Ollama: {models_response}")
+                
+                # CORRECTION: Gérer les différentes structures de réponse
+                if isinstance(models_response, dict) and 'models' in models_response:
+                    self.available_models = [model['name'] for model in models_response['models']]
+                elif isinstance(models_response, list):
+                    self.available_models = [model['name'] for model in models_response if 'name' in model]
+                else:
+                    # Fallback: essayer une autre méthode
+                    self.available_models = self._get_models_fallback()
+                    
+            except Exception as e:
+                logger.error(f"❌ Erreur récupération modèles: {e}")
+                self.available_models = self._get_models_fallback()
+            
+            if not self.available_models:
+                logger.error("❌ Aucun modèle Ollama trouvé")
+                logger.info("💡 Vérifiez qu'Ollama est démarré: ollama serve")
+                logger.info("💡 Téléchargez un modèle: ollama pull llama3.2")
+                return
+            
+            logger.info(f"📋 Modèles disponibles: {self.available_models}")
+            
+            # Sélectionner le meilleur modèle
+            self.current_model = self.choose_best_model()
+            self.ollama_available = True
+            
+            # Test de connexion
+            test_result = self.test_connection()
+            
+            logger.info("✅ Chatbot RAG amélioré initialisé")
+            logger.info(f"📊 Modèle sélectionné: {self.current_model}")
+            logger.info(f"📚 Base de connaissances: {len(self.knowledge_base.chunks)} chunks")
+            logger.info(f"🎯 RAG Amélioré: {'ACTIVE' if self.rag_enhanced else 'BASIQUE'}")
+            logger.info(f"🔗 Test de connexion: {'Réussi' if test_result else 'Échoué'}")
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur d'initialisation: {e}")
+            import traceback
+            logger.error(f"🔍 Détails: {traceback.format_exc()}")
+
+    def _get_models_fallback(self):
+        """Méthode de fallback pour récupérer les modèles"""
+        try:
+            import requests
+            response = requests.get("http://127.0.0.1:11434/api/tags", timeout=10)
+            if response.status_code == 200:
+                data = response.json()
+                if 'models' in data:
+                    return [model['name'] for model in data['models']]
+            return []
+        except Exception as e:
+            logger.error(f"❌ Fallback échoué: {e}")
+            return []
+    def choose_best_model(self):
+        """Choisit le meilleur modèle disponible"""
+        preferred_models = ["llama3.2", "mistral", "llama2", "codellama"]
+        
+        for model_name in preferred_models:
+            for available_model in self.available_models:
+                if model_name in available_model.lower():
+                    return available_model
+        
+        return self.available_models[0] if self.available_models else None
+    
+    def test_connection(self):
+        """Teste la connexion à Ollama"""
+        try:
+            if not self.current_model:
+                return False
+                
+            response = self.client.chat(
+                model=self.current_model,
+                messages=[{'role': 'user', 'content': 'Test de connexion - reponds OK'}]
+            )
+            return response is not None
+        except Exception as e:
+            logger.error(f"❌ Test de connexion echoue: {e}")
+            return False
+
+    def get_conversation_history(self, conversation_id, max_turns=3):
+        """Récupère l'historique de conversation"""
+        if conversation_id not in self.conversation_memory:
+            return ""
+        
+        history = self.conversation_memory[conversation_id][-max_turns:]
+        context = "\n## Historique récent de la conversation:\n"
+        
+        for turn in history:
+            context += f"**Utilisateur**: {turn['user']}\n"
+            context += f"**Assistant**: {turn['assistant'][:200]}...\n\n"
+        
+        return context
+
+    def add_to_conversation_history(self, conversation_id, user_message, ai_response):
+        """Ajoute une interaction à l'historique"""
+        if conversation_id not in self.conversation_memory:
+            self.conversation_memory[conversation_id] = []
+        
+        self.conversation_memory[conversation_id].append({
+            'user': user_message,
+            'assistant': ai_response,
+            'timestamp': datetime.now()
+        })
+        
+        # Garder seulement les 10 dernières interactions
+        if len(self.conversation_memory[conversation_id]) > 10:
+            self.conversation_memory[conversation_id] = self.conversation_memory[conversation_id][-10:]
+
+    def lookup_table(self, question):
+        """Valeur d'une table extraite désignée par la question (ex: "qx à 65 ans table TH00-02"), sinon None"""
+        table_store = getattr(self.knowledge_base, 'table_store', None)
+        if table_store is None:
+            return None
+        return table_store.lookup(question)
+    
+    def format_table_answer(self, lookup):
+        """Réponse lue directement dans la table (aucune génération)"""
+        value = lookup['value']
+        if lookup['column'] is None:
+            return f"{self.format_table_context(lookup)}\n\n_Source: {lookup['source']}, page {lookup['page']}_"
+        if value is None:
+            return (f"La table **{lookup['table']}** ne donne pas de valeur de **{lookup['column']}** pour "
+                    f"{lookup['key_column']} = {lookup['key']}.")
+        return (f"D'après la table **{lookup['table']}**, {lookup['column']} pour {lookup['key_column']} = "
+                f"{lookup['key']} : **{value}**\n\n_Source: {lookup['source']}, page {lookup['page']}_")
+    
+    def format_table_context(self, lookup):
+        """Ligne de table correspondant à la question, transmise au LLM comme contexte"""
+        cells = ', '.join(f"{name} = {value}" for name, value in lookup['row'].items() if value is not None)
+        return f"Table {lookup['table']} ({lookup['source']}, page {lookup['page']}), ligne {cells}"
+    
+    def enhanced_search(self, query, top_k=5, max_chars=None, engine=None):
+        """Recherche améliorée avec le système hybride si disponible"""
+        query = QueryContext.of(query)
+        # Un seul snapshot pour toute la requête, même si un échange a lieu entre-temps
+        engine = engine or (self.search_engine if self.rag_enhanced else None)
+        if engine is not None:
+            try:
+                # Citation explicite (ex: "Article 101 Solvabilité II"): lecture directe de l'index
+                citation_results = engine.citation_search(query, top_k=top_k, max_chars=max_chars)
+                if citation_results:
+                    logger.info("📜 Réponse depuis l'index des citations réglementaires")
+                    return citation_results
+                
+                logger.info("🔍 Utilisation de la recherche hybride avancée")
+                expand = len(query.normalized.split()) <= SHORT_QUERY_WORDS
+                results = engine.hybrid_search(query, top_k=top_k, expand=expand, max_chars=max_chars)
+                return results
+            except Exception as e:
+                logger.error(f"❌ Recherche hybride echouee, mode dégradé: {e}")
+            
+            # Mode dégradé du même moteur (recherche sémantique seule sur le store vectoriel partagé)
+            try:
+                return engine.basic_search(query, top_k=top_k, max_chars=max_chars)
+            except Exception as e:
+                logger.error(f"❌ Recherche dégradée echouee: {e}")
+                return []
+        
+        # Fallback à la recherche basique (modules RAG avancés indisponibles)
+        logger.info("🔍 Utilisation de la recherche basique")
+        return self.knowledge_base.search_similar_chunks(query.query, top_k=top_k)
+
+    def build_enhanced_context(self, search_results):
+        """Construit un contexte enrichi à partir des résultats de recherche"""
+        if not search_results:
+            return "Aucun contexte spécifique disponible dans la base de connaissances."
+        
+        context_parts = ["## Contexte documentaire (sources spécialisées):"]
+        
+        for i, result in enumerate(search_results[:3]):  # Top 3 résultats
+            source = result.get('metadata', {}).get('source', 'Document technique')
+            content = result['chunk'][:800] + "..." if len(result['chunk']) > 800 else result['chunk']
+            
+            context_parts.append(f"**Source {i+1}** ({source}):\n{content}")
+        
+        return "\n\n".join(context_parts)
+
+    def create_enhanced_system_prompt(self, context, query, conversation_history=""):
+        """Crée un prompt système enrichi avec les nouveaux composants"""
+        if self.rag_enhanced:
+            try:
+                # Détection du domaine avec le nouveau moteur
+                domain = self.prompt_engine.detect_domain(query, context)
+                return self.prompt_engine.create_dynamic_prompt(query, context, conversation_history, domain)
+            except Exception as e:
+                logger.error(f"❌ Prompt engine echoue, fallback basique: {e}")
+        
+        # Fallback au prompt basique
+        base_prompt = """Tu es un expert senior en finance et actuariat avec accès à une base de connaissances spécialisée.
+
+DOMAINES D'EXPERTISE:
+- Actuariat et assurances (vie, dommages, reassurance)
+- Risk Management et regulation Bale III/IV
+- Finance quantitative et produits derives
+- IFRS 17 et normes comptables
+- Modelisation financiere et ALM
+
+INSTRUCTIONS IMPORTANTES:
+1. Base tes reponses sur le contexte fourni provenant de documents specialises
+2. Sois precis et technique dans tes explications
+3. Structure tes reponses de maniere claire
+4. Mentionne les concepts specifiques quand c'est pertinent
+5. Si le contexte ne couvre pas completement la question, utilise tes connaissances generales
+6. Reponds toujours en francais
+
+CONTEXTE DOCUMENTAIRE:
+{context}
+
+HISTORIQUE CONVERSATIONNEL:
+{history}
+
+REPONDS EN FRANCAIS de maniere technique, precise et structuree."""
+
+        return base_prompt.format(context=context, history=conversation_history)
+
+    def generate_rag_response(self, user_message, conversation_id=None):
+        """Génère une réponse en utilisant RAG amélioré"""
+        try:
+            # Valeur de table demandée seule: lecture directe dans le store de tables, sans recherche ni LLM
+            start_lookup = time.time()
+            lookup = self.lookup_table(user_message)
+            if lookup is not None and lookup['direct']:
+                ai_response = self.format_table_answer(lookup)
+                if conversation_id:
+                    self.add_to_conversation_history(conversation_id, user_message, ai_response)
+                logger.info(f"📐 Réponse lue dans la table {lookup['table']}")
+                return ai_response, {
+                    'total_time': round(time.time() - start_lookup, 4),
+                    'rag_enhanced': self.rag_enhanced,
+                    'table_lookup': lookup
+                }
+            
+            if not self.ollama_available:
+                return self.get_fallback_response(user_message), {}
+            
+            logger.info(f"🎯 Generation reponse RAG pour: {user_message}")
+            
+            # Récupérer l'historique de conversation
+            conversation_history = ""
+            if conversation_id:
+                conversation_history = self.get_conversation_history(conversation_id)
+            
+            # Requête normalisée une fois pour la recherche, le prompt et l'évaluation
+            query = QueryContext(user_message)
+            
+            # 1. Recherche améliorée dans la base de connaissances
+            start_search = time.time()
+            search_results = self.enhanced_search(query, top_k=5)
+            search_time = time.time() - start_search
+            
+            # 2. Construction du contexte (ligne de table désignée par la question en tête)
+            context = self.build_enhanced_context(search_results)
+            if lookup is not None:
+                context = f"## Valeurs de table:\n{self.format_table_context(lookup)}\n\n{context}"
+            
+            # 3. Construction du prompt amélioré
+            system_prompt = self.create_enhanced_system_prompt(context, query, conversation_history)
+            
+            # 4. Génération de la réponse
+            start_generation = time.time()
+            
+            response = self.client.chat(
+                model=self.current_model,
+                messages=[
+                    {
+                        'role': 'system',
+                        'content': system_prompt
+                    },
+                    {
+                        'role': 'user', 
+                        'content': user_message
+                    }
+                ],
+                options={
+                    'temperature': 0.7,
+                    'top_p': 0.9,
+                    'num_predict': 2000
+                }
+            )
+            
+            generation_time = time.time() - start_generation
+            total_time = search_time + generation_time
+            
+            if response and 'message' in response and 'content' in response['message']:
+                ai_response = response['message']['content'].strip()
+                
+                # 5. Évaluation de la réponse (si disponible)
+                if self.rag_enhanced:
+                    try:
+                        self.evaluator.log_interaction(query, ai_response, context)
+                    except Exception as e:
+                        logger.error(f"⚠️  Erreur evaluation: {e}")
+                
+                # 6. Mise à jour de l'historique
+                if conversation_id:
+                    self.add_to_conversation_history(conversation_id, user_message, ai_response)
+                
+                logger.info(f"✅ Reponse RAG generee en {total_time:.2f}s (recherche: {search_time:.2f}s)")
+                logger.info(f"📊 Longueur: {len(ai_response)} caracteres")
+                
+                metadata = {
+                    'search_time': round(search_time, 2),
+                    'generation_time': round(generation_time, 2),
+                    'total_time': round(total_time, 2),
+                    'search_results_count': len(search_results),
+                    'rag_enhanced': self.rag_enhanced,
+                    'context_length': len(context),
+                    'table_lookup': lookup
+                }
+                
+                return ai_response, metadata
+            else:
+                logger.error("❌ Reponse Ollama invalide")
+                return self.get_fallback_response(user_message), {}
+                
+        except Exception as e:
+            logger.error(f"❌ Erreur generation RAG: {e}")
+            return self.get_fallback_response(user_message), {}
+    
+    def get_fallback_response(self, user_message):
+        """Réponse de fallback si RAG échoue"""
+        fallback_responses = {
+            'actuariat': """
+**L'ACTUARIAT - Science des Risques et Assurances**
+
+L'actuariat est une discipline qui applique des méthodes mathématiques et statistiques pour évaluer les risques financiers dans les domaines de l'assurance, de la finance et de la prévoyance sociale.
+
+**Domaines Principaux:**
+• **Assurance Vie** : Calcul des primes, réserves mathématiques, tables de mortalité
+• **Assurance Dommages** : Tarification IARD, provisionnement des sinistres
+• **Régimes de Retraite** : Gestion des pensions, financement
+• **Risk Management** : Solvabilité II, capital économique, stress testing
+
+*Réponse basée sur notre base de connaissances spécialisée*
+""",
+            'bâle': """
+**RÉGULATION BÂLE III/IV**
+
+**Bâle III** renforce les exigences de capital après la crise de 2008:
+• Ratio CET1 minimum : 4.5% + 2.5% buffer = 7%
+• Ratio de levier : 3% minimum
+• Liquidité : LCR (100%) et NSFR (100%)
+
+**Bâle IV** (finalisation de Bâle III):
+• Sortie des approches standardisées
+• Restrictions sur les modèles internes
+• Meilleure comparabilité internationale
+
+*Réponse basée sur notre base de connaissances réglementaire*
+""",
+            'ifrs': """
+**IFRS 17 - Contrats d'Assurance**
+
+Nouvelle norme comptable internationale pour les contrats d'assurance:
+
+**Principales Caractéristiques:**
+• Modèle de mesure unique (VFA, PAA, BBA)
+• Reconnaissance des profits sur la durée du contrat
+• Meilleure comparabilité internationale
+• Transparence accrue sur la performance
+
+*Réponse basée sur notre base de connaissances comptables*
+"""
+        }
+        
+        user_lower = user_message.lower()
+        for keyword, response in fallback_responses.items():
+            if keyword in user_lower:
+                return response
+        
+        return f"""
+**🤖 Assistant Expert Finance & Actuariat**
+
+Votre question : "{user_message}"
+
+Je consulte actuellement notre base de connaissances spécialisée contenant des documents techniques en finance et actuariat.
+
+**Domaines Couverts:**
+- Risk Management & Régulation Bâle
+- Actuariat & Assurances (vie, non-vie, santé)
+- Finance Quantitative & Produits Dérivés
+- Normes IFRS 17 & Comptabilité
+- Modélisation Financière & ALM
+
+Veuillez patienter pendant que je recherche les informations les plus pertinentes dans nos documents techniques.
+"""
+
+# Initialisation globale
+chatbot = EnhancedRAGChatbot()
+
+@app.route('/')
+def home():
+    return jsonify({
+        "status": "active",
+        "service": "Chatbot Finance & Actuariat - Enhanced RAG System",
+        "ollama_available": chatbot.ollama_available,
+        "current_model": chatbot.current_model,
+        "knowledge_base_chunks": len(chatbot.knowledge_base.chunks),
+        "available_models": chatbot.available_models,
+        "rag_enhanced": chatbot.rag_enhanced,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/health', methods=['GET'])
+def health_check():
+    # Rapport de performance si disponible
+    performance_report = {}
+    if chatbot.rag_enhanced:
+        try:
+            performance_report = chatbot.evaluator.get_performance_report()
+        except:
+            pass
+    
+    return jsonify({
+        "status": "healthy" if chatbot.ollama_available else "unhealthy",
+        "ollama_available": chatbot.ollama_available,
+        "current_model": chatbot.current_model,
+        "knowledge_base_chunks": len(chatbot.knowledge_base.chunks),
+        "available_models": chatbot.available_models,
+        "rag_enhanced": chatbot.rag_enhanced,
+        "performance_metrics": performance_report,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/chat', methods=['POST', 'OPTIONS'])
+def chat_endpoint():
+    if request.method == 'OPTIONS':
+        return jsonify({"status": "ok"})
+    
+    try:
+        data = request.get_json()
+        user_message = data.get('message', '').strip()
+        conversation_id = data.get('conversation_id', f"conv_{int(time.time())}")
+
+        if not user_message:
+            return jsonify({"error": "Message vide"}), 400
+
+        logger.info(f"💬 Question RAG: {user_message}")
+
+        start_time = time.time()
+        
+        # Utiliser le système RAG amélioré
+        ai_response, metadata = chatbot.generate_rag_response(user_message, conversation_id)
+        
+        processing_time = time.time() - start_time
+
+        # Sauvegarde dans MongoDB
+        conversations_collection.insert_one({
+            "conversation_id": conversation_id,
+            "user_message": user_message,
+            "ai_response": ai_response,
+            "ai_used": True,
+            "rag_used": True,
+            "rag_enhanced": chatbot.rag_enhanced,
+            "model": chatbot.current_model,
+            "knowledge_base_used": len(chatbot.knowledge_base.chunks) > 0,
+            "processing_time": round(processing_time, 2),
+            "search_time": metadata.get('search_time', 0),
+            "generation_time": metadata.get('generation_time', 0),
+            "search_results_count": metadata.get('search_results_count', 0),
+            "timestamp": datetime.now()
+        })
+
+        logger.info("✅ Réponse RAG envoyée et sauvegardée")
+        
+        response_data = {
+            "response": ai_response,
+            "status": "success",
+            "ai_used": True,
+            "rag_used": True,
+            "rag_enhanced": chatbot.rag_enhanced,
+            "processing_time": round(processing_time, 2),
+            "search_time": metadata.get('search_time', 0),
+            "generation_time": metadata.get('generation_time', 0),
+            "search_results_count": metadata.get('search_results_count', 0),
+            "table_lookup": metadata.get('table_lookup'),
+            "model": chatbot.current_model,
+            "knowledge_base_used": len(chatbot.knowledge_base.chunks) > 0,
+            "timestamp": datetime.now().isoformat()
+        }
+        
+        return jsonify(response_data)
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur globale: {e}")
+        return jsonify({
+            "error": "Erreur interne du serveur",
+            "details": str(e)
+        }), 500
+
+@app.route('/api/search', methods=['POST'])
+def search_knowledge_base():
+    """Endpoint pour rechercher directement dans la base de connaissances"""
+    try:
+        data = request.get_json()
+        query = data.get('query', '').strip()
+        
+        if not query:
+            return jsonify({"error": "Requête vide"}), 400
+        
+        # Utiliser la recherche améliorée (texte tronqué dès la matérialisation)
+        engine = chatbot.search_engine if chatbot.rag_enhanced else None
+        results = chatbot.enhanced_search(query, top_k=5, max_chars=500, engine=engine)
+        
+        return jsonify({
+            "query": query,
+            "results_found": len(results),
+            "rag_enhanced": chatbot.rag_enhanced,
+            "search_stats": engine.last_search_stats if engine is not None else {},
+            "results": [
+                {
+                    "content": result['chunk'][:500] + "..."
+                    if len(result['chunk']) > 500 or result.get('truncated') else result['chunk'],
+                    "source": result.get('metadata', {}).get('source', 'Document'),
+                    "similarity_score": round(result.get('similarity_score', result.get('combined_score', 0)), 4),
+                    "search_type": result.get('search_type', 'hybrid')
+                }
+                for result in results
+            ],
+            "timestamp": datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": str(e)
+        }), 500
+
+@app.route('/api/system-status', methods=['GET'])
+def system_status():
+    """Statut détaillé du système"""
+    performance_report = {}
+    improvements = []
+    
+    if chatbot.rag_enhanced:
+        try:
+            performance_report = chatbot.evaluator.get_performance_report()
+            improvements = chatbot.evaluator.identify_improvement_areas()
+        except Exception as e:
+            logger.error(f"Erreur récupération statut: {e}")
+    
+    return jsonify({
+        "ollama_available": chatbot.ollama_available,
+        "current_model": chatbot.current_model,
+        "knowledge_base_chunks": len(chatbot.knowledge_base.chunks),
+        "rag_components_operational": chatbot.rag_enhanced,
+        "performance_metrics": performance_report,
+        "improvement_suggestions": improvements,
+        "rerank_cascade": chatbot.search_engine.rerank_counters if chatbot.rag_enhanced else {},
+        "index_snapshot": chatbot.snapshots.report() if chatbot.rag_enhanced else {},
+        "hot_tier": chatbot.search_engine.hot_tier_report() if chatbot.rag_enhanced else {},
+        "ingestion_jobs": chatbot.jobs.counts() if chatbot.rag_enhanced else {},
+        "watch_folders": chatbot.watcher.report() if chatbot.rag_enhanced and chatbot.watcher else {},
+        "document_summaries": dict(chatbot.summary_status, cached=len(chatbot.summary_cache))
+        if chatbot.rag_enhanced else {},
+        "conversations_in_memory": len(chatbot.conversation_memory),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/kb-stats', methods=['GET'])
+def knowledge_base_stats():
+    """Statistiques de la base de connaissances"""
+    # Statistiques lues sur un même snapshot
+    engine = chatbot.search_engine if chatbot.rag_enhanced else None
+    knowledge_base = engine.kb if engine is not None else chatbot.knowledge_base
+    chunk_store = engine.chunk_store if engine is not None else chatbot.chunk_store
+    return jsonify({
+        "total_chunks": len(knowledge_base.chunks),
+        "index_created": knowledge_base.index is not None or getattr(knowledge_base, 'vector_store', None) is not None,
+        "vector_store": engine.vector_store.report() if engine is not None else {},
+        "manifest": knowledge_base.manifest.report() if getattr(knowledge_base, 'manifest', None) else {},
+        "rag_enhanced": chatbot.rag_enhanced,
+        "sources": chunk_store.distinct('source') or ['Unknown'],
+        "store_bytes": chunk_store.nbytes(),
+        "text_compression": chunk_store.compression_report(),
+        "deduplication": engine.dedup_report if engine is not None else {},
+        "chunk_fit": engine.chunk_fit_report if engine is not None else {},
+        "tables": knowledge_base.table_store.report() if getattr(knowledge_base, 'table_store', None) else {},
+        "snapshot": getattr(knowledge_base, 'snapshot', None) or {},
+        "domain_partitions": engine.domain_partitions.report()
+        if engine is not None and engine.domain_partitions else {},
+        "binary_prefilter": engine.binary_report if engine is not None else {},
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/reindex', methods=['GET', 'POST'])
+def reindex_knowledge_base():
+    """POST: reconstruit l'index en arrière-plan puis l'échange à chaud; GET: état des snapshots"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Recherche hybride non disponible"}), 503
+    
+    if request.method == 'POST':
+        started = chatbot.reindex()
+        return jsonify({
+            "started": started,
+            "message": "Reconstruction lancée" if started else "Reconstruction déjà en cours",
+            "index_snapshot": chatbot.snapshots.report(),
+            "timestamp": datetime.now().isoformat()
+        }), 202 if started else 409
+    
+    return jsonify({
+        "index_snapshot": chatbot.snapshots.report(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/documents', methods=['POST'])
+def upload_documents():
+    """Enregistre les documents envoyés (multipart, champ 'files') et crée un job d'ingestion en arrière-plan"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Ingestion non disponible"}), 503
+    
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f and f.filename]
+    if not files:
+        return jsonify({"error": "Aucun document envoyé"}), 400
+    rejected = [f.filename for f in files if os.path.splitext(f.filename)[1].lower() not in SUPPORTED_EXTENSIONS]
+    if rejected:
+        return jsonify({
+            "error": "Format non supporté",
+            "rejected": rejected,
+            "supported": list(SUPPORTED_EXTENSIONS)
+        }), 400
+    
+    directory = os.path.join(UPLOAD_FOLDER, datetime.now().strftime('%Y%m%d-%H%M%S-') + uuid.uuid4().hex[:8])
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for position, f in enumerate(files):
+        extension = os.path.splitext(f.filename)[1].lower()
+        filename = secure_filename(f.filename) or f"document_{position}{extension}"
+        path = os.path.join(directory, filename)
+        f.save(path)
+        paths.append(path)
+    
+    job_id = chatbot.jobs.submit(paths, {'filenames': [f.filename for f in files]})
+    logger.info(f"📥 Job d'ingestion {job_id}: {len(paths)} documents")
+    return jsonify({
+        "job_id": job_id,
+        "status_url": f"/api/jobs/{job_id}",
+        "documents": [os.path.basename(path) for path in paths],
+        "timestamp": datetime.now().isoformat()
+    }), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def ingestion_job_status(job_id):
+    """État d'un job d'ingestion: statut, phase, pages extraites, chunks encodés, temps restant estimé"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Ingestion non disponible"}), 503
+    job = chatbot.jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job inconnu"}), 404
+    return jsonify(job_to_json(job))
+
+@app.route('/api/tables', methods=['GET'])
+def list_tables():
+    """Tables extraites des documents (identité, colonnes, types, dimensions)"""
+    table_store = getattr(chatbot.knowledge_base, 'table_store', None)
+    tables = table_store.tables if table_store is not None else []
+    return jsonify({
+        "tables": [table.describe() for table in tables],
+        "count": len(tables),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/tables/lookup', methods=['GET'])
+def lookup_table_value():
+    """Valeur lue dans une table: GET /api/tables/lookup?q=qx à 65 ans table TH00-02"""
+    question = request.args.get('q', '').strip()
+    if not question:
+        return jsonify({"error": "Paramètre q manquant"}), 400
+    lookup = chatbot.lookup_table(question)
+    if lookup is None:
+        return jsonify({"error": "Aucune table ne correspond à la question"}), 404
+    return jsonify(dict(lookup, answer=chatbot.format_table_answer(lookup)))
+
+@app.route('/api/summaries', methods=['GET', 'POST'])
+def list_document_summaries():
+    """GET: résumés en cache des documents de la base; POST: résume en arrière-plan les documents manquants"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Résumés non disponibles"}), 503
+    
+    if request.method == 'POST':
+        if not chatbot.ollama_available:
+            return jsonify({"error": "Ollama non disponible"}), 503
+        started = chatbot.summarize_documents()
+        return jsonify({
+            "started": started,
+            "message": "Résumé lancé" if started else "Résumé déjà en cours (reprise sur la base la plus récente)",
+            "status": chatbot.summary_status,
+            "timestamp": datetime.now().isoformat()
+        }), 202
+    
+    engine = chatbot.search_engine
+    summaries = []
+    for source, digest, _ in iter_documents(engine.kb, engine.chunk_store):
+        entry = chatbot.summary_cache.get(digest, chatbot.current_model) if chatbot.current_model else None
+        summaries.append({"source": source, "summarized": entry is not None,
+                          "summary": entry['summary'] if entry else None})
+    return jsonify({
+        "summaries": summaries,
+        "status": chatbot.summary_status,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/summaries/<path:source>', methods=['GET'])
+def get_document_summary(source):
+    """Résumé d'un document; 202 si le résumé vient d'être lancé en arrière-plan"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Résumés non disponibles"}), 503
+    if chatbot.search_engine.chunk_store.code('source', source) is None:
+        return jsonify({"error": "Document inconnu"}), 404
+    entry = chatbot.document_summary(source)
+    if entry is not None:
+        return jsonify(entry)
+    if not chatbot.ollama_available:
+        return jsonify({"error": "Ollama non disponible"}), 503
+    chatbot.summarize_documents([source])
+    return jsonify({"source": source, "status": chatbot.summary_status}), 202
+
+@app.route('/api/snapshots', methods=['GET', 'POST'])
+def knowledge_snapshots():
+    """POST: exporte la base servie (chunks, vecteurs, index lexical, métadonnées, empreintes SHA-256);
+    GET: snapshots exportés"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Snapshots non disponibles"}), 503
+    
+    if request.method == 'POST':
+        directory, snapshot = chatbot.export_snapshot()
+        logger.info(f"📦 Snapshot exporté: {directory} ({snapshot['bytes'] / 1024 ** 2:.1f} Mo)")
+        return jsonify({
+            "path": directory,
+            "counts": snapshot['counts'],
+            "bytes": snapshot['bytes'],
+            "files": len(snapshot['files']),
+            "export_seconds": snapshot['export_seconds'],
+            "timestamp": datetime.now().isoformat()
+        }), 201
+    
+    snapshots = []
+    if os.path.isdir(SNAPSHOT_FOLDER):
+        for name in sorted(os.listdir(SNAPSHOT_FOLDER)):
+            try:
+                snapshot = read_snapshot(os.path.join(SNAPSHOT_FOLDER, name))
+            except SnapshotError:
+                continue
+            snapshots.append({"path": os.path.join(SNAPSHOT_FOLDER, name), "created_at": snapshot['created_at'],
+                              "counts": snapshot['counts'], "bytes": snapshot['bytes']})
+    return jsonify({
+        "snapshots": snapshots,
+        "active": getattr(chatbot.knowledge_base, 'snapshot', None) or {},
+        "timestamp": datetime.now().isoformat()
+    })
+
+def snapshot_import_path(path):
+    """Chemin réel d'un snapshot à importer (relatif à SNAPSHOT_FOLDER ou absolu); None s'il sort de
+    SNAPSHOT_FOLDER une fois liens symboliques et '..' résolus"""
+    folder = os.path.realpath(SNAPSHOT_FOLDER)
+    resolved = os.path.realpath(os.path.join(folder, path))
+    if resolved == folder or os.path.commonpath([folder, resolved]) != folder:
+        return None
+    return resolved
+
+@app.route('/api/snapshots/import', methods=['POST'])
+def import_knowledge_snapshot():
+    """Importe un snapshot de SNAPSHOT_FOLDER ({"path": répertoire ou archive .tar}): empreintes
+    vérifiées, stores en memory-map, puis échange à chaud avec la base servie. Requiert le jeton
+    SNAPSHOT_IMPORT_TOKEN (en-tête Authorization: Bearer <jeton>)"""
+    if not chatbot.rag_enhanced:
+        return jsonify({"error": "Snapshots non disponibles"}), 503
+    if not SNAPSHOT_IMPORT_TOKEN:
+        return jsonify({"error": "Import de snapshot désactivé (SNAPSHOT_IMPORT_TOKEN)"}), 403
+    authorization = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(authorization.encode(), f"Bearer {SNAPSHOT_IMPORT_TOKEN}".encode()):
+        return jsonify({"error": "Jeton d'import invalide"}), 401
+    path = (request.get_json(silent=True) or {}).get('path', '').strip()
+    path = snapshot_import_path(path) if path else None
+    if path is None:
+        return jsonify({"error": f"Le snapshot doit se trouver dans {SNAPSHOT_FOLDER}"}), 400
+    if not os.path.exists(path):
+        return jsonify({"error": "Chemin de snapshot introuvable"}), 400
+    try:
+        snapshot = chatbot.import_snapshot(path)
+    except SnapshotError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "index_snapshot": snapshot.info(),
+        "snapshot": chatbot.knowledge_base.snapshot,
+        "load_seconds": round(snapshot.engine.build_timings['snapshot_load_s'], 3),
+        "timestamp": datetime.now().isoformat()
+    })
+
+if __name__ == '__main__':
+    print("=" * 70)
+    print("🤖 CHATBOT FINANCE & ACTUARIAT - SYSTÈME RAG AMÉLIORÉ")
+    print("=" * 70)
+    print(f"🌐 URL: http://localhost:5001")
+    print(f"🔗 Ollama: {'CONNECTÉ' if chatbot.ollama_available else 'HORS LIGNE'}")
+    print(f"🧠 Modèle: {chatbot.current_model or 'Aucun'}")
+    print(f"📚 Base de connaissances: {len(chatbot.knowledge_base.chunks)} chunks")
+    print(f"🎯 RAG Amélioré: {'ACTIVÉ' if chatbot.rag_enhanced else 'DÉSACTIVÉ'}")
+    print(f"💊 Health: http://localhost:5001/api/health")
+    print(f"🔍 Recherche: POST http://localhost:5001/api/search")
+    print(f"📊 Statut: GET http://localhost:5001/api/system-status")
+    print(f"🔁 Réindexation: POST http://localhost:5001/api/reindex")
+    print(f"📥 Documents: POST http://localhost:5001/api/documents (suivi: GET /api/jobs/<id>)")
+    print(f"👀 Dossiers surveillés: {', '.join(WATCH_FOLDERS) or 'aucun (INGESTION_WATCH_FOLDERS)'}")
+    print(f"📝 Résumés: GET http://localhost:5001/api/summaries/<document>")
+    print(f"📦 Snapshots: POST http://localhost:5001/api/snapshots (réplique: KB_SNAPSHOT={KB_SNAPSHOT or '-'})")
+    print(f"📐 Tables: GET http://localhost:5001/api/tables/lookup?q=qx à 65 ans table TH00-02")
+    print("=" * 70)
+    
+    app.run(debug=True, host='0.0.0.0', port=5001, use_reloader=False)
\ No newline at end of file
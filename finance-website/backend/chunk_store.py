@@ -0,0 +1,667 @@
+# backend/chunk_store.py
+import bisect
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class CompressedTextBlocks:
+    """Texte des chunks compressé par blocs (zstd + dictionnaire entraîné, zlib en fallback)
+
+    Les blocs sont regroupés en parties: une partie couvre des chunks consécutifs, par blocs de
+    block_size chunks (le dernier bloc d'une partie peut être incomplet). Les chunks ajoutés forment
+    une nouvelle partie compressée avec le dictionnaire existant (appended), les parties précédentes
+    sont partagées sans être relues ni recompressées.
+    """
+
+    BLOCKS_FILE = 'text_blocks.bin'
+    BLOCK_OFFSETS_FILE = 'text_block_offsets.npy'
+    DICTIONARY_FILE = 'text_blocks.dict'
+
+    def __init__(self, parts, block_size, codec, dictionary=None, cache_blocks=64, level=9):
+        # Parties: (premier chunk, premier bloc, blocs compressés np.uint8, offsets des blocs np.int64)
+        self.parts = list(parts)
+        self.part_chunks = [part[0] for part in self.parts]
+        self.part_blocks = [part[1] for part in self.parts]
+        self.block_size = block_size          # nombre de chunks par bloc
+        self.codec = codec                    # 'zstd' ou 'zlib'
+        self.dictionary = dictionary          # dictionnaire zstd entraîné (bytes) ou None
+        self.cache_blocks = cache_blocks
+        self.level = level
+
+        self._cache = OrderedDict()           # LRU bloc -> octets décompressés
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()       # coût de décodage par requête (par thread)
+        self.totals = {'blocks_decoded': 0, 'cache_hits': 0, 'decode_seconds': 0.0}
+
+        # Les décompresseurs zstd ne sont pas thread-safe: un par thread
+        self._decompressors = threading.local()
+
+    @staticmethod
+    def _blocks(text_buffer, offsets, block_size):
+        count = len(offsets) - 1
+        boundaries = list(range(0, count, block_size)) + [count]
+        return [
+            bytes(text_buffer[offsets[start] - offsets[0]:offsets[end] - offsets[0]])
+            for start, end in zip(boundaries[:-1], boundaries[1:])
+        ]
+
+    def _compress_part(self, first_chunk, first_block, text_buffer, offsets):
+        """Partie compressée avec le codec et le dictionnaire du store"""
+        raw_blocks = self._blocks(text_buffer, offsets, self.block_size)
+        if self.codec == 'zstd':
+            dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dict_data)
+            compressed = [compressor.compress(block) for block in raw_blocks]
+        else:
+            compressed = [zlib.compress(block, self.level) for block in raw_blocks]
+        lengths = np.fromiter((len(block) for block in compressed), dtype=np.int64, count=len(compressed))
+        block_offsets = np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths)])
+        return first_chunk, first_block, np.frombuffer(b''.join(compressed), dtype=np.uint8), block_offsets
+
+    @classmethod
+    def build(cls, text_buffer, offsets, block_size=16, level=9, dict_size=64 * 1024, cache_blocks=64):
+        """Compresse le buffer texte par blocs de `block_size` chunks"""
+        count = len(offsets) - 1
+        dictionary = None
+        if ZSTD_AVAILABLE:
+            codec = 'zstd'
+            # Dictionnaire entraîné sur le vocabulaire réglementaire du corpus
+            samples = [
+                bytes(text_buffer[offsets[i]:offsets[i + 1]])
+                for i in range(0, count, max(1, count // 2000))
+                if offsets[i + 1] > offsets[i]
+            ]
+            try:
+                if len(samples) >= 8:
+                    dictionary = zstandard.train_dictionary(dict_size, samples).as_bytes()
+            except Exception as e:
+                print(f"⚠️  Entraînement du dictionnaire zstd impossible: {e}")
+        else:
+            codec = 'zlib'
+        blocks = cls([], block_size, codec, dictionary, cache_blocks, level)
+        blocks.parts = [blocks._compress_part(0, 0, text_buffer, offsets)]
+        blocks.part_chunks, blocks.part_blocks = [0], [0]
+        return blocks
+
+    def appended(self, text_buffer, offsets, first_chunk):
+        """Nouveaux blocs: ces blocs suivis des chunks donnés (offsets relatifs au buffer, taille n + 1),
+        compressés avec le dictionnaire existant; ce store, éventuellement servi, reste inchangé"""
+        parts = list(self.parts)
+        if len(offsets) > 1:
+            parts.append(self._compress_part(first_chunk, self.block_count, text_buffer, offsets))
+        return CompressedTextBlocks(parts, self.block_size, self.codec, self.dictionary, self.cache_blocks, self.level)
+
+    @property
+    def block_count(self):
+        if not self.parts:
+            return 0
+        return self.part_blocks[-1] + len(self.parts[-1][3]) - 1
+
+    def locate(self, chunk_id):
+        """(bloc du chunk, premier chunk de ce bloc)"""
+        part = bisect.bisect_right(self.part_chunks, chunk_id) - 1
+        local = (chunk_id - self.part_chunks[part]) // self.block_size
+        return self.part_blocks[part] + local, self.part_chunks[part] + local * self.block_size
+
+    def _decompress(self, block_id):
+        part = bisect.bisect_right(self.part_blocks, block_id) - 1
+        _, first_block, block_data, block_offsets = self.parts[part]
+        local = block_id - first_block
+        data = bytes(block_data[block_offsets[local]:block_offsets[local + 1]])
+        if self.codec == 'zstd':
+            decompressor = getattr(self._decompressors, 'instance', None)
+            if decompressor is None:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+                decompressor = zstandard.ZstdDecompressor(dict_data=dict_data)
+                self._decompressors.instance = decompressor
+            return decompressor.decompress(data)
+        return zlib.decompress(data)
+
+    def _query_counters(self):
+        counters = getattr(self._local, 'counters', None)
+        if counters is None:
+            counters = {'blocks_decoded': 0, 'cache_hits': 0, 'decode_seconds': 0.0}
+            self._local.counters = counters
+        return counters
+
+    def block(self, block_id):
+        """Octets décompressés d'un bloc (via le cache LRU)"""
+        counters = self._query_counters()
+        with self._cache_lock:
+            data = self._cache.get(block_id)
+            if data is not None:
+                self._cache.move_to_end(block_id)
+                counters['cache_hits'] += 1
+                self.totals['cache_hits'] += 1
+                return data
+
+        start = time.perf_counter()
+        data = self._decompress(block_id)
+        elapsed = time.perf_counter() - start
+
+        counters['blocks_decoded'] += 1
+        counters['decode_seconds'] += elapsed
+        with self._cache_lock:
+            self.totals['blocks_decoded'] += 1
+            self.totals['decode_seconds'] += elapsed
+            self._cache[block_id] = data
+            while len(self._cache) > self.cache_blocks:
+                self._cache.popitem(last=False)
+        return data
+
+    def take_query_stats(self):
+        """Retourne puis remet à zéro le coût de décodage du thread courant"""
+        counters = self._query_counters()
+        self._local.counters = None
+        return {
+            'blocks_decoded': counters['blocks_decoded'],
+            'cache_hits': counters['cache_hits'],
+            'decode_ms': round(counters['decode_seconds'] * 1000, 3)
+        }
+
+    def nbytes(self):
+        return int(sum(block_data.nbytes + block_offsets.nbytes for _, _, block_data, block_offsets in self.parts)
+                   + len(self.dictionary or b''))
+
+    def save(self, directory):
+        """Parties écrites à la suite dans un seul fichier (offsets des blocs rendus absolus)"""
+        block_offsets = [np.zeros(1, dtype=np.int64)]
+        position = 0
+        with open(os.path.join(directory, self.BLOCKS_FILE), 'wb') as f:
+            for _, _, block_data, offsets in self.parts:
+                offsets = np.asarray(offsets)
+                f.write(memoryview(np.ascontiguousarray(block_data[offsets[0]:offsets[-1]])))
+                block_offsets.append(position + offsets[1:] - offsets[0])
+                position += int(offsets[-1] - offsets[0])
+        np.save(os.path.join(directory, self.BLOCK_OFFSETS_FILE), np.concatenate(block_offsets))
+        if self.dictionary:
+            with open(os.path.join(directory, self.DICTIONARY_FILE), 'wb') as f:
+                f.write(self.dictionary)
+        return {'block_size': self.block_size, 'codec': self.codec, 'level': self.level,
+                'parts': [[int(first_chunk), int(first_block)] for first_chunk, first_block, _, _ in self.parts]}
+
+    @classmethod
+    def load(cls, directory, layout, mmap=True, cache_blocks=64):
+        blocks_path = os.path.join(directory, cls.BLOCKS_FILE)
+        if mmap and os.path.getsize(blocks_path) > 0:
+            block_data = np.memmap(blocks_path, dtype=np.uint8, mode='r')
+        else:
+            block_data = np.fromfile(blocks_path, dtype=np.uint8)
+        block_offsets = np.load(os.path.join(directory, cls.BLOCK_OFFSETS_FILE), mmap_mode='r' if mmap else None)
+
+        dictionary = None
+        dictionary_path = os.path.join(directory, cls.DICTIONARY_FILE)
+        if os.path.exists(dictionary_path):
+            with open(dictionary_path, 'rb') as f:
+                dictionary = f.read()
+        if layout['codec'] == 'zstd' and not ZSTD_AVAILABLE:
+            raise RuntimeError("Le store est compressé en zstd mais le module zstandard n'est pas installé")
+        # Parties relues comme des tranches du fichier unique (aucune copie)
+        starts = layout.get('parts') or [[0, 0]]
+        ends = [first_block for _, first_block in starts[1:]] + [len(block_offsets) - 1]
+        parts = [
+            (first_chunk, first_block, block_data, block_offsets[first_block:end + 1])
+            for (first_chunk, first_block), end in zip(starts, ends)
+        ]
+        return cls(parts, layout['block_size'], layout['codec'], dictionary, cache_blocks, layout.get('level', 9))
+
+
+class ColumnarChunkStore:
+    """Stockage colonnaire des chunks (texte UTF-8 concaténé + offsets + métadonnées encodées par dictionnaire)"""
+
+    TEXT_FILE = 'text.bin'
+    OFFSETS_FILE = 'offsets.npy'
+    COLUMNS_FILE = 'columns.json'
+
+    def __init__(self, text_buffer, offsets, columns=None, dictionaries=None, compressed_text=None):
+        # Texte non compressé par parties (premier chunk, octets UTF-8 np.uint8 éventuellement memmap),
+        # vide si compressé: les chunks ajoutés forment une nouvelle partie, comme les blocs compressés
+        self.text_buffer = text_buffer
+        self.compressed_text = compressed_text  # CompressedTextBlocks ou None
+        self.offsets = offsets              # np.int64, taille n + 1
+        self.columns = columns or {}        # clé -> codes np.int32 (-1 = absent)
+        self.dictionaries = dictionaries or {}  # clé -> liste des valeurs distinctes
+        self._codes = {
+            key: {self._value_key(value): code for code, value in enumerate(values)}
+            for key, values in self.dictionaries.items()
+        }
+        # Chunks ajoutés après construction (repliés dans les colonnes par compact())
+        self._tail = []
+
+    def _set_text_parts(self, parts):
+        self.text_parts = list(parts)
+        self.text_part_chunks = [first_chunk for first_chunk, _ in self.text_parts]
+
+    def _append_text_part(self, first_chunk, text_buffer):
+        # Aucun texte avant first_chunk (store vide, ou chunks vides): la partie couvre tout le store
+        if not self.offsets[first_chunk]:
+            self._set_text_parts([(0, text_buffer)])
+        elif len(text_buffer):
+            self._set_text_parts(self.text_parts + [(first_chunk, text_buffer)])
+
+    @property
+    def text_buffer(self):
+        """Buffer texte non compressé contigu (assemblé, donc recopié, si le store a plusieurs parties)"""
+        if len(self.text_parts) == 1:
+            return self.text_parts[0][1]
+        return np.concatenate([np.asarray(buffer) for _, buffer in self.text_parts])
+
+    @text_buffer.setter
+    def text_buffer(self, text_buffer):
+        self._set_text_parts([(0, text_buffer)])
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+    @classmethod
+    def from_chunks(cls, chunks):
+        """Construit le store à partir d'une liste de dicts {'chunk', 'metadata'}"""
+        store = cls(np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64))
+        store._tail = list(chunks)
+        store.compact()
+        return store
+
+    @staticmethod
+    def _value_key(value):
+        """Clé hashable pour l'encodage par dictionnaire"""
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return (type(value).__name__, value)
+        return ('json', json.dumps(value, sort_keys=True, default=str))
+
+    def _encode(self, key, value):
+        codes = self._codes.setdefault(key, {})
+        value_key = self._value_key(value)
+        if value_key not in codes:
+            codes[value_key] = len(self.dictionaries.setdefault(key, []))
+            self.dictionaries[key].append(value)
+        return codes[value_key]
+
+    def append(self, chunk):
+        """Ajoute un chunk {'chunk', 'metadata'} (conservé en mémoire jusqu'au prochain compact())"""
+        self._tail.append(chunk)
+
+    def compact(self):
+        """Replie les chunks ajoutés dans le buffer texte et les colonnes"""
+        if not self._tail:
+            return
+
+        base_count = len(self.offsets) - 1
+        encoded = [chunk['chunk'].encode('utf-8') for chunk in self._tail]
+        lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+        tail_text = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+        if self.compressed_text is not None:
+            # Texte compressé: les chunks ajoutés forment une nouvelle partie (blocs existants intacts)
+            self.compressed_text = self.compressed_text.appended(
+                tail_text, np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths)]), base_count
+            )
+        else:
+            # Nouvelle partie: le texte existant n'est pas recopié
+            self._append_text_part(base_count, tail_text)
+        self.offsets = np.concatenate([
+            np.asarray(self.offsets),
+            self.offsets[-1] + np.cumsum(lengths)
+        ])
+
+        new_count = base_count + len(self._tail)
+        for key in list(self.columns):
+            self.columns[key] = np.concatenate([
+                np.asarray(self.columns[key]),
+                np.full(len(self._tail), -1, dtype=np.int32)
+            ])
+        for position, chunk in enumerate(self._tail):
+            for key, value in (chunk.get('metadata') or {}).items():
+                if key not in self.columns:
+                    self.columns[key] = np.full(new_count, -1, dtype=np.int32)
+                self.columns[key][base_count + position] = self._encode(key, value)
+
+        self._tail = []
+
+    def compress(self, block_size=16, level=9, cache_blocks=64):
+        """Compresse le texte par blocs; seuls les blocs lus sont décompressés"""
+        self.compact()
+        if self.compressed_text is not None:
+            return self.compressed_text
+        self.compressed_text = CompressedTextBlocks.build(
+            np.asarray(self.text_buffer), np.asarray(self.offsets),
+            block_size=block_size, level=level, cache_blocks=cache_blocks
+        )
+        self.text_buffer = np.zeros(0, dtype=np.uint8)
+        return self.compressed_text
+
+    def decompress(self):
+        """Restaure le buffer texte non compressé"""
+        if self.compressed_text is None:
+            return
+        self.text_buffer = self._full_text_buffer()
+        self.compressed_text = None
+
+    def _full_text_buffer(self):
+        """Buffer texte complet (décompressé au besoin), sans modifier le store"""
+        compression = self.compressed_text
+        if compression is None:
+            return np.asarray(self.text_buffer)
+        return np.frombuffer(
+            b''.join(compression._decompress(block_id) for block_id in range(compression.block_count)),
+            dtype=np.uint8
+        )
+
+    def extended(self, chunks):
+        """Nouveau store: ce store suivi des chunks donnés (ce store, éventuellement servi, reste inchangé)"""
+        writer = ChunkStoreWriter(self)
+        writer.add(list(chunks))
+        return writer.finish()
+
+    # ------------------------------------------------------------------
+    # Accès
+    # ------------------------------------------------------------------
+    def __len__(self):
+        return len(self.offsets) - 1 + len(self._tail)
+
+    def __getitem__(self, chunk_id):
+        return self.chunk(chunk_id)
+
+    def __iter__(self):
+        for chunk_id in range(len(self)):
+            yield self.chunk(chunk_id)
+
+    def _tail_chunk(self, chunk_id):
+        base_count = len(self.offsets) - 1
+        if chunk_id >= base_count:
+            return self._tail[chunk_id - base_count]
+        return None
+
+    def text_view(self, chunk_id):
+        """Vue zéro-copie sur les octets UTF-8 du chunk"""
+        tail_chunk = self._tail_chunk(chunk_id)
+        if tail_chunk is not None:
+            return memoryview(tail_chunk['chunk'].encode('utf-8'))
+        start, end = self.offsets[chunk_id], self.offsets[chunk_id + 1]
+        if self.compressed_text is not None:
+            block_id, first_chunk = self.compressed_text.locate(chunk_id)
+            block_start = self.offsets[first_chunk]
+            block = self.compressed_text.block(block_id)
+            return memoryview(block)[start - block_start:end - block_start]
+        part = bisect.bisect_right(self.text_part_chunks, chunk_id) - 1
+        first_chunk, text_buffer = self.text_parts[part]
+        part_start = self.offsets[first_chunk]
+        return memoryview(text_buffer[start - part_start:end - part_start])
+
+    def text(self, chunk_id):
+        """Matérialise le texte du chunk"""
+        return str(self.text_view(chunk_id), 'utf-8')
+
+    def text_prefix(self, chunk_id, max_chars):
+        """Matérialise au plus max_chars caractères; retourne (texte, tronqué)"""
+        view = self.text_view(chunk_id)
+        # Un caractère UTF-8 occupe au plus 4 octets: inutile de décoder au-delà
+        prefix = view[:max_chars * 4]
+        text = str(prefix, 'utf-8', errors='ignore')
+        truncated = len(text) > max_chars or len(prefix) < len(view)
+        return text[:max_chars], truncated
+
+    def text_length(self, chunk_id):
+        """Longueur en octets du texte du chunk"""
+        tail_chunk = self._tail_chunk(chunk_id)
+        if tail_chunk is not None:
+            return len(tail_chunk['chunk'].encode('utf-8'))
+        return int(self.offsets[chunk_id + 1] - self.offsets[chunk_id])
+
+    def iter_texts(self):
+        """Itère sur les textes sans construire de liste"""
+        for chunk_id in range(len(self)):
+            yield self.text(chunk_id)
+
+    def metadata(self, chunk_id):
+        """Matérialise le dict de métadonnées du chunk"""
+        tail_chunk = self._tail_chunk(chunk_id)
+        if tail_chunk is not None:
+            return dict(tail_chunk.get('metadata') or {})
+        metadata = {}
+        for key, codes in self.columns.items():
+            code = codes[chunk_id]
+            if code >= 0:
+                metadata[key] = self.dictionaries[key][code]
+        return metadata
+
+    def chunk(self, chunk_id):
+        """Matérialise un chunk au format historique {'chunk', 'metadata'}"""
+        return {'chunk': self.text(chunk_id), 'metadata': self.metadata(chunk_id)}
+
+    def set_values(self, key, chunk_ids, values):
+        """Renseigne une colonne de métadonnées pour les chunks donnés"""
+        self.compact()
+        codes = self.columns.get(key)
+        codes = np.full(len(self), -1, dtype=np.int32) if codes is None else np.array(codes, dtype=np.int32)
+        for chunk_id, value in zip(chunk_ids, values):
+            codes[int(chunk_id)] = -1 if value is None else self._encode(key, value)
+        self.columns[key] = codes
+
+    def distinct(self, key):
+        """Valeurs distinctes d'une colonne de métadonnées"""
+        self.compact()
+        return list(self.dictionaries.get(key, []))
+
+    def code(self, key, value):
+        """Code de dictionnaire d'une valeur de métadonnée (None si absente)"""
+        self.compact()
+        return self._codes.get(key, {}).get(self._value_key(value))
+
+    def rows_where(self, key, value):
+        """Identifiants des chunks dont la métadonnée `key` vaut `value`"""
+        code = self.code(key, value)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.columns[key] == code)
+
+    def nbytes(self):
+        """Empreinte mémoire des colonnes (hors chunks non compactés)"""
+        total = sum(text_buffer.nbytes for _, text_buffer in self.text_parts) + self.offsets.nbytes
+        total += sum(codes.nbytes for codes in self.columns.values())
+        if self.compressed_text is not None:
+            total += self.compressed_text.nbytes()
+        return int(total)
+
+    def compression_report(self):
+        """Taux de compression du texte et coût cumulé de décodage"""
+        raw_bytes = int(self.offsets[-1])
+        compression = self.compressed_text
+        if compression is None:
+            return {'compressed': False, 'raw_bytes': raw_bytes}
+
+        compressed_bytes = compression.nbytes()
+        totals = dict(compression.totals)
+        decoded = totals['blocks_decoded']
+        return {
+            'compressed': True,
+            'codec': compression.codec,
+            'trained_dictionary_bytes': len(compression.dictionary or b''),
+            'block_size': compression.block_size,
+            'blocks': compression.block_count,
+            'parts': len(compression.parts),
+            'cache_blocks': compression.cache_blocks,
+            'raw_bytes': raw_bytes,
+            'compressed_bytes': compressed_bytes,
+            'compression_ratio': round(raw_bytes / compressed_bytes, 2) if compressed_bytes else 0,
+            'blocks_decoded': decoded,
+            'cache_hits': totals['cache_hits'],
+            'avg_block_decode_ms': round(totals['decode_seconds'] * 1000 / decoded, 3) if decoded else 0
+        }
+
+    def take_decode_stats(self):
+        """Coût de décodage accumulé par le thread courant depuis le dernier appel"""
+        if self.compressed_text is None:
+            return {'blocks_decoded': 0, 'cache_hits': 0, 'decode_ms': 0.0}
+        return self.compressed_text.take_query_stats()
+
+    # ------------------------------------------------------------------
+    # Persistance (memory-mappable)
+    # ------------------------------------------------------------------
+    def save(self, directory):
+        """Sauvegarde le store dans un répertoire"""
+        self.compact()
+        os.makedirs(directory, exist_ok=True)
+
+        # Parties écrites à la suite: un seul buffer (memory-map) au chargement
+        with open(os.path.join(directory, self.TEXT_FILE), 'wb') as f:
+            for _, text_buffer in self.text_parts:
+                f.write(memoryview(np.ascontiguousarray(text_buffer)))
+        np.save(os.path.join(directory, self.OFFSETS_FILE), np.asarray(self.offsets))
+
+        column_files = {}
+        for position, (key, codes) in enumerate(self.columns.items()):
+            filename = f"column_{position}.npy"
+            np.save(os.path.join(directory, filename), np.asarray(codes))
+            column_files[key] = filename
+
+        compression = None
+        if self.compressed_text is not None:
+            compression = self.compressed_text.save(directory)
+
+        with open(os.path.join(directory, self.COLUMNS_FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'count': len(self),
+                'columns': column_files,
+                'dictionaries': self.dictionaries,
+                'compression': compression
+            }, f, ensure_ascii=False, default=str)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Charge un store sauvegardé, en memory-map par défaut"""
+        mmap_mode = 'r' if mmap else None
+
+        with open(os.path.join(directory, cls.COLUMNS_FILE), encoding='utf-8') as f:
+            layout = json.load(f)
+
+        text_path = os.path.join(directory, cls.TEXT_FILE)
+        if mmap and os.path.getsize(text_path) > 0:
+            text_buffer = np.memmap(text_path, dtype=np.uint8, mode='r')
+        else:
+            text_buffer = np.fromfile(text_path, dtype=np.uint8)
+
+        offsets = np.load(os.path.join(directory, cls.OFFSETS_FILE), mmap_mode=mmap_mode)
+        columns = {
+            key: np.load(os.path.join(directory, filename), mmap_mode=mmap_mode)
+            for key, filename in layout['columns'].items()
+        }
+        compressed_text = None
+        if layout.get('compression'):
+            compressed_text = CompressedTextBlocks.load(directory, layout['compression'], mmap=mmap)
+        return cls(text_buffer, offsets, columns, layout['dictionaries'], compressed_text)
+
+
+class ChunkStoreWriter:
+    """Construction d'un store par lots: chaque lot est encodé dès réception (octets UTF-8 + codes)
+
+    Aucune liste de dicts n'est conservée; le texte des lots est assemblé une seule fois par
+    finish(). Le store de base n'est jamais modifié: ses parties de texte (compressées ou non) sont partagées.
+    """
+
+    def __init__(self, base=None):
+        self.base = base
+        self._segments = []
+        self._lengths = []
+        self._columns = {}  # clé -> [(position du lot, codes np.int32)]
+        self._encoder = ColumnarChunkStore(np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64))
+        self.base_count = 0
+        if base is not None:
+            self.base_count = len(base.offsets) - 1
+            self._encoder = ColumnarChunkStore(
+                np.zeros(0, dtype=np.uint8), np.zeros(1, dtype=np.int64),
+                dictionaries={key: list(values) for key, values in base.dictionaries.items()}
+            )
+        self.count = self.base_count
+        if base is not None and base._tail:
+            # Chunks non compactés du store de base: repris en tête, sans compacter la base
+            self.add(list(base._tail))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, chunks):
+        """Encode un lot de chunks {'chunk', 'metadata'}; retourne leurs identifiants"""
+        encoded = [chunk['chunk'].encode('utf-8') for chunk in chunks]
+        if not encoded:
+            return np.zeros(0, dtype=np.int64)
+        self._segments.append(b''.join(encoded))
+        self._lengths.append(np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded)))
+
+        batch_columns = {}
+        for position, chunk in enumerate(chunks):
+            for key, value in (chunk.get('metadata') or {}).items():
+                if key not in batch_columns:
+                    batch_columns[key] = np.full(len(chunks), -1, dtype=np.int32)
+                batch_columns[key][position] = self._encoder._encode(key, value)
+        for key, codes in batch_columns.items():
+            self._columns.setdefault(key, []).append((self.count - self.base_count, codes))
+
+        chunk_ids = np.arange(self.count, self.count + len(chunks), dtype=np.int64)
+        self.count += len(chunks)
+        return chunk_ids
+
+    def finish(self):
+        """Assemble le store: les chunks ajoutés forment une nouvelle partie (compressée avec le
+        dictionnaire existant si la base est compressée); le texte de la base n'est ni relu ni recopié"""
+        base = self.base
+        compression = base.compressed_text if base is not None else None
+        base_offsets = np.asarray(base.offsets) if base is not None else np.zeros(1, dtype=np.int64)
+
+        # Buffer des chunks ajoutés alloué une fois puis rempli lot par lot (chaque segment est libéré après copie)
+        new_bytes = sum(len(segment) for segment in self._segments)
+        text_buffer = np.empty(new_bytes, dtype=np.uint8)
+        position = 0
+        while self._segments:
+            segment = self._segments.pop(0)
+            text_buffer[position:position + len(segment)] = np.frombuffer(segment, dtype=np.uint8)
+            position += len(segment)
+        lengths = np.concatenate(self._lengths) if self._lengths else np.zeros(0, dtype=np.int64)
+        offsets = np.concatenate([base_offsets, base_offsets[-1] + np.cumsum(lengths)])
+
+        # Les colonnes restent des tableaux de codes contigus (4 octets par chunk, recopiés)
+        columns = {}
+        base_columns = base.columns if base is not None else {}
+        for key in list(base_columns) + [key for key in self._columns if key not in base_columns]:
+            codes = np.full(self.count, -1, dtype=np.int32)
+            if key in base_columns:
+                codes[:self.base_count] = base_columns[key]
+            for start, batch_codes in self._columns.get(key, []):
+                codes[self.base_count + start:self.base_count + start + len(batch_codes)] = batch_codes
+            columns[key] = codes
+
+        if compression is not None:
+            compressed_text = compression.appended(
+                text_buffer, np.concatenate([np.zeros(1, dtype=np.int64), np.cumsum(lengths)]), self.base_count
+            )
+            store = ColumnarChunkStore(
+                np.zeros(0, dtype=np.uint8), offsets, columns, self._encoder.dictionaries, compressed_text
+            )
+        else:
+            store = ColumnarChunkStore(text_buffer, offsets, columns, self._encoder.dictionaries)
+            if base is not None:
+                # Parties de la base partagées, les chunks ajoutés forment la suivante
+                store._set_text_parts(base.text_parts)
+                store._append_text_part(self.base_count, text_buffer)
+        self._lengths, self._columns = [], {}
+        return store
+
+
+def attach_chunk_store(knowledge_base):
+    """Remplace la liste de dicts `knowledge_base.chunks` par un store colonnaire"""
+    if isinstance(knowledge_base.chunks, ColumnarChunkStore):
+        return knowledge_base.chunks
+
+    store = ColumnarChunkStore.from_chunks(knowledge_base.chunks)
+    knowledge_base.chunks = store
+    return store
@@ -0,0 +1,193 @@
+# backend/citation_index.py
+import json
+import os
+import re
+from collections import defaultdict
+
+# Textes réglementaires reconnus -> clé normalisée
+REGULATION_PATTERNS = [
+    ('solvency_ii', re.compile(r"solvabilit[ée]\s*(?:ii|2)\b|solvency\s*(?:ii|2)\b|directive\s*2009/138", re.I)),
+    ('solvency_ii_delegated', re.compile(r"r[èe]glement\s+d[ée]l[ée]gu[ée]\s*(?:\(ue\)\s*)?(?:n°\s*)?2015/35|delegated\s+regulation\s*(?:\(eu\)\s*)?2015/35", re.I)),
+    ('crr', re.compile(r"\bcrr\s*(?:ii|2)?\b|r[èe]glement\s*\(ue\)\s*(?:n°\s*)?575/2013|regulation\s*\(eu\)\s*(?:no\s*)?575/2013", re.I)),
+    ('crd', re.compile(r"\bcrd\s*(?:iv|v|vi|4|5|6)?\b|directive\s*2013/36", re.I)),
+    ('bale_iii', re.compile(r"b[âa]le\s*(?:iii|3)\b|basel\s*(?:iii|3)\b", re.I)),
+    ('ifrs', re.compile(r"\bifrs\s*(\d{1,2})\b", re.I)),
+    ('ias', re.compile(r"\bias\s*(\d{1,2})\b", re.I)),
+]
+
+ARTICLE_RE = re.compile(r"\b(?:article|art\.)\s*(\d{1,4}(?:\s*(?:bis|ter|quater)|[a-z])?)\b", re.I)
+PARAGRAPH_RE = re.compile(r"(?:\b(?:paragraphe|paragraph|para\.|par\.)|§)\s*([A-Z]{0,2}\d{1,4}[A-Z]?)\b", re.I)
+# Forme abrégée "IFRS 17.B72"
+DOTTED_PARAGRAPH_RE = re.compile(r"\b(?:ifrs|ias)\s*\d{1,2}\.([A-Z]{0,2}\d{1,4}[A-Z]?)\b", re.I)
+# En-têtes en début de ligne: "Article 101" / "B72 ..." (paragraphes numérotés des normes IFRS/IAS)
+ARTICLE_HEADING_RE = re.compile(r"^\s*(?:article|art\.)\s*(\d{1,4}(?:\s*(?:bis|ter|quater)|[a-z])?)\b", re.I | re.M)
+PARAGRAPH_HEADING_RE = re.compile(r"^\s*([A-Z]{0,2}\d{1,4}[A-Z]?)\s+(?=[A-ZÀ-Ý])", re.M)
+
+
+def normalize_number(number):
+    """'101 bis' -> '101bis', 'b72' -> 'B72'"""
+    return re.sub(r"\s+", "", number).upper()
+
+
+def detect_regulations(text):
+    """Clés normalisées des textes réglementaires cités dans le texte"""
+    found = []
+    for key, pattern in REGULATION_PATTERNS:
+        for match in pattern.finditer(text):
+            regulation = f"{key}_{match.group(1)}" if match.groups() else key
+            if regulation not in found:
+                found.append(regulation)
+    return found
+
+
+def parse_citations(text):
+    """Clés de citation (texte, 'article'|'paragraph', numéro) contenues dans une requête"""
+    regulations = detect_regulations(text)
+    if not regulations:
+        return []
+
+    numbers = [('article', normalize_number(m.group(1))) for m in ARTICLE_RE.finditer(text)]
+    numbers += [('paragraph', normalize_number(m.group(1))) for m in PARAGRAPH_RE.finditer(text)]
+    numbers += [('paragraph', normalize_number(m.group(1))) for m in DOTTED_PARAGRAPH_RE.finditer(text)]
+    return [(regulation, kind, number) for regulation in regulations for kind, number in numbers]
+
+
+class CitationIndex:
+    """Index exact (texte réglementaire, article/paragraphe) -> chunks, construit à l'ingestion"""
+
+    FILE = 'citations.json'
+
+    def __init__(self):
+        # Chunks où l'article/paragraphe est défini (en-tête ou suite), puis ceux qui le citent
+        self.definitions = defaultdict(list)
+        self.references = defaultdict(list)
+        # Document -> clés auxquelles ses chunks contribuent (None: inconnu, index chargé d'un ancien format)
+        self.document_keys = defaultdict(set)
+        # Listes propres à cet index (les autres sont partagées avec l'index dont il est issu)
+        self._owned = None
+
+    def __len__(self):
+        return len(self.definitions)
+
+    def _add(self, entries, key, chunk_id, document=None):
+        if self._owned is not None and (id(entries), key) not in self._owned:
+            entries[key] = list(entries.get(key, []))
+            self._owned.add((id(entries), key))
+        if not entries[key] or entries[key][-1] != chunk_id:
+            entries[key].append(chunk_id)
+        if self.document_keys is not None:
+            self.document_keys[document].add(key)
+
+    def build(self, chunk_store, chunk_ids=None):
+        """Parcourt les chunks dans l'ordre d'ingestion (l'article courant se prolonge sur les chunks suivants)
+
+        chunk_ids: ordre de lecture à suivre (chunks des documents réingérés), tous les chunks par défaut
+        """
+        document_regulation = {}
+        current_section = {}
+
+        for chunk_id in (range(len(chunk_store)) if chunk_ids is None else chunk_ids):
+            text = chunk_store.text(chunk_id)
+            document = chunk_store.metadata(chunk_id).get('source', '')
+
+            # Texte réglementaire du document: nom du fichier, puis premier texte cité
+            if document not in document_regulation:
+                regulations = detect_regulations(str(document).replace('_', ' ')) or detect_regulations(text)
+                document_regulation[document] = regulations[0] if regulations else None
+            regulation = document_regulation[document]
+
+            if regulation:
+                numbered_paragraphs = regulation.startswith(('ifrs_', 'ias_'))
+                headings = [('article', normalize_number(m.group(1))) for m in ARTICLE_HEADING_RE.finditer(text)]
+                if numbered_paragraphs:
+                    headings += [('paragraph', normalize_number(m.group(1)))
+                                 for m in PARAGRAPH_HEADING_RE.finditer(text)]
+
+                # Le texte précédant le premier en-tête prolonge la section du chunk précédent
+                starts_with_heading = bool(
+                    ARTICLE_HEADING_RE.match(text) or (numbered_paragraphs and PARAGRAPH_HEADING_RE.match(text))
+                )
+                section = current_section.get(document)
+                if section and not starts_with_heading:
+                    self._add(self.definitions, (regulation,) + section, chunk_id, document)
+                for heading in headings:
+                    self._add(self.definitions, (regulation,) + heading, chunk_id, document)
+                if headings:
+                    current_section[document] = headings[-1]
+
+            # Citations explicites d'autres textes dans le chunk
+            for key in parse_citations(text):
+                if chunk_id not in self.definitions.get(key, ()):
+                    self._add(self.references, key, chunk_id, document)
+
+        return self
+
+    def updated(self, chunk_store, documents, removed_ids, reading_order):
+        """Nouvel index où les documents donnés sont réindexés: les entrées des chunks retirés
+        (removed_ids: tous les chunks de leur version précédente) sont supprimées, puis leurs chunks
+        (reading_order) relus; l'index servi reste inchangé
+
+        Seules les listes des clés de ces documents sont recopiées.
+        """
+        index = CitationIndex()
+        index.definitions = defaultdict(list, self.definitions)
+        index.references = defaultdict(list, self.references)
+        index.document_keys = defaultdict(set, self.document_keys)
+        index._owned = set()
+
+        removed_ids = set(int(chunk_id) for chunk_id in removed_ids)
+        keys = set()
+        for document in documents:
+            keys |= index.document_keys.pop(document, set())
+        for entries in (index.definitions, index.references):
+            for key in keys:
+                if key not in entries:
+                    continue
+                chunk_ids = [chunk_id for chunk_id in entries[key] if chunk_id not in removed_ids]
+                if chunk_ids:
+                    entries[key] = chunk_ids
+                    index._owned.add((id(entries), key))
+                else:
+                    del entries[key]
+        return index.build(chunk_store, reading_order)
+
+    def lookup(self, query, top_k=5):
+        """Chunks correspondant aux citations de la requête (vide si aucune citation)"""
+        chunk_ids = []
+        for key in parse_citations(query):
+            for chunk_id in self.definitions.get(key, []) + self.references.get(key, []):
+                if chunk_id not in chunk_ids:
+                    chunk_ids.append(chunk_id)
+                if len(chunk_ids) >= top_k:
+                    return chunk_ids
+        return chunk_ids
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, self.FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'definitions': [[list(key), chunk_ids] for key, chunk_ids in self.definitions.items()],
+                'references': [[list(key), chunk_ids] for key, chunk_ids in self.references.items()],
+                'documents': None if self.document_keys is None else [
+                    [document, [list(key) for key in keys]] for document, keys in self.document_keys.items()
+                ]
+            }, f, ensure_ascii=False, default=int)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, cls.FILE), encoding='utf-8') as f:
+            layout = json.load(f)
+        index = cls()
+        for key, chunk_ids in layout['definitions']:
+            index.definitions[tuple(key)] = chunk_ids
+        for key, chunk_ids in layout['references']:
+            index.references[tuple(key)] = chunk_ids
+        if layout.get('documents') is None:
+            index.document_keys = None
+        else:
+            for document, keys in layout['documents']:
+                index.document_keys[document] = {tuple(key) for key in keys}
+        return index
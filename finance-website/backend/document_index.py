@@ -0,0 +1,114 @@
+# backend/document_index.py
+import faiss
+import numpy as np
+
+
+class DocumentLevelIndex:
+    """Index grossier au niveau document (centroïdes ou résumés) pour la recherche document -> chunk"""
+
+    # Au-delà, la sélection des documents passe par un graphe HNSW (coût sous-linéaire)
+    HNSW_MIN_DOCUMENTS = 4096
+
+    def __init__(self, embeddings, document_codes):
+        """
+        embeddings: vecteurs des chunks indexés (une ligne par position d'index)
+        document_codes: code document de chaque position (-1 = document inconnu)
+        """
+        self.dimension = embeddings.shape[1]
+        codes = np.asarray(document_codes, dtype=np.int64)
+
+        # Positions d'index regroupées par document
+        order = np.argsort(codes, kind='stable')
+        keys, starts = np.unique(codes[order], return_index=True)
+        self.document_keys = keys
+        self.rows_by_document = np.split(order, starts[1:])
+
+        self.document_vectors = np.zeros((len(keys), self.dimension), dtype=np.float32)
+        for position, rows in enumerate(self.rows_by_document):
+            self.document_vectors[position] = self._normalize(embeddings[rows].mean(axis=0))
+        self._build_index()
+
+    def updated(self, embeddings, added_rows, added_codes, removed_rows, removed_codes):
+        """Nouvel index avec des positions ajoutées et retirées: seuls les documents touchés sont
+        recalculés (centroïde de leurs chunks), les autres gardent leur vecteur (résumé compris)"""
+        added_rows = np.asarray(added_rows, dtype=np.int64)
+        added_codes = np.asarray(added_codes, dtype=np.int64)
+        removed_rows = np.asarray(removed_rows, dtype=np.int64)
+        touched = set(np.union1d(added_codes, np.asarray(removed_codes, dtype=np.int64)).tolist())
+
+        index = DocumentLevelIndex.__new__(DocumentLevelIndex)
+        index.dimension = self.dimension
+        keys = np.union1d(self.document_keys, added_codes)
+        rows_by_document, vectors, kept_keys = [], [], []
+        for key in keys.tolist():
+            position = np.searchsorted(self.document_keys, key)
+            known = position < len(self.document_keys) and self.document_keys[position] == key
+            if key not in touched:
+                rows_by_document.append(self.rows_by_document[position])
+                vectors.append(self.document_vectors[position])
+                kept_keys.append(key)
+                continue
+            rows = self.rows_by_document[position] if known else np.zeros(0, dtype=np.int64)
+            rows = np.setdiff1d(rows, removed_rows)
+            rows = np.concatenate([rows, added_rows[added_codes == key]])
+            if not len(rows):
+                continue
+            rows_by_document.append(rows)
+            vectors.append(self._normalize(embeddings[rows].mean(axis=0)))
+            kept_keys.append(key)
+        index.document_keys = np.asarray(kept_keys, dtype=np.int64)
+        index.rows_by_document = rows_by_document
+        index.document_vectors = (np.array(vectors, dtype=np.float32) if vectors
+                                  else np.zeros((0, self.dimension), dtype=np.float32))
+        index._build_index()
+        return index
+
+    @staticmethod
+    def _normalize(vector):
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _build_index(self):
+        if len(self.document_keys) >= self.HNSW_MIN_DOCUMENTS:
+            index = faiss.IndexHNSWFlat(self.dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexFlatIP(self.dimension)
+        index.add(self.document_vectors)
+        # Index rempli avant d'être publié (recherches concurrentes sur l'index précédent)
+        self.index = index
+
+    def __len__(self):
+        return len(self.document_keys)
+
+    def set_document_embedding(self, document_code, embedding):
+        """Remplace le centroïde d'un document par l'embedding de son résumé"""
+        return self.set_document_embeddings([document_code], [embedding]) == 1
+
+    def set_document_embeddings(self, document_codes, embeddings):
+        """Remplace les centroïdes de plusieurs documents (index reconstruit une seule fois); retourne
+        le nombre de documents mis à jour"""
+        updated = 0
+        for document_code, embedding in zip(document_codes, embeddings):
+            position = np.searchsorted(self.document_keys, document_code)
+            if position >= len(self.document_keys) or self.document_keys[position] != document_code:
+                continue
+            self.document_vectors[position] = self._normalize(np.asarray(embedding, dtype=np.float32))
+            updated += 1
+        if updated:
+            self._build_index()
+        return updated
+
+    def select_documents(self, query_embedding, top_n):
+        """Positions et scores des top_n documents les plus proches"""
+        top_n = min(top_n, len(self.document_keys))
+        scores, positions = self.index.search(query_embedding.reshape(1, -1).astype(np.float32), top_n)
+        valid = positions[0] >= 0
+        return positions[0][valid], scores[0][valid]
+
+    def candidate_rows(self, query_embedding, top_n):
+        """Positions d'index des chunks appartenant aux top_n documents, et meilleur score document"""
+        positions, scores = self.select_documents(query_embedding, top_n)
+        if not len(positions):
+            return np.zeros(0, dtype=np.int64), 0.0
+        rows = np.concatenate([self.rows_by_document[position] for position in positions])
+        return rows, float(scores[0])
@@ -0,0 +1,205 @@
+# backend/document_summaries.py
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+
+MAP_PROMPT = (
+    "Résume de façon factuelle et concise l'extrait suivant du document « {source} » "
+    "(partie {part}/{parts}). Conserve les chiffres, articles de loi, formules et définitions "
+    "importants. Réponds en français, en 8 phrases au plus.\n\n{text}"
+)
+REDUCE_PROMPT = (
+    "Voici des résumés partiels successifs du document « {source} ». Rédige une synthèse unique et "
+    "structurée, sans répétition, en conservant les chiffres et références clés. Réponds en français, "
+    "en 12 phrases au plus.\n\n{text}"
+)
+
+
+def document_chunk_ids(knowledge_base, chunk_store, source):
+    """Chunks d'un document dans l'ordre du document (manifeste), sinon dans l'ordre du store"""
+    manifest = getattr(knowledge_base, 'manifest', None)
+    if manifest is not None and source in manifest.documents:
+        return [int(chunk_id) for chunk_id in manifest.documents[source]['chunk_ids']]
+    chunk_ids = chunk_store.rows_where('source', source)
+    if manifest is not None:
+        chunk_ids = chunk_ids[~np.isin(chunk_ids, manifest.tombstones)]
+    return [int(chunk_id) for chunk_id in chunk_ids]
+
+
+def iter_documents(knowledge_base, chunk_store, sources=None):
+    """(source, empreinte du contenu, chunks) de chaque document de la base
+
+    L'empreinte est celle du fichier (manifeste) ou, pour un document chargé hors pipeline, celle
+    du texte de ses chunks: un résumé en cache reste valable tant que le contenu n'a pas changé.
+    """
+    manifest = getattr(knowledge_base, 'manifest', None)
+    for source in sources if sources is not None else chunk_store.distinct('source'):
+        chunk_ids = document_chunk_ids(knowledge_base, chunk_store, source)
+        if not chunk_ids:
+            continue
+        digest = None
+        if manifest is not None and source in manifest.documents:
+            digest = manifest.documents[source]['hash']
+        if digest is None:
+            content = hashlib.sha256()
+            for chunk_id in chunk_ids:
+                content.update(chunk_store.text(chunk_id).encode('utf-8'))
+                content.update(b'\0')
+            digest = content.hexdigest()
+        yield source, digest, chunk_ids
+
+
+class SummaryCache:
+    """Résumés persistés sur disque, un fichier par (empreinte du document, modèle)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest, model):
+        model = re.sub(r'[^\w.-]', '_', model or 'model')
+        return os.path.join(self.directory, f'{digest[:40]}-{model}.json')
+
+    def get(self, digest, model):
+        try:
+            with open(self._path(digest, model), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, digest, model, entry):
+        # Écriture atomique: un lecteur ne voit jamais un fichier partiel
+        path = self._path(digest, model)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if name.endswith('.json'))
+
+
+class DocumentSummarizer:
+    """Résumé map-reduce de documents longs par appels Ollama concurrents
+
+    Les chunks d'un document sont regroupés en extraits d'environ group_chars caractères, résumés
+    en parallèle (map), puis les résumés partiels sont regroupés et résumés à nouveau, niveau par
+    niveau, jusqu'à un résumé unique (reduce). Les appels de tous les documents d'un même niveau
+    passent par un seul pool limité à max_concurrency requêtes simultanées. Chaque résumé est mis
+    en cache par empreinte du contenu: un document inchangé n'est jamais résumé deux fois.
+    """
+
+    def __init__(self, client, model, cache=None, max_concurrency=4, group_chars=6000,
+                 map_tokens=320, reduce_tokens=640, context_tokens=4096):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self.group_chars = group_chars
+        self.map_tokens = map_tokens
+        self.reduce_tokens = reduce_tokens
+        self.context_tokens = context_tokens
+        self._lock = threading.Lock()
+        self.stats = {'llm_calls': 0, 'llm_seconds': 0.0, 'documents': 0, 'cache_hits': 0, 'errors': 0}
+
+    def _call(self, prompt, max_tokens):
+        start = time.perf_counter()
+        response = self.client.chat(
+            model=self.model,
+            messages=[{'role': 'user', 'content': prompt}],
+            options={'temperature': 0.2, 'num_predict': max_tokens, 'num_ctx': self.context_tokens}
+        )
+        with self._lock:
+            self.stats['llm_calls'] += 1
+            self.stats['llm_seconds'] += time.perf_counter() - start
+        return response['message']['content'].strip()
+
+    def groups(self, texts):
+        """Textes consécutifs regroupés jusqu'à environ group_chars caractères"""
+        groups, current, size = [], [], 0
+        for text in texts:
+            if current and size + len(text) > self.group_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 2
+        if current:
+            groups.append(current)
+        return groups
+
+    def _prompts(self, source, pieces, level):
+        """[(prompt, tokens max)] d'un niveau: extraits de chunks (map) ou résumés partiels (reduce)"""
+        groups = self.groups(pieces)
+        if level == 0:
+            return [(MAP_PROMPT.format(source=source, part=position + 1, parts=len(groups),
+                                       text='\n\n'.join(group)), self.map_tokens)
+                    for position, group in enumerate(groups)]
+        # Résumés trop longs pour être regroupés: réduction par paires (chaque niveau progresse)
+        if len(groups) == len(pieces) and len(pieces) > 1:
+            groups = [pieces[position:position + 2] for position in range(0, len(pieces), 2)]
+        return [(REDUCE_PROMPT.format(source=source, text='\n\n'.join(group)), self.reduce_tokens)
+                for group in groups]
+
+    def summarize_many(self, documents, text_of):
+        """Résume des documents [(source, empreinte, chunks)], textes lus par text_of(chunk) pour les
+        seuls documents absents du cache: ({source: entrée}, {source: erreur})"""
+        results, errors, work = {}, {}, {}
+        for source, digest, chunk_ids in documents:
+            cached = self.cache.get(digest, self.model) if self.cache is not None else None
+            if cached is not None:
+                results[source] = cached
+                self.stats['cache_hits'] += 1
+                continue
+            work[source] = {'digest': digest, 'pieces': [text_of(chunk_id) for chunk_id in chunk_ids],
+                            'chunks': len(chunk_ids),
+                            'level': 0, 'calls': 0, 'start': time.perf_counter()}
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='summary') as pool:
+            while work:
+                # Appels de tous les documents soumis avant la première attente: le pool reste plein
+                futures = {
+                    source: [pool.submit(self._call, prompt, tokens)
+                             for prompt, tokens in self._prompts(source, state['pieces'], state['level'])]
+                    for source, state in work.items()
+                }
+                for source, pending in futures.items():
+                    state = work[source]
+                    try:
+                        summaries = [future.result() for future in pending]
+                    except Exception as e:
+                        errors[source] = str(e)
+                        self.stats['errors'] += 1
+                        del work[source]
+                        continue
+                    state['calls'] += len(pending)
+                    state['level'] += 1
+                    if len(summaries) > 1:
+                        state['pieces'] = summaries
+                        continue
+                    entry = {
+                        'source': source,
+                        'digest': state['digest'],
+                        'model': self.model,
+                        'summary': summaries[0],
+                        'chunks': state['chunks'],
+                        'levels': state['level'],
+                        'llm_calls': state['calls'],
+                        'seconds': round(time.perf_counter() - state['start'], 2),
+                        'created_at': datetime.now().isoformat()
+                    }
+                    if self.cache is not None:
+                        self.cache.put(state['digest'], self.model, entry)
+                    results[source] = entry
+                    self.stats['documents'] += 1
+                    del work[source]
+        return results, errors
+
+    def report(self):
+        with self._lock:
+            return dict(self.stats, llm_seconds=round(self.stats['llm_seconds'], 2),
+                        max_concurrency=self.max_concurrency, model=self.model)
@@ -0,0 +1,94 @@
+# backend/domain_partitions.py
+import numpy as np
+
+GENERAL_PARTITION = 'general'
+
+# Libellés des deux détecteurs ramenés aux partitions de AdvancedPromptEngine
+LABEL_ALIASES = {
+    'risk': 'risk_management',
+    'finance': 'regulation',
+    'finance/regulation': 'regulation',
+}
+
+
+def normalize_domain_label(label):
+    """Ramène un libellé de domaine (FinancialEmbedder ou AdvancedPromptEngine) à une partition"""
+    if not label:
+        return GENERAL_PARTITION
+    label = str(label).lower()
+    return LABEL_ALIASES.get(label, label)
+
+
+class DomainPartitions:
+    """Partitions par domaine (libellé attribué à l'ingestion) de l'index sémantique
+
+    Les vecteurs de chaque partition sont rangés dans ses propres segments du VectorStore
+    (VectorStore.partitioned): une recherche routée ne parcourt que les segments des partitions
+    demandées. Les lignes encore hors de leurs segments sont cherchées avec un filtre de lignes sur
+    tout le store (repli).
+    """
+
+    def __init__(self, vector_store, labels, confidence_threshold=0.6):
+        self.confidence_threshold = confidence_threshold
+        self.vector_store = vector_store
+        self.total_rows = len(labels)
+
+        labels = np.array([normalize_domain_label(label) for label in labels])
+        self.rows = {str(label): np.flatnonzero(labels == label) for label in np.unique(labels)}
+        # Partitions dont toutes les lignes sont dans leurs segments
+        self.segmented = {
+            label for label, rows in self.rows.items()
+            if np.array_equal(vector_store.partition_rows(label), rows)
+        }
+
+    def extended(self, vector_store, rows, labels):
+        """Partitions avec les positions ajoutées (déjà rangées dans les segments de leur partition par
+        VectorStore.partitioned); ces partitions restent inchangées"""
+        partitions = DomainPartitions.__new__(DomainPartitions)
+        partitions.confidence_threshold = self.confidence_threshold
+        partitions.vector_store = vector_store
+        partitions.total_rows = len(vector_store)
+
+        rows = np.asarray(rows, dtype=np.int64)
+        labels = np.array([normalize_domain_label(label) for label in labels])
+        partitions.rows = dict(self.rows)
+        partitions.segmented = set(self.segmented)
+        for label in np.unique(labels).tolist():
+            added = rows[labels == label]
+            if label not in partitions.rows:
+                partitions.segmented.add(label)
+            partitions.rows[label] = np.concatenate([self.rows.get(label, np.zeros(0, dtype=np.int64)), added])
+        return partitions
+
+    def route(self, domain, confidence):
+        """Partitions à interroger, ou None pour interroger tout le corpus"""
+        domain = normalize_domain_label(domain)
+        if confidence < self.confidence_threshold or domain not in self.rows:
+            return None
+        partitions = [domain]
+        if GENERAL_PARTITION in self.rows and domain != GENERAL_PARTITION:
+            partitions.append(GENERAL_PARTITION)
+        return partitions
+
+    def rows_for(self, partitions):
+        """Positions d'index couvertes par les partitions"""
+        return np.sort(np.concatenate([self.rows[label] for label in partitions]))
+
+    def search(self, query_embedding, partitions, top_k):
+        """Recherche dans les segments des partitions, fusion des meilleurs scores"""
+        if all(label in self.segmented for label in partitions):
+            return self.vector_store.search(query_embedding, top_k, partitions=set(partitions))
+
+        # Repli: parcours de tout le store filtré sur les lignes des partitions
+        key = tuple(sorted(partitions))
+        selector = self.vector_store.selector(('domain',) + key, self.rows_for(partitions))
+        return self.vector_store.search(query_embedding, top_k, selector)
+
+    def report(self):
+        """Taille de chaque partition"""
+        return {
+            'partitions': {label: int(len(rows)) for label, rows in self.rows.items()},
+            'total_rows': int(self.total_rows),
+            'segmented_partitions': sorted(self.segmented),
+            'confidence_threshold': self.confidence_threshold
+        }
@@ -0,0 +1,16 @@
+# backend/finance_vocabulary.py
+
+# Vocabulaire spécialisé finance/actuariat par groupe: routage des textes de FinancialEmbedder,
+# reformulations de QueryExpander. Sans dépendance (ni modèle ni torch): partagé avec les
+# embedders de benchmark.
+FINANCE_TERMS = {
+    'risk_terms': ['var', 'cvar', 'volatility', 'liquidity', 'stress_testing', 'capital_adequacy'],
+    'regulation_terms': ['basel', 'ifrs', 'solvency', 'compliance', 'regulation', 'reporting'],
+    'actuarial_terms': ['mortality', 'longevity', 'reserving', 'premium', 'annuity', 'underwriting'],
+    'quantitative_terms': ['derivatives', 'pricing', 'valuation', 'hedging', 'portfolio', 'optimization']
+}
+
+
+def finance_vocabulary():
+    """Copie du vocabulaire (les listes peuvent être enrichies par l'embedder qui la reçoit)"""
+    return {group: list(terms) for group, terms in FINANCE_TERMS.items()}
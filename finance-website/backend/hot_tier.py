@@ -0,0 +1,85 @@
+# backend/hot_tier.py
+import threading
+from collections import Counter
+import faiss
+import numpy as np
+
+
+class AccessTracker:
+    """Nombre de fois où chaque chunk a été retourné (décroissance à chaque reconstruction du tier chaud)"""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.queries = 0
+        self.queries_since_refresh = 0
+        self.hot_hits = 0
+        self.cold_fallbacks = 0
+        self._lock = threading.Lock()
+
+    def record(self, chunk_ids, count_query=True):
+        """Chunks retournés par une requête (count_query=False: candidats d'une étape intermédiaire)"""
+        with self._lock:
+            self.counts.update(chunk_ids)
+            if count_query:
+                self.queries += 1
+                self.queries_since_refresh += 1
+
+    def record_tier(self, hot):
+        with self._lock:
+            if hot:
+                self.hot_hits += 1
+            else:
+                self.cold_fallbacks += 1
+
+    def most_accessed(self, n, decay=0.5):
+        """Chunks les plus retournés; les compteurs sont ensuite atténués pour suivre l'évolution des requêtes"""
+        with self._lock:
+            chunk_ids = [chunk_id for chunk_id, _ in self.counts.most_common(n)]
+            self.counts = Counter({
+                chunk_id: count * decay for chunk_id, count in self.counts.items() if count * decay >= 0.5
+            })
+            self.queries_since_refresh = 0
+        return chunk_ids
+
+    def report(self):
+        with self._lock:
+            served = self.hot_hits + self.cold_fallbacks
+            return {
+                'queries': self.queries,
+                'tracked_chunks': len(self.counts),
+                'hot_hits': self.hot_hits,
+                'cold_fallbacks': self.cold_fallbacks,
+                'hot_hit_rate': round(self.hot_hits / served, 4) if served else 0.0
+            }
+
+
+class HotTier:
+    """Petit index plat en RAM: vecteurs et texte décodé des chunks les plus consultés"""
+
+    def __init__(self, rows, vector_store, chunk_store):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.chunk_ids = vector_store.chunk_ids[self.rows]
+        self.index = faiss.IndexFlatIP(vector_store.dimension)
+        if len(self.rows):
+            self.index.add(vector_store.vectors(self.rows))
+        # Texte épinglé: ni lecture du buffer mmap ni décompression de bloc pour ces chunks
+        self.texts = {int(chunk_id): chunk_store.text(int(chunk_id)) for chunk_id in self.chunk_ids}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query_embedding, top_k):
+        """(scores, lignes du store vectoriel) des meilleurs chunks chauds"""
+        k = min(top_k, len(self.rows))
+        if not k:
+            return np.zeros((1, 0), dtype=np.float32), np.zeros((1, 0), dtype=np.int64)
+        scores, positions = self.index.search(query_embedding, k)
+        valid = positions[0] >= 0
+        return scores[:, valid], self.rows[positions[0][valid]].reshape(1, -1)
+
+    def nbytes(self):
+        text_bytes = sum(len(text.encode('utf-8')) for text in self.texts.values())
+        return int(self.index.ntotal * self.index.d * 4 + text_bytes)
+
+    def report(self):
+        return {'chunks': len(self.rows), 'bytes': self.nbytes()}
@@ -0,0 +1,956 @@
+# backend/hybrid_search.py
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from advanced_prompts import AdvancedPromptEngine
+from chunk_store import attach_chunk_store
+from scipy import sparse
+from near_duplicates import MinHashDeduplicator, MinHashIndex, deduplication_report
+from lexical_index import SparseRowSegments
+from document_index import DocumentLevelIndex
+from domain_partitions import DomainPartitions, GENERAL_PARTITION, normalize_domain_label
+from citation_index import CitationIndex
+from binary_index import BinaryPrefilter
+from vector_store import VectorStore, attach_vector_store
+from hot_tier import AccessTracker, HotTier
+from query_expansion import QueryExpander
+from query_context import QueryContext, embedding_key
+from token_chunker import TokenChunker, fit_chunk_store
+from search_results import SearchHit, SearchResult
+
+class AdvancedHybridSearch:
+    # Recherche document -> chunk activée à partir de ce nombre de documents
+    HIERARCHICAL_MIN_DOCUMENTS = 20
+    # Au-delà de cette part de lignes retirées (chunks supprimés ou regroupés), reconstruction complète
+    MAX_REMOVED_FRACTION = 0.2
+    # Au-delà de cette part de lignes ajoutées depuis l'ajustement du TF-IDF (vocabulaire et idf figés),
+    # reconstruction complète
+    MAX_UNFITTED_FRACTION = 0.25
+    
+    def __init__(self, knowledge_base, compress_text=True, deduplicate=True, hierarchical=True,
+                 top_documents=10, document_score_threshold=0.2, partition_by_domain=True,
+                 domain_confidence_threshold=0.6, binary_prefilter=False, binary_candidates=300,
+                 rerank_margin=0.05, rerank_band=5, hot_tier_size=2000, hot_confidence=0.5,
+                 hot_refresh_every=200, embedder=None, cross_encoder=None, prompt_engine=None, fit_chunks=True,
+                 restored=None, previous=None):
+        self.kb = knowledge_base
+        self.chunk_store = attach_chunk_store(knowledge_base)
+        if embedder is None:
+            # Modèles sentence-transformers importés seulement sans embedder fourni (benchmarks et
+            # tests: numpy, faiss et sklearn suffisent)
+            from advanced_embeddings import FinancialEmbedder
+            embedder = FinancialEmbedder()
+        self.embedder = embedder
+        self.deduplicator = MinHashDeduplicator() if deduplicate else None
+        # Base héritée: chunks plus longs que la séquence du modèle redécoupés avant indexation
+        self.fit_chunks = fit_chunks
+        self.hierarchical = hierarchical
+        self.top_documents = top_documents
+        self.document_score_threshold = document_score_threshold
+        self.partition_by_domain = partition_by_domain
+        self.domain_confidence_threshold = domain_confidence_threshold
+        # Moteur de prompts du chatbot: les scores de domaine d'une requête sont mis en cache par moteur
+        # dans son QueryContext, un seul moteur les calcule une fois pour la recherche et le prompt
+        self.prompt_engine = prompt_engine if prompt_engine is not None else AdvancedPromptEngine()
+        self.query_expander = QueryExpander(self.embedder.finance_terms, self.prompt_engine.domain_experts)
+        self.use_binary_prefilter = binary_prefilter
+        self.binary_candidates = binary_candidates
+        
+        # Re-ranking en cascade: cross-encoder réservé à la bande incertaine autour du rang k
+        self.rerank_margin = rerank_margin
+        self.rerank_band = rerank_band
+        # Modèles partagés entre snapshots d'index (embedder, cross-encoder)
+        self._cross_encoder = cross_encoder
+        self._counters_lock = threading.Lock()
+        self.rerank_counters = {
+            'queries': 0,
+            'stage1_only': 0,
+            'stage2': 0,
+            'cross_encoder_pairs': 0,
+            'cross_encoder_pairs_saved': 0
+        }
+        
+        # Tier chaud: chunks les plus retournés, reconstruit toutes les hot_refresh_every requêtes
+        self.hot_tier_size = hot_tier_size
+        self.hot_confidence = hot_confidence
+        self.hot_refresh_every = hot_refresh_every
+        self.access_tracker = AccessTracker()
+        self.hot_tier = None
+        self._hot_refresh_lock = threading.Lock()
+        
+        self._query_stats = threading.local()
+        # Index déjà construits (snapshot importé) repris au lieu d'être recalculés; moteur précédent
+        # (base étendue par une ingestion) mis à jour avec les seuls chunks ajoutés ou supprimés
+        self.setup_hybrid_index(restored, previous)
+        
+        # Texte compressé par blocs une fois les index construits
+        if compress_text and len(self.chunk_store):
+            self.chunk_store.compress()
+    
+    @property
+    def last_search_stats(self):
+        """Statistiques de la dernière recherche du thread courant"""
+        return getattr(self._query_stats, 'stats', {})
+    
+    @property
+    def embeddings(self):
+        """Vecteurs des chunks indexés, dans l'ordre des positions d'index (copie si le store a plusieurs
+        segments: les recherches lisent les lignes utiles via vector_store.vectors)"""
+        return self.vector_store.embeddings
+    
+    @contextmanager
+    def stage_timer(self, stage):
+        """Chronomètre une étape de la recherche (last_search_stats['timings_ms'])"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings = self.last_search_stats.setdefault('timings_ms', {})
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+    
+    def setup_hybrid_index(self, restored=None, previous=None):
+        """Initialise les index hybrides"""
+        # Index sémantique FAISS (store vectoriel unique, rattaché à la base à la construction)
+        self.embedding_dim = 384  # Dimension des embeddings
+        self.vector_store = VectorStore.build([], [], self.embedding_dim)
+        
+        # Index lexical TF-IDF avec paramètres optimisés
+        self.tfidf_vectorizer = TfidfVectorizer(
+            ngram_range=(1, 3),  # Bigrams et trigrams
+            max_features=20000,
+            stop_words='english',
+            min_df=2,
+            max_df=0.8
+        )
+        
+        # Correspondance position dans les index -> identifiant du chunk dans le store
+        self.indexed_ids = np.zeros(0, dtype=np.int64)
+        self.duplicate_groups = {}
+        self.dedup_report = {}
+        self.chunk_fit_report = {}
+        self.document_index = None
+        self.document_level_index = None
+        self.domain_partitions = None
+        self.minhash_index = None
+        self.minhash_count = 0
+        self.tfidf_fitted_rows = 0
+        self.citation_index = CitationIndex()
+        self.binary_prefilter = None
+        self.binary_report = {}
+        self.build_timings = {}
+        self.reused_vectors = 0
+        
+        # Préparation des données
+        if restored is not None:
+            self.restore_indices(restored)
+        elif previous is None or not self.update_indices(previous):
+            self.prepare_indices()
+    
+    def prepare_indices(self):
+        """Prépare les indices avec les chunks"""
+        if not len(self.chunk_store):
+            return
+        
+        # Chunks découpés en caractères, jamais indexés (ni manifeste ni store vectoriel): le texte
+        # au-delà de la limite de tokens du modèle serait tronqué à l'encodage, donc invisible
+        chunker = TokenChunker.from_embedder(self.embedder) if self.fit_chunks else None
+        if (chunker is not None and getattr(self.kb, 'manifest', None) is None
+                and getattr(self.kb, 'vector_store', None) is None):
+            start = time.perf_counter()
+            store, self.chunk_fit_report = fit_chunk_store(self.chunk_store, chunker)
+            if store is not None:
+                self.kb.chunks = self.chunk_store = store
+                print(f"✂️ Chunks redécoupés: {self.chunk_fit_report['oversized_chunks']} au-delà de "
+                      f"{chunker.max_tokens} tokens ({self.chunk_fit_report['chunks_after']} chunks)")
+            self.build_timings['fit_chunks_s'] = time.perf_counter() - start
+        self.chunk_store.compact()
+        
+        # Chunks supprimés par une réingestion (tombstones du manifeste) exclus des index
+        manifest = getattr(self.kb, 'manifest', None)
+        if manifest is not None:
+            live_ids = manifest.live_ids(len(self.chunk_store))
+        else:
+            live_ids = np.arange(len(self.chunk_store), dtype=np.int64)
+        
+        # Déduplication: un seul représentant indexé par groupe de quasi-doublons
+        start = time.perf_counter()
+        if self.deduplicator is not None:
+            signatures = self.deduplicator.signatures(self.chunk_store.text(int(chunk_id)) for chunk_id in live_ids)
+            representatives, duplicate_groups, self.dedup_report = self.deduplicator.deduplicate(
+                None, embedding_dim=self.embedding_dim, signatures=signatures
+            )
+            # Signatures conservées pour dédupliquer les chunks des ingestions suivantes
+            self.minhash_index = MinHashIndex(self.deduplicator, live_ids, signatures)
+            self.minhash_count = len(live_ids)
+            self.indexed_ids = live_ids[representatives]
+            self.duplicate_groups = {
+                int(live_ids[representative]): [int(live_ids[member]) for member in members]
+                for representative, members in duplicate_groups.items()
+            }
+            print(f"🧹 Déduplication: {self.dedup_report['duplicates_collapsed']} quasi-doublons regroupés "
+                  f"({self.dedup_report['indexed_chunks']}/{self.dedup_report['chunks']} chunks indexés)")
+        else:
+            self.indexed_ids = live_ids
+        
+        self.build_timings['dedup_s'] = time.perf_counter() - start
+        
+        # Store vectoriel de la base réutilisé s'il couvre déjà les mêmes chunks
+        vector_store = getattr(self.kb, 'vector_store', None)
+        if isinstance(vector_store, VectorStore) and np.array_equal(vector_store.chunk_ids, self.indexed_ids):
+            self.vector_store = vector_store
+            self.reused_vectors = len(vector_store)
+        else:
+            # Embeddings sémantiques: vecteurs déjà calculés (ingestion) repris, les autres encodés par lots
+            start = time.perf_counter()
+            embeddings = self._indexed_embeddings(vector_store if isinstance(vector_store, VectorStore) else None)
+            self.build_timings['embed_s'] = time.perf_counter() - start
+            
+            # Ajout à FAISS: l'index conserve la seule copie des vecteurs
+            start = time.perf_counter()
+            self.vector_store = VectorStore.build(embeddings, self.indexed_ids, self.embedding_dim)
+            del embeddings
+            self.build_timings['faiss_s'] = time.perf_counter() - start
+        
+        # Un seul index vectoriel, partagé par la base, la recherche hybride et le mode dégradé
+        attach_vector_store(self.kb, self.vector_store)
+        
+        # Index TF-IDF
+        start = time.perf_counter()
+        self.tfidf_matrix = SparseRowSegments([self.tfidf_vectorizer.fit_transform(self._indexed_texts())])
+        self.tfidf_fitted_rows = len(self.tfidf_matrix)
+        self.build_timings['tfidf_s'] = time.perf_counter() - start
+        
+        self.build_auxiliary_indexes()
+    
+    def restore_indices(self, restored):
+        """Reprend les index d'un snapshot exporté (knowledge_snapshot): ni déduplication, ni encodage,
+        ni TF-IDF; seuls les index auxiliaires dérivés des vecteurs sont reconstruits"""
+        start = time.perf_counter()
+        self.indexed_ids = restored['indexed_ids']
+        self.duplicate_groups = restored['duplicate_groups']
+        self.dedup_report = restored['dedup_report']
+        self.vector_store = self.kb.vector_store
+        self.reused_vectors = len(self.vector_store)
+        self.tfidf_vectorizer = restored['tfidf_vectorizer']
+        self.tfidf_matrix = SparseRowSegments([restored['tfidf_matrix']])
+        self.tfidf_fitted_rows = len(self.tfidf_matrix)
+        self.citation_index = restored['citation_index']
+        if self.deduplicator is not None and restored.get('minhash') is not None:
+            chunk_ids, signatures = restored['minhash']
+            self.minhash_index = MinHashIndex(self.deduplicator, chunk_ids, signatures)
+            self.minhash_count = len(chunk_ids)
+        self.build_timings['restore_s'] = time.perf_counter() - start
+        self.build_auxiliary_indexes(citations=False)
+    
+    def _can_update(self, previous, vector_store):
+        """Le moteur précédent peut-il être mis à jour (mêmes réglages, base qui prolonge la sienne)"""
+        previous_store = previous.vector_store
+        return (
+            getattr(previous, 'tfidf_matrix', None) is not None and len(previous.indexed_ids) > 0
+            and previous.embedder is self.embedder
+            and (previous.deduplicator is None) == (self.deduplicator is None)
+            and (self.deduplicator is None or previous.minhash_index is not None)
+            and previous.hierarchical == self.hierarchical
+            and previous.partition_by_domain == self.partition_by_domain
+            and (not self.partition_by_domain or previous.domain_partitions is not None)
+            # Préfiltre binaire (optionnel): codes reconstruits avec l'index complet
+            and not self.use_binary_prefilter and previous.binary_prefilter is None
+            and isinstance(vector_store, VectorStore)
+            and len(self.chunk_store) >= len(previous.chunk_store)
+            and len(vector_store) >= len(previous_store)
+            and np.array_equal(vector_store.chunk_ids[:len(previous_store)], previous_store.chunk_ids)
+        )
+    
+    def update_indices(self, previous):
+        """Mise à jour incrémentale depuis le moteur précédent, dont la base a été étendue par une ingestion
+
+        Seuls les chunks ajoutés sont dédupliqués (état LSH conservé), encodés si l'ingestion ne l'a pas
+        fait, libellés, transformés en TF-IDF (vectoriseur de la dernière construction complète) et
+        ajoutés aux index; les chunks supprimés restent en place, exclus des recherches. Seuls les
+        documents modifiés sont recalculés dans l'index documentaire et l'index des citations.
+        Retourne False sans rien modifier si une reconstruction complète est nécessaire: trop de
+        lignes retirées ou ajoutées depuis l'ajustement du TF-IDF, ou représentant de quasi-doublons
+        supprimé alors que son groupe subsiste.
+        """
+        start = time.perf_counter()
+        self.chunk_store.compact()
+        vector_store = getattr(self.kb, 'vector_store', None)
+        if not self._can_update(previous, vector_store):
+            return False
+        base_rows = len(previous.vector_store)
+        count = len(self.chunk_store)
+        
+        manifest = getattr(self.kb, 'manifest', None)
+        previous_manifest = getattr(previous.kb, 'manifest', None)
+        tombstones = manifest.tombstones if manifest is not None else np.zeros(0, dtype=np.int64)
+        previous_tombstones = (previous_manifest.tombstones if previous_manifest is not None
+                               else np.zeros(0, dtype=np.int64))
+        removed_ids = np.setdiff1d(tombstones, previous_tombstones)
+        
+        def is_dead(chunk_id):
+            position = np.searchsorted(tombstones, chunk_id)
+            return position < len(tombstones) and tombstones[position] == chunk_id
+        
+        # Groupes de quasi-doublons touchés par les suppressions
+        representative_of = {
+            member: representative
+            for representative, members in previous.duplicate_groups.items() for member in members
+        }
+        duplicate_groups = dict(previous.duplicate_groups)
+        removed_set = set(removed_ids.tolist())
+        for representative in {representative_of[chunk_id] for chunk_id in removed_set if chunk_id in representative_of}:
+            members = [member for member in duplicate_groups[representative] if member not in removed_set]
+            if representative in removed_set and members:
+                return False
+            if len(members) > 1:
+                duplicate_groups[representative] = members
+            else:
+                duplicate_groups.pop(representative, None)
+        
+        # Chunks ajoutés: vecteurs écrits par l'ingestion à la suite du store précédent, sinon encodés ici
+        added_ids = np.arange(len(previous.chunk_store), count, dtype=np.int64)
+        appended_ids = vector_store.chunk_ids[base_rows:]
+        embed = not len(appended_ids) and len(added_ids)
+        if embed:
+            appended_ids = added_ids[~np.isin(added_ids, tombstones)]
+        elif not np.array_equal(appended_ids, added_ids):
+            return False
+        
+        # Lignes retirées des recherches: chunks supprimés et chunks ajoutés déjà supprimés
+        removed_rows = vector_store.rows_of(removed_ids)
+        removed_rows = removed_rows[(removed_rows >= 0) & (removed_rows < base_rows)]
+        new_dead = np.isin(appended_ids, tombstones)
+        dead_count = (base_rows - previous.vector_store.live_count) + len(removed_rows) + int(new_dead.sum())
+        if dead_count > self.MAX_REMOVED_FRACTION * (base_rows + len(appended_ids)):
+            return False
+        unfitted_rows = base_rows + len(appended_ids) - previous.tfidf_fitted_rows
+        if unfitted_rows > self.MAX_UNFITTED_FRACTION * previous.tfidf_fitted_rows:
+            return False
+        
+        if embed:
+            embed_start = time.perf_counter()
+            embeddings = self.embedder.get_embeddings([self.chunk_store.text(int(chunk_id)) for chunk_id in appended_ids])
+            vector_store = vector_store.appended(embeddings, appended_ids)
+            self.build_timings['embed_s'] = time.perf_counter() - embed_start
+        else:
+            self.reused_vectors = len(appended_ids)
+        new_rows = np.arange(base_rows, len(vector_store), dtype=np.int64)
+        
+        # Déduplication des seuls chunks ajoutés contre l'état LSH du moteur précédent
+        dedup_start = time.perf_counter()
+        live_rows, collapsed_rows = [], []
+        row = previous.minhash_count
+        for position, chunk_id in zip(new_rows.tolist(), appended_ids.tolist()):
+            if new_dead[position - base_rows]:
+                continue
+            anchor = None
+            if self.deduplicator is not None:
+                anchor = previous.minhash_index.add(row, chunk_id, self.chunk_store.text(chunk_id), is_dead)
+                row += 1
+            if anchor is None:
+                live_rows.append(position)
+                continue
+            representative = representative_of.get(anchor, anchor)
+            duplicate_groups[representative] = duplicate_groups.get(representative, [representative]) + [chunk_id]
+            representative_of[chunk_id] = representative
+            collapsed_rows.append(position)
+        self.minhash_index, self.minhash_count = previous.minhash_index, row
+        self.duplicate_groups = duplicate_groups
+        self.build_timings['dedup_s'] = time.perf_counter() - dedup_start
+        
+        live_rows = np.asarray(live_rows, dtype=np.int64)
+        dead_rows = np.concatenate([removed_rows, new_rows[new_dead], np.asarray(collapsed_rows, dtype=np.int64)])
+        if len(dead_rows):
+            vector_store = vector_store.without_rows(dead_rows)
+        self.indexed_ids = np.concatenate([previous.indexed_ids, appended_ids])
+        live_ids = self.indexed_ids[live_rows]
+        
+        # TF-IDF des chunks ajoutés (lignes vides pour les chunks retirés)
+        tfidf_start = time.perf_counter()
+        self.tfidf_vectorizer = previous.tfidf_vectorizer
+        self.tfidf_fitted_rows = previous.tfidf_fitted_rows
+        lexical = self.tfidf_vectorizer.transform([self.chunk_store.text(int(chunk_id)) for chunk_id in live_ids])
+        placement = sparse.csr_matrix(
+            (np.ones(len(live_rows)), (live_rows - base_rows, np.arange(len(live_rows)))),
+            shape=(len(new_rows), len(live_rows))
+        )
+        self.tfidf_matrix = previous.tfidf_matrix.appended(placement @ lexical)
+        self.build_timings['tfidf_s'] = time.perf_counter() - tfidf_start
+        
+        auxiliary_start = time.perf_counter()
+        # Partitions: libellé des seuls chunks ajoutés, rangés dans les segments de leur partition
+        if self.partition_by_domain:
+            labels = self._domain_labels(live_ids)
+            vector_store = vector_store.partitioned(live_rows, [normalize_domain_label(label) for label in labels])
+            self.domain_partitions = previous.domain_partitions.extended(vector_store, live_rows, labels)
+        self.vector_store = vector_store
+        attach_vector_store(self.kb, self.vector_store)
+        
+        # Index documentaire: centroïdes des seuls documents touchés
+        source_codes = self.chunk_store.columns.get('source')
+        if previous.document_level_index is not None and source_codes is not None:
+            source_codes = np.asarray(source_codes)
+            self.document_level_index = previous.document_level_index.updated(
+                self.vector_store, live_rows, source_codes[live_ids], removed_rows,
+                source_codes[self.indexed_ids[removed_rows]]
+            )
+            if len(self.document_level_index) >= self.HIERARCHICAL_MIN_DOCUMENTS:
+                self.document_index = self.document_level_index
+        elif self.hierarchical:
+            self.build_document_index()
+        
+        # Citations: seuls les documents modifiés, ajoutés ou supprimés sont relus
+        self._update_citations(previous, manifest, previous_manifest, removed_ids, live_ids, is_dead)
+        self.build_timings['auxiliary_indexes_s'] = time.perf_counter() - auxiliary_start
+        
+        if self.deduplicator is not None:
+            self.dedup_report = deduplication_report(
+                int(self.vector_store.live_count), duplicate_groups, self.embedding_dim,
+                self.build_timings['dedup_s']
+            )
+        self.build_timings['incremental_s'] = time.perf_counter() - start
+        print(f"⚡ Mise à jour incrémentale: {len(live_rows)} chunks indexés, {len(collapsed_rows)} quasi-doublons, "
+              f"{len(removed_rows)} retirés ({self.build_timings['incremental_s']:.2f}s)")
+        return True
+    
+    def _update_citations(self, previous, manifest, previous_manifest, removed_ids, live_ids, is_dead):
+        """Index des citations du moteur précédent mis à jour pour les documents touchés"""
+        if previous.citation_index.document_keys is None:
+            # Index chargé d'un ancien format (sans clés par document): reconstruit une fois
+            reading_order = manifest.reading_order(len(self.chunk_store)) if manifest is not None else None
+            self.citation_index = CitationIndex().build(self.chunk_store, reading_order)
+            return
+        previous_documents = previous_manifest.documents if previous_manifest is not None else {}
+        if manifest is not None:
+            documents = [source for source, document in manifest.documents.items()
+                         if previous_documents.get(source) is not document]
+            documents += [source for source in previous_documents if source not in manifest.documents]
+            reading_order = [
+                int(chunk_id) for source in documents if source in manifest.documents
+                for chunk_id in manifest.documents[source]['chunk_ids']
+                if chunk_id < len(self.chunk_store) and not is_dead(chunk_id)
+            ]
+        else:
+            documents = sorted({self.chunk_store.metadata(int(chunk_id)).get('source', '') for chunk_id in live_ids})
+            reading_order = [int(chunk_id) for chunk_id in live_ids]
+        previous_ids = [previous_documents[source]['chunk_ids'] for source in documents if source in previous_documents]
+        stale_ids = np.union1d(removed_ids, np.concatenate(previous_ids) if previous_ids else np.zeros(0, np.int64))
+        self.citation_index = previous.citation_index.updated(self.chunk_store, documents, stale_ids, reading_order)
+    
+    def build_auxiliary_indexes(self, citations=True):
+        """Préfiltre binaire, index documentaire, partitions par domaine et index des citations"""
+        start = time.perf_counter()
+        
+        # Premier étage binaire optionnel (Hamming) avec re-scoring float
+        if self.use_binary_prefilter:
+            self.build_binary_prefilter()
+        
+        # Index documentaire (centroïdes) pour la recherche hiérarchique
+        if self.hierarchical:
+            self.build_document_index()
+        
+        # Partitions par domaine
+        if self.partition_by_domain:
+            self.build_domain_partitions()
+        
+        # Index des citations réglementaires (article / paragraphe -> chunks)
+        if citations:
+            manifest = getattr(self.kb, 'manifest', None)
+            reading_order = manifest.reading_order(len(self.chunk_store)) if manifest is not None else None
+            self.citation_index.build(self.chunk_store, reading_order)
+        self.build_timings['auxiliary_indexes_s'] = time.perf_counter() - start
+        print(f"📜 Index des citations: {len(self.citation_index)} articles/paragraphes")
+    
+    def build_binary_prefilter(self):
+        """Construit les codes binaires et mesure le recall du préfiltre"""
+        embeddings = self.embeddings
+        self.binary_prefilter = BinaryPrefilter(embeddings, candidates=self.binary_candidates)
+        self.binary_report = self.binary_prefilter.report()
+        self.binary_report['recall_at_10'] = round(self.binary_prefilter.measure_recall(embeddings), 4)
+        print(f"🔢 Préfiltre binaire: mémoire /{self.binary_report['memory_reduction']}, "
+              f"recall@10 {self.binary_report['recall_at_10']}")
+    
+    def label_chunk_domain(self, text):
+        """Libellé de domaine d'un chunk (partition 'general' si aucun terme clé)"""
+        domain_scores = self.prompt_engine.score_domains(text)
+        best = max(domain_scores, key=domain_scores.get)
+        return best if domain_scores[best] > 0 else GENERAL_PARTITION
+    
+    def _domain_labels(self, chunk_ids):
+        """Libellé de domaine des chunks: colonne 'domain' du store, sinon attribué puis conservé"""
+        existing = self.chunk_store.columns.get('domain')
+        labels = []
+        labelled = False
+        for chunk_id in chunk_ids:
+            code = existing[chunk_id] if existing is not None else -1
+            if code >= 0:
+                labels.append(self.chunk_store.dictionaries['domain'][code])
+            else:
+                labels.append(self.label_chunk_domain(self.chunk_store.text(int(chunk_id))))
+                labelled = True
+        
+        # Le libellé est conservé comme colonne de métadonnées du store (colonne d'un snapshot
+        # importé déjà complète: laissée en memory-map)
+        if labelled:
+            self.chunk_store.set_values('domain', chunk_ids, labels)
+        return labels
+    
+    def build_domain_partitions(self):
+        """Partitionne l'index sémantique selon le domaine attribué à l'ingestion"""
+        labels = self._domain_labels(self.indexed_ids)
+        
+        # Vecteurs regroupés en segments par partition (seuls les segments des partitions routées
+        # sont parcourus), store partagé avec la base
+        self.vector_store = self.vector_store.partitioned(
+            np.arange(len(self.indexed_ids)), [normalize_domain_label(label) for label in labels]
+        )
+        attach_vector_store(self.kb, self.vector_store)
+        self.domain_partitions = DomainPartitions(
+            self.vector_store, labels, confidence_threshold=self.domain_confidence_threshold
+        )
+        print(f"🗂️  Partitions par domaine: {self.domain_partitions.report()['partitions']}")
+    
+    def route_query(self, query, top_k):
+        """Partitions à interroger pour la requête (None = tout le corpus)"""
+        if self.domain_partitions is None:
+            return None
+        domain, confidence = self.prompt_engine.detect_domain_with_confidence(QueryContext.of(query))
+        partitions = self.domain_partitions.route(domain, confidence)
+        if partitions and len(self.domain_partitions.rows_for(partitions)) < top_k:
+            partitions = None
+        
+        self.last_search_stats.update({
+            'domain': domain,
+            'domain_confidence': round(confidence, 3),
+            'partitions': partitions or 'all'
+        })
+        return partitions
+    
+    def build_document_index(self):
+        """Construit l'index grossier document -> chunks à partir de la colonne 'source'"""
+        source_codes = self.chunk_store.columns.get('source')
+        if source_codes is None:
+            return
+        document_index = DocumentLevelIndex(self.vector_store, np.asarray(source_codes)[self.indexed_ids])
+        # Conservé sous le seuil pour être mis à jour par les ingestions suivantes
+        self.document_level_index = document_index
+        if len(document_index) >= self.HIERARCHICAL_MIN_DOCUMENTS:
+            self.document_index = document_index
+            print(f"📑 Index documentaire: {len(document_index)} documents")
+
+    def apply_document_summaries(self, summaries):
+        """Représente chaque document de l'index documentaire par l'embedding de son résumé
+        ({source: résumé}) au lieu du centroïde de ses chunks; retourne le nombre de documents mis à jour"""
+        if self.document_index is None or not summaries:
+            return 0
+        codes = {source: self.chunk_store.code('source', source) for source in summaries}
+        sources = [source for source, code in codes.items() if code is not None]
+        if not sources:
+            return 0
+        embeddings = self.embedder.get_embeddings([summaries[source] for source in sources])
+        return self.document_index.set_document_embeddings([codes[source] for source in sources], embeddings)
+
+    def refresh_hot_tier(self):
+        """Reconstruit le tier chaud à partir des compteurs d'accès (ignoré si une reconstruction est en cours)"""
+        if not self.hot_tier_size or not self._hot_refresh_lock.acquire(blocking=False):
+            return
+        try:
+            self._build_hot_tier()
+        finally:
+            self._hot_refresh_lock.release()
+    
+    def schedule_hot_tier_refresh(self):
+        """Reconstruit le tier chaud dans un thread d'arrière-plan: la requête qui atteint le seuil n'attend
+        pas la copie des vecteurs et le décodage des textes (False si une reconstruction est en cours)"""
+        if not self.hot_tier_size or not self._hot_refresh_lock.acquire(blocking=False):
+            return False
+        
+        def run():
+            try:
+                self._build_hot_tier()
+            except Exception as e:
+                print(f"⚠️  Erreur reconstruction du tier chaud: {e}")
+            finally:
+                self._hot_refresh_lock.release()
+        
+        threading.Thread(target=run, name='hot-tier-refresh', daemon=True).start()
+        return True
+    
+    def _build_hot_tier(self):
+        rows = self._rows_of(self.access_tracker.most_accessed(self.hot_tier_size))
+        # Nouveau tier construit à part puis publié par une seule affectation (recherches en cours sur l'ancien)
+        self.hot_tier = HotTier(rows, self.vector_store, self.chunk_store) if len(rows) else None
+    
+    def hot_tier_report(self):
+        """Taille du tier chaud et part des recherches sémantiques servies sans le tier froid"""
+        hot_tier = self.hot_tier
+        report = self.access_tracker.report()
+        report.update(hot_tier.report() if hot_tier is not None else {'chunks': 0, 'bytes': 0})
+        report.update({'capacity': self.hot_tier_size, 'confidence': self.hot_confidence})
+        return report
+    
+    def _rows_of(self, chunk_ids):
+        """Lignes du store vectoriel des chunks indexés parmi chunk_ids"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if not len(chunk_ids) or not len(self.indexed_ids):
+            return np.zeros(0, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.indexed_ids, chunk_ids), len(self.indexed_ids) - 1)
+        return np.unique(positions[self.indexed_ids[positions] == chunk_ids])
+    
+    def _indexed_embeddings(self, vector_store=None, batch_size=256):
+        """Embeddings des chunks indexés, repris de vector_store quand il les contient"""
+        embeddings = np.zeros((len(self.indexed_ids), self.embedding_dim), dtype=np.float32)
+        rows = vector_store.rows_of(self.indexed_ids) if vector_store is not None else np.full(len(embeddings), -1)
+        known = rows >= 0
+        if known.any():
+            embeddings[known] = vector_store.vectors(rows[known])
+        
+        # Textes lus depuis le store et encodés par lots
+        missing = np.flatnonzero(~known)
+        for start in range(0, len(missing), batch_size):
+            positions = missing[start:start + batch_size]
+            texts = [self.chunk_store.text(int(self.indexed_ids[position])) for position in positions]
+            embeddings[positions] = self.embedder.get_embeddings(texts)
+        self.reused_vectors = int(known.sum())
+        return embeddings
+    
+    def _indexed_texts(self):
+        """Textes des chunks indexés, dans l'ordre des index"""
+        for chunk_id in self.indexed_ids:
+            yield self.chunk_store.text(int(chunk_id))
+    
+    def hybrid_search(self, query, top_k=5, semantic_weight=0.7, lexical_weight=0.3, expand=False, max_chars=None):
+        """Recherche hybride avancée (expand=True: reformulations multiples en un seul passage)"""
+        # Requête normalisée une fois; domaine et embedding partagés par toutes les étapes
+        query = QueryContext.of(query)
+        
+        # Remise à zéro du compteur de décodage du thread
+        self.chunk_store.take_decode_stats()
+        self._query_stats.stats = {}
+        
+        # Base vide (aucun document de référence ni ingéré): aucun index construit
+        if not len(self.indexed_ids):
+            return []
+        
+        if expand:
+            # Reformulations cherchées ensemble puis fusionnées par rang réciproque
+            fused_results = self.multi_query_search(query, top_k * 3)
+        else:
+            # Routage vers les partitions du domaine détecté
+            partitions = self.route_query(query, top_k * 3)
+            
+            # Embedding de la requête (réutilisé par la recherche sémantique et le re-ranking)
+            with self.stage_timer('embed'):
+                self.query_embedding(query)
+            
+            # Recherche sémantique
+            with self.stage_timer('semantic'):
+                semantic_results = self.semantic_search(query, top_k * 3, partitions)
+            
+            # Recherche lexicale
+            with self.stage_timer('lexical'):
+                lexical_results = self.lexical_search(query, top_k * 3, partitions)
+            
+            # Fusion intelligente
+            with self.stage_timer('fusion'):
+                fused_results = self.intelligent_fusion(
+                    semantic_results, lexical_results, 
+                    semantic_weight, lexical_weight
+                )
+        
+        # Re-ranking
+        with self.stage_timer('rerank'):
+            reranked_results = self.rerank_with_cross_encoder(query, fused_results, top_k)
+        
+        # Matérialisation du texte et des métadonnées pour les seuls résultats retournés
+        with self.stage_timer('materialize'):
+            results = self.materialize_results(reranked_results[:top_k], max_chars)
+        
+        self.last_search_stats['text_decode'] = self.chunk_store.take_decode_stats()
+        return results
+    
+    def multi_query_search(self, query, top_k, max_variants=4, rrf_k=60):
+        """Toutes les reformulations: un batch d'embeddings, un appel FAISS, un produit creux, fusion RRF"""
+        query = QueryContext.of(query)
+        variants = self.query_expander.expand(query.query, max_variants)
+        
+        # Un seul encode() et un seul appel FAISS pour toutes les variantes
+        with self.stage_timer('embed'):
+            query_embeddings = self.embedder.get_embeddings(variants)
+            # La première variante est la requête d'origine: son embedding sert au re-ranking
+            query.store(embedding_key(self.embedder), query_embeddings[0])
+        with self.stage_timer('semantic'):
+            _, semantic_positions = self.vector_store.search(query_embeddings, top_k)
+            ranked_lists = [row[row >= 0] for row in semantic_positions]
+        
+        # Un seul produit creux par segment: (chunks x termes) . (termes x variantes); lignes TF-IDF normalisées L2
+        with self.stage_timer('lexical'):
+            query_vectors = self.tfidf_vectorizer.transform(variants)
+            lexical_scores = self.tfidf_matrix.dot(query_vectors)
+            if self.vector_store.removed is not None:
+                lexical_scores[self.vector_store.removed[:len(lexical_scores)]] = 0
+            for scores in lexical_scores.T:
+                k = min(top_k, len(scores))
+                if not k:
+                    continue
+                top = np.argpartition(-scores, k - 1)[:k]
+                top = top[np.argsort(-scores[top], kind='stable')]
+                ranked_lists.append(top[scores[top] > 0])
+        
+        # Reciprocal Rank Fusion
+        with self.stage_timer('fusion'):
+            fused = {}
+            for ranked in ranked_lists:
+                for rank, position in enumerate(ranked):
+                    fused[position] = fused.get(position, 0.0) + 1.0 / (rrf_k + rank + 1)
+            hits = [
+                SearchHit(int(self.indexed_ids[position]), score, 'multi_query')
+                for position, score in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+            ]
+        
+        self.last_search_stats['query_variants'] = variants
+        return hits
+    
+    def basic_search(self, query, top_k=5, max_chars=None):
+        """Mode dégradé: recherche sémantique globale sur le store vectoriel, sans lexical ni re-ranking"""
+        self._query_stats.stats = {'semantic_mode': 'basic'}
+        scores, rows = self.vector_store.search(self.query_embedding(query), top_k)
+        hits = [
+            SearchHit(int(self.vector_store.chunk_ids[row]), float(score), 'semantic')
+            for score, row in zip(scores[0], rows[0]) if row >= 0
+        ]
+        return self.materialize_results(hits, max_chars)
+    
+    def citation_search(self, query, top_k=5, max_chars=None):
+        """Réponse directe par l'index des citations (liste vide si la requête ne cite aucun article)"""
+        # Statistiques et compteur de décodage du thread remis à zéro: ceux d'une recherche précédente
+        # ne sont pas repris
+        self.chunk_store.take_decode_stats()
+        self._query_stats.stats = {}
+        hits = [SearchHit(chunk_id, 1.0, 'citation') for chunk_id in self.citation_index.lookup(str(query), top_k)]
+        results = self.materialize_results(hits, max_chars)
+        self.last_search_stats['text_decode'] = self.chunk_store.take_decode_stats()
+        return results
+    
+    def query_embedding(self, query):
+        """Embedding de la requête, calculé une fois par QueryContext"""
+        return np.asarray(self.embedder.get_embedding(QueryContext.of(query)), dtype=np.float32).reshape(1, -1)
+    
+    def semantic_search(self, query, top_k, partitions=None):
+        """Recherche sémantique avec FAISS (tier chaud, partitions de domaine, document -> chunk, puis global)"""
+        query_embedding = self.query_embedding(query)
+        
+        # Tier chaud d'abord; tier froid si ses résultats ne sont pas assez sûrs
+        scores, indices = self.hot_search(query_embedding, top_k)
+        if indices is None and partitions:
+            scores, indices = self.domain_partitions.search(query_embedding, partitions, top_k)
+            self.last_search_stats['semantic_mode'] = 'partitioned'
+        elif indices is None and self.document_index is not None:
+            scores, indices = self.hierarchical_search(query_embedding, top_k)
+        
+        if indices is None and self.binary_prefilter is not None:
+            # Candidats Hamming re-scorés avec les vecteurs float
+            scores, indices = self.binary_prefilter.search(query_embedding[0], self.vector_store, top_k)
+            self.last_search_stats['semantic_mode'] = 'binary_rescored'
+        
+        if indices is None:
+            # Recherche globale dans FAISS (tous les segments du store)
+            scores, indices = self.vector_store.search(query_embedding, top_k)
+            self.last_search_stats['semantic_mode'] = 'global'
+        
+        removed = self.vector_store.removed
+        hits = [
+            SearchHit(int(self.indexed_ids[idx]), float(score), 'semantic')
+            for score, idx in zip(scores[0], indices[0])
+            if 0 <= idx < len(self.indexed_ids) and (removed is None or not removed[idx])
+        ]
+        # Candidats sémantiques comptés aussi: le tier chaud doit couvrir tout le voisinage des requêtes fréquentes
+        self.access_tracker.record([hit.chunk_id for hit in hits], count_query=False)
+        return hits
+    
+    def hot_search(self, query_embedding, top_k):
+        """Tier chaud seul si ses top_k scores dépassent hot_confidence, sinon (None, None) -> tier froid"""
+        hot_tier = self.hot_tier
+        if hot_tier is None:
+            return None, None
+        scores, rows = hot_tier.search(query_embedding, top_k)
+        confident = scores.shape[1] >= top_k and scores[0, -1] >= self.hot_confidence
+        self.access_tracker.record_tier(confident)
+        if not confident:
+            return None, None
+        self.last_search_stats['semantic_mode'] = 'hot'
+        return scores, rows
+    
+    def chunk_text(self, chunk_id, max_chars=None):
+        """(texte, tronqué): texte épinglé du tier chaud, sinon lu dans le store (mmap / blocs compressés)"""
+        hot_tier = self.hot_tier
+        text = hot_tier.texts.get(chunk_id) if hot_tier is not None else None
+        if text is not None:
+            if max_chars is None or len(text) <= max_chars:
+                return text, False
+            return text[:max_chars], True
+        if max_chars is None:
+            return self.chunk_store.text(chunk_id), False
+        return self.chunk_store.text_prefix(chunk_id, max_chars)
+    
+    def hierarchical_search(self, query_embedding, top_k):
+        """Sélectionne les top documents puis cherche uniquement parmi leurs chunks"""
+        rows, best_document_score = self.document_index.candidate_rows(query_embedding, self.top_documents)
+        if self.vector_store.removed is not None:
+            rows = rows[~self.vector_store.removed[rows]]
+        
+        # Fallback global si aucun document n'est clairement pertinent
+        if best_document_score < self.document_score_threshold or len(rows) < top_k:
+            return None, None
+        
+        scores = self.vector_store.vectors(rows) @ query_embedding[0]
+        k = min(top_k, len(rows))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        
+        self.last_search_stats.update({
+            'semantic_mode': 'hierarchical',
+            'documents_selected': min(self.top_documents, len(self.document_index)),
+            'chunks_scanned': int(len(rows))
+        })
+        return scores[top].reshape(1, -1), rows[top].reshape(1, -1)
+    
+    def lexical_search(self, query, top_k, partitions=None):
+        """Recherche lexicale avec TF-IDF (restreinte aux partitions de domaine si fournies)"""
+        query = QueryContext.of(query)
+        query_vector = query.cached(
+            ('tfidf', id(self.tfidf_vectorizer)), lambda: self.tfidf_vectorizer.transform([query.query])
+        )
+        rows = self.domain_partitions.rows_for(partitions) if partitions else None
+        # Lignes normalisées L2: produit scalaire = cosinus; chunks supprimés ou regroupés ignorés
+        similarities = self.tfidf_matrix.dot(query_vector, rows)[:, 0]
+        removed = self.vector_store.removed
+        if removed is not None:
+            similarities[removed[rows] if rows is not None else removed[:len(similarities)]] = 0
+        
+        # Obtenir les top_k indices
+        top_indices = np.argsort(similarities)[-top_k:][::-1]
+        
+        results = []
+        for idx in top_indices:
+            if similarities[idx] > 0:
+                position = rows[idx] if rows is not None else idx
+                results.append(SearchHit(int(self.indexed_ids[position]), float(similarities[idx]), 'lexical'))
+        
+        return results
+    
+    def intelligent_fusion(self, semantic_results, lexical_results, semantic_weight, lexical_weight):
+        """Fusion intelligente des résultats"""
+        all_results = {}
+        
+        # Combiner les résultats (clé = identifiant du chunk dans le store)
+        for hit in semantic_results:
+            if hit.chunk_id not in all_results:
+                score = hit.score * semantic_weight
+                all_results[hit.chunk_id] = SearchHit(hit.chunk_id, score, 'hybrid', semantic_score=score, lexical_score=0)
+        
+        for hit in lexical_results:
+            score = hit.score * lexical_weight
+            fused = all_results.get(hit.chunk_id)
+            if fused is not None:
+                fused.lexical_score = score
+                fused.score += score
+            else:
+                all_results[hit.chunk_id] = SearchHit(hit.chunk_id, score, 'hybrid', semantic_score=0, lexical_score=score)
+        
+        # Convertir en liste et trier
+        return sorted(all_results.values(), key=lambda hit: hit.score, reverse=True)
+    
+    @property
+    def cross_encoder(self):
+        """Cross-encoder chargé une seule fois, à la première utilisation"""
+        if self._cross_encoder is None:
+            from sentence_transformers import CrossEncoder
+            self._cross_encoder = CrossEncoder('cross-encoder/ms-marco-MiniLM-L-6-v2')
+        return self._cross_encoder
+    
+    def _count_rerank(self, stage, pairs, saved):
+        with self._counters_lock:
+            self.rerank_counters['queries'] += 1
+            self.rerank_counters['stage1_only' if stage == 1 else 'stage2'] += 1
+            self.rerank_counters['cross_encoder_pairs'] += pairs
+            self.rerank_counters['cross_encoder_pairs_saved'] += saved
+        self.last_search_stats['rerank'] = {'stage': stage, 'cross_encoder_pairs': pairs}
+    
+    def cosine_rescore(self, query, candidates):
+        """Étage 1: cosinus requête / embeddings déjà stockés (aucune inférence)"""
+        query_embedding = self.query_embedding(query)[0]
+        query_embedding = query_embedding / (np.linalg.norm(query_embedding) or 1.0)
+        
+        chunk_ids = np.array([candidate.chunk_id for candidate in candidates], dtype=np.int64)
+        positions = np.searchsorted(self.indexed_ids, chunk_ids)
+        vectors = self.vector_store.vectors(positions)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        scores = (vectors @ query_embedding) / norms
+        
+        for candidate, score in zip(candidates, scores):
+            candidate.rerank_score = float(score)
+        return sorted(candidates, key=lambda x: x.rerank_score, reverse=True)
+    
+    def rerank_with_cross_encoder(self, query, candidates, top_k=5):
+        """Re-ranking en cascade: cosinus, puis cross-encoder sur la seule bande incertaine autour du rang k"""
+        if not candidates:
+            return candidates
+        
+        candidates = self.cosine_rescore(query, candidates)
+        
+        # Classement évident: écart net entre le rang k et le rang k+1, ou pas plus de k candidats
+        if len(candidates) <= top_k:
+            self._count_rerank(1, 0, len(candidates))
+            return candidates
+        margin = candidates[top_k - 1].rerank_score - candidates[top_k].rerank_score
+        self.last_search_stats['rerank_margin'] = round(margin, 4)
+        if margin >= self.rerank_margin:
+            self._count_rerank(1, 0, len(candidates))
+            return candidates
+        
+        # Étage 2: cross-encoder sur la bande [k - band, k + band)
+        band_start = max(0, top_k - self.rerank_band)
+        band_end = min(len(candidates), top_k + self.rerank_band)
+        band = candidates[band_start:band_end]
+        try:
+            pairs = [[str(query), self.chunk_text(candidate.chunk_id)[0]] for candidate in band]
+            scores = self.cross_encoder.predict(pairs)
+            
+            for candidate, score in zip(band, scores):
+                candidate.relevance_score = float(score)
+            
+            band = sorted(band, key=lambda x: x.relevance_score, reverse=True)
+            self._count_rerank(2, len(band), len(candidates) - len(band))
+            return candidates[:band_start] + band + candidates[band_end:]
+        except Exception:
+            # Fallback sur le classement cosinus
+            self._count_rerank(1, 0, len(candidates))
+            return candidates
+    
+    def materialize_results(self, hits, max_chars=None):
+        """Étape finale: charge texte (tronqué à max_chars) et métadonnées des seuls résultats retournés"""
+        # Compteurs d'accès du tier chaud
+        if hits:
+            self.access_tracker.record([hit.chunk_id for hit in hits])
+            if self.access_tracker.queries_since_refresh >= self.hot_refresh_every:
+                self.schedule_hot_tier_refresh()
+        
+        results = []
+        for hit in hits:
+            chunk, truncated = self.chunk_text(hit.chunk_id, max_chars)
+            
+            # Renvois vers toutes les occurrences du passage dédupliqué
+            members = self.duplicate_groups.get(hit.chunk_id)
+            source_locations = [
+                dict(self.chunk_store.metadata(member), chunk_id=member) for member in members
+            ] if members else None
+            
+            results.append(SearchResult(
+                hit, chunk, self.chunk_store.metadata(hit.chunk_id),
+                truncated=truncated, source_locations=source_locations
+            ))
+        return results
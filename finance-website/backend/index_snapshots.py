@@ -0,0 +1,130 @@
+# backend/index_snapshots.py
+import threading
+import time
+from datetime import datetime
+
+# Requêtes de chauffe: citation, requête courte (expansion) et question longue
+WARMUP_QUERIES = [
+    "Article 101 Solvabilité II",
+    "SCR marché",
+    "Comment calculer la marge de risque et le best estimate sous Solvency II ?",
+    "IFRS 17 contractual service margin",
+]
+
+
+class IndexSnapshot:
+    """Moteur de recherche construit une fois puis jamais modifié, avec ses métadonnées"""
+
+    __slots__ = ('engine', 'version', 'created_at', 'build_seconds', 'warmup_ms')
+
+    def __init__(self, engine, version, build_seconds=0.0, warmup_ms=None):
+        self.engine = engine
+        self.version = version
+        self.created_at = datetime.now().isoformat()
+        self.build_seconds = build_seconds
+        self.warmup_ms = warmup_ms or {}
+
+    def info(self):
+        return {
+            'version': self.version,
+            'created_at': self.created_at,
+            'build_seconds': round(self.build_seconds, 2),
+            'chunks': len(self.engine.chunk_store),
+            'warmup_ms': self.warmup_ms
+        }
+
+
+class IndexSnapshotManager:
+    """Pointeur unique vers le snapshot actif; les nouveaux snapshots sont construits en arrière-plan puis échangés
+
+    La lecture (`current`) est une simple lecture d'attribut, sans verrou: une requête en cours garde
+    la référence du moteur obtenue au début et termine sur l'ancien snapshot après un échange.
+    """
+
+    def __init__(self, warmup_queries=None):
+        self.warmup_queries = WARMUP_QUERIES if warmup_queries is None else warmup_queries
+        self._active = None
+        self._version = 0
+        # Une seule construction à la fois (chemin d'écriture uniquement)
+        self._build_lock = threading.Lock()
+        self.history = []
+        self.status = {'state': 'idle', 'error': None, 'started_at': None}
+
+    @property
+    def current(self):
+        """Moteur du snapshot actif (None avant la première construction)"""
+        snapshot = self._active
+        return snapshot.engine if snapshot is not None else None
+
+    @property
+    def active(self):
+        return self._active
+
+    def warmup(self, engine):
+        """Exécute les requêtes de chauffe (modèles chargés, blocs de texte et caches remplis)"""
+        timings = {}
+        for query in self.warmup_queries:
+            start = time.perf_counter()
+            if not engine.citation_search(query):
+                engine.hybrid_search(query, expand=len(query.split()) <= 4)
+            timings[query] = round((time.perf_counter() - start) * 1000, 2)
+        return timings
+
+    def build(self, factory):
+        """Construit (ou charge) un snapshot via factory() puis le chauffe, sans l'activer"""
+        start = time.perf_counter()
+        engine = factory()
+        build_seconds = time.perf_counter() - start
+        warmup_ms = self.warmup(engine) if len(engine.chunk_store) else {}
+        self._version += 1
+        return IndexSnapshot(engine, self._version, build_seconds, warmup_ms)
+
+    def swap(self, snapshot):
+        """Active le snapshot (affectation atomique du pointeur) et retourne le précédent"""
+        previous = self._active
+        self._active = snapshot
+        if previous is not None:
+            self.history = (self.history + [previous.info()])[-5:]
+        return previous
+
+    def rebuild(self, factory, on_swap=None):
+        """Construction, chauffe et échange; retourne le snapshot activé"""
+        with self._build_lock:
+            return self._rebuild(factory, on_swap)
+
+    def rebuild_async(self, factory, on_swap=None):
+        """Lance la reconstruction dans un thread; False si une construction est déjà en cours"""
+        if not self._build_lock.acquire(blocking=False):
+            return False
+
+        def run():
+            try:
+                self._rebuild(factory, on_swap)
+            except Exception as e:
+                print(f"❌ Reconstruction de l'index échouée: {e}")
+            finally:
+                self._build_lock.release()
+
+        threading.Thread(target=run, name='index-snapshot-build', daemon=True).start()
+        return True
+
+    def _rebuild(self, factory, on_swap):
+        self.status = {'state': 'building', 'error': None, 'started_at': datetime.now().isoformat()}
+        try:
+            snapshot = self.build(factory)
+        except Exception as e:
+            # Le snapshot actif reste en service
+            self.status = dict(self.status, state='failed', error=str(e))
+            raise
+        self.swap(snapshot)
+        if on_swap is not None:
+            on_swap(snapshot)
+        self.status = dict(self.status, state='idle')
+        return snapshot
+
+    def report(self):
+        return {
+            'active': self._active.info() if self._active is not None else None,
+            'build': self.status,
+            'previous': self.history
+        }
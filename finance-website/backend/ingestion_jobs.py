@@ -0,0 +1,159 @@
+# backend/ingestion_jobs.py
+import socket
+import threading
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from pymongo import ASCENDING, ReturnDocument
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+
+def job_to_json(job):
+    """Job sérialisable (dates ISO)"""
+    if job is None:
+        return None
+    return {
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in job.items()
+    }
+
+
+class IngestionJobQueue:
+    """File de jobs d'ingestion persistée dans une collection MongoDB, traitée par des threads locaux
+
+    Un job est réservé par une mise à jour atomique (queued -> running); le thread qui le traite
+    signe régulièrement le job (heartbeat_at). Un job resté 'running' sans signe de vie depuis
+    stale_after (processus arrêté en cours de traitement) est remis en file au démarrage et
+    périodiquement, jusqu'à max_attempts tentatives: les fichiers du job sont conservés sur disque
+    et la réingestion incrémentale ignore les documents déjà pris en compte.
+    """
+
+    def __init__(self, collection, handler, workers=1, poll_interval=2.0, stale_after=120, max_attempts=3):
+        self.collection = collection
+        # handler(job, on_progress) -> rapport; on_progress(dict) met à jour l'avancement du job
+        self.handler = handler
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.max_attempts = max_attempts
+        self.worker_id = f"{socket.gethostname()}:{uuid.uuid4().hex[:8]}"
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self.collection.create_index([('status', ASCENDING), ('created_at', ASCENDING)])
+
+    def submit(self, paths, metadata=None, removed=None):
+        """Enregistre un job (fichiers déjà sur disque; removed: documents supprimés) et retourne son identifiant"""
+        job_id = uuid.uuid4().hex
+        self.collection.insert_one({
+            '_id': job_id,
+            'status': QUEUED,
+            'phase': 'queued',
+            'paths': list(paths),
+            'removed': list(removed or []),
+            'metadata': metadata or {},
+            'attempts': 0,
+            'progress': {},
+            'report': None,
+            'error': None,
+            'created_at': datetime.now(),
+            'started_at': None,
+            'finished_at': None,
+            'heartbeat_at': None,
+            'worker': None
+        })
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        return self.collection.find_one({'_id': job_id})
+
+    def counts(self):
+        return {status: self.collection.count_documents({'status': status}) for status in (QUEUED, RUNNING, DONE, FAILED)}
+
+    # ------------------------------------------------------------------
+    # Traitement
+    # ------------------------------------------------------------------
+    def start(self):
+        self.recover()
+        for position in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'ingestion-job-{position}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def recover(self):
+        """Remet en file les jobs abandonnés (sans signe de vie depuis stale_after); retourne leur nombre"""
+        stale = datetime.now() - timedelta(seconds=self.stale_after)
+        abandoned = {'status': RUNNING, '$or': [{'heartbeat_at': {'$lt': stale}}, {'heartbeat_at': None}]}
+        failed = self.collection.update_many(
+            dict(abandoned, attempts={'$gte': self.max_attempts}),
+            {'$set': {'status': FAILED, 'phase': 'failed', 'finished_at': datetime.now(),
+                      'error': "Abandonné après plusieurs interruptions"}}
+        )
+        requeued = self.collection.update_many(
+            abandoned, {'$set': {'status': QUEUED, 'phase': 'queued', 'worker': None}}
+        )
+        return requeued.modified_count + failed.modified_count
+
+    def _claim(self):
+        return self.collection.find_one_and_update(
+            {'status': QUEUED},
+            {
+                '$set': {'status': RUNNING, 'phase': 'starting', 'worker': self.worker_id,
+                         'started_at': datetime.now(), 'heartbeat_at': datetime.now()},
+                '$inc': {'attempts': 1}
+            },
+            sort=[('created_at', ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _work(self):
+        last_recovery = datetime.now()
+        while not self._stopping.is_set():
+            if (datetime.now() - last_recovery).total_seconds() >= self.stale_after:
+                self.recover()
+                last_recovery = datetime.now()
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            self._run(job)
+
+    def _update(self, job_id, values):
+        # Seul le détenteur du job peut le mettre à jour (un job repris ailleurs n'est pas écrasé)
+        self.collection.update_one({'_id': job_id, 'worker': self.worker_id}, {'$set': values})
+
+    def _run(self, job):
+        job_id = job['_id']
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(self.stale_after / 4):
+                self._update(job_id, {'heartbeat_at': datetime.now()})
+
+        def on_progress(progress):
+            values = {f'progress.{key}': value for key, value in progress.items() if key != 'phase'}
+            if 'phase' in progress:
+                values['phase'] = progress['phase']
+            values['heartbeat_at'] = datetime.now()
+            self._update(job_id, values)
+
+        threading.Thread(target=heartbeat, name=f'ingestion-job-heartbeat-{job_id[:8]}', daemon=True).start()
+        try:
+            report = self.handler(job, on_progress)
+            self._update(job_id, {'status': DONE, 'phase': 'done', 'report': report,
+                                  'finished_at': datetime.now()})
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, {'status': FAILED, 'phase': 'failed', 'error': str(e),
+                                  'finished_at': datetime.now()})
+        finally:
+            done.set()
@@ -0,0 +1,204 @@
+# backend/ingestion_manifest.py
+import hashlib
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
+
+
+def file_digest(path, block_size=1 << 20):
+    """Empreinte SHA-256 du fichier (lu par blocs)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_digest(text):
+    """Empreinte 64 bits du texte d'un chunk (comparée uniquement entre versions d'un même document)"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class DocumentUpdate:
+    """Réingestion d'un document: les chunks dont le texte n'a pas changé gardent leur identifiant
+
+    Les chunks sont présentés dans l'ordre du document; seuls les chunks nouveaux ou modifiés
+    reçoivent un nouvel identifiant (et doivent être encodés puis indexés).
+    """
+
+    def __init__(self, source, digest, previous=None):
+        self.source = source
+        self.digest = digest
+        self.previous_ids = np.asarray(previous['chunk_ids'], dtype=np.int64) if previous else np.zeros(0, np.int64)
+        self._available = defaultdict(list)
+        if previous:
+            for chunk_id, chunk_hash in zip(previous['chunk_ids'], previous['chunk_hashes']):
+                self._available[int(chunk_hash)].append(int(chunk_id))
+        self.chunk_ids = []
+        self.chunk_hashes = []
+        self.pages = []
+        self.added_ids = []
+
+    def assign(self, text, next_id, page=None):
+        """(identifiant du chunk, conservé); next_id est attribué si le chunk est nouveau ou modifié"""
+        chunk_hash = chunk_digest(text)
+        candidates = self._available.get(chunk_hash)
+        kept = bool(candidates)
+        chunk_id = candidates.pop(0) if kept else next_id
+        if not kept:
+            self.added_ids.append(chunk_id)
+        self.chunk_ids.append(chunk_id)
+        self.chunk_hashes.append(chunk_hash)
+        self.pages.append(page)
+        return chunk_id, kept
+
+    @property
+    def kept_count(self):
+        return len(self.chunk_ids) - len(self.added_ids)
+
+    def removed_ids(self):
+        """Chunks de la version précédente absents de la nouvelle"""
+        return np.setdiff1d(self.previous_ids, np.asarray(self.chunk_ids, dtype=np.int64))
+
+
+class IngestionManifest:
+    """Manifeste de la base: empreinte de chaque document, ses chunks (ordre du document) et leurs
+    empreintes, et chunks supprimés (tombstones)
+
+    Le store de chunks ne fait que croître: un chunk retiré d'un document est marqué supprimé et
+    exclu des index à la prochaine construction, son identifiant n'est jamais réutilisé. Une copie
+    (copy()) est modifiée pendant l'ingestion, le manifeste de la base servie reste inchangé.
+    """
+
+    FILE = 'manifest.json'
+
+    def __init__(self, documents=None, tombstones=None):
+        # source -> {'hash', 'chunk_ids' (np.int64), 'chunk_hashes' (np.uint64), 'ingested_at'}
+        self.documents = documents or {}
+        self.tombstones = np.unique(np.asarray(tombstones if tombstones is not None else [], dtype=np.int64))
+
+    def copy(self):
+        # Les entrées ne sont jamais modifiées en place (commit() les remplace)
+        return IngestionManifest(dict(self.documents), self.tombstones)
+
+    def is_unchanged(self, source, digest):
+        document = self.documents.get(source)
+        return document is not None and document['hash'] == digest
+
+    def adopt(self, source, chunk_store):
+        """Suit un document chargé hors pipeline (sans empreintes) à partir de sa colonne 'source'"""
+        if source in self.documents:
+            return
+        chunk_ids = chunk_store.rows_where('source', source)
+        chunk_ids = chunk_ids[~np.isin(chunk_ids, self.tombstones)]
+        if not len(chunk_ids):
+            return
+        self.documents[source] = {
+            'hash': None,
+            'chunk_ids': chunk_ids,
+            'chunk_hashes': np.fromiter(
+                (chunk_digest(chunk_store.text(int(chunk_id))) for chunk_id in chunk_ids),
+                dtype=np.uint64, count=len(chunk_ids)
+            ),
+            'ingested_at': None
+        }
+
+    def begin(self, source, digest):
+        return DocumentUpdate(source, digest, self.documents.get(source))
+
+    def commit(self, update):
+        """Enregistre la nouvelle version du document; les chunks retirés deviennent des tombstones"""
+        self.documents[update.source] = {
+            'hash': update.digest,
+            'chunk_ids': np.asarray(update.chunk_ids, dtype=np.int64),
+            'chunk_hashes': np.asarray(update.chunk_hashes, dtype=np.uint64),
+            'ingested_at': datetime.now().isoformat()
+        }
+        removed = update.removed_ids()
+        self.tombstones = np.union1d(self.tombstones, removed)
+        return len(removed)
+
+    def remove(self, source):
+        """Document supprimé: tous ses chunks deviennent des tombstones; retourne leur nombre"""
+        document = self.documents.pop(source, None)
+        if document is None:
+            return 0
+        self.tombstones = np.union1d(self.tombstones, document['chunk_ids'])
+        return len(document['chunk_ids'])
+
+    def discard(self, update):
+        """Réingestion abandonnée (erreur d'extraction): les chunks ajoutés sont supprimés, la version
+        précédente reste en place"""
+        self.tombstones = np.union1d(self.tombstones, np.asarray(update.added_ids, dtype=np.int64))
+
+    def live_ids(self, count):
+        """Identifiants des chunks [0, count) non supprimés, triés"""
+        live = np.ones(count, dtype=bool)
+        live[self.tombstones[self.tombstones < count]] = False
+        return np.flatnonzero(live).astype(np.int64)
+
+    def reading_order(self, count):
+        """Chunks non supprimés, chaque document suivi dans son ordre de lecture
+
+        Les chunks d'une version amendée ajoutés en fin de store reprennent leur place dans le
+        document; les chunks non suivis par le manifeste restent dans l'ordre du store.
+        """
+        documents = list(self.documents.values())
+        owner = np.full(count, -1, dtype=np.int64)
+        for position, document in enumerate(documents):
+            chunk_ids = document['chunk_ids']
+            owner[chunk_ids[chunk_ids < count]] = position
+        emitted = np.zeros(len(documents), dtype=bool)
+        for chunk_id in self.live_ids(count):
+            position = owner[chunk_id]
+            if position < 0:
+                yield int(chunk_id)
+            elif not emitted[position]:
+                emitted[position] = True
+                for document_chunk in documents[position]['chunk_ids']:
+                    if document_chunk < count:
+                        yield int(document_chunk)
+
+    def report(self):
+        return {
+            'documents': len(self.documents),
+            'tracked_chunks': int(sum(len(document['chunk_ids']) for document in self.documents.values())),
+            'tombstones': int(len(self.tombstones))
+        }
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, self.FILE), 'w', encoding='utf-8') as f:
+            json.dump({
+                'documents': {
+                    source: {
+                        'hash': document['hash'],
+                        'chunk_ids': document['chunk_ids'].tolist(),
+                        'chunk_hashes': [format(int(chunk_hash), '016x') for chunk_hash in document['chunk_hashes']],
+                        'ingested_at': document['ingested_at']
+                    }
+                    for source, document in self.documents.items()
+                },
+                'tombstones': self.tombstones.tolist()
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, cls.FILE), encoding='utf-8') as f:
+            layout = json.load(f)
+        documents = {
+            source: {
+                'hash': document['hash'],
+                'chunk_ids': np.asarray(document['chunk_ids'], dtype=np.int64),
+                'chunk_hashes': np.asarray([int(chunk_hash, 16) for chunk_hash in document['chunk_hashes']],
+                                           dtype=np.uint64),
+                'ingested_at': document['ingested_at']
+            }
+            for source, document in layout['documents'].items()
+        }
+        return cls(documents, layout['tombstones'])
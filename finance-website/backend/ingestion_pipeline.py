@@ -0,0 +1,758 @@
+# backend/ingestion_pipeline.py
+import bisect
+import copy
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from chunk_store import ChunkStoreWriter, attach_chunk_store
+from ingestion_manifest import IngestionManifest, file_digest
+from table_store import TableExtractor, TableStore
+from token_chunker import TokenChunker
+from vector_store import VectorStoreWriter
+
+try:
+    from pypdf import PdfReader
+    PDF_AVAILABLE = True
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader
+        PDF_AVAILABLE = True
+    except ImportError:
+        PDF_AVAILABLE = False
+
+try:
+    import docx
+    from docx.table import Table as DocxTable
+    from docx.text.paragraph import Paragraph as DocxParagraph
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.md')
+
+# Nettoyage page par page (caractères de contrôle, lignes de numéro de page)
+PAGE_CLEANUP_PATTERNS = [
+    (re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\u00ad]"), ""),
+    (re.compile(r"^\s*(?:page\s*)?\d{1,4}\s*(?:/\s*\d{1,4})?\s*$", re.I | re.M), ""),
+]
+
+# Nettoyage du texte d'une section (césures, espaces, lignes vides)
+CLEANUP_PATTERNS = [
+    (re.compile(r"(\w)-\n(\w)"), r"\1\2"),
+    (re.compile("[ \t\u00a0]+"), " "),
+    (re.compile(r" *\n *"), "\n"),
+    (re.compile(r"\n{3,}"), "\n\n"),
+]
+
+# Changement de page dans le texte d'un document (caractère à usage privé, retiré avant le découpage)
+PAGE_MARK = '\ue000'
+
+# Fin de file entre deux étapes
+_END = object()
+
+
+def _drain(source):
+    """Vide une file jusqu'à sa fin (étape en échec: l'étape amont ne doit pas rester bloquée)"""
+    while source.get() is not _END:
+        pass
+
+
+# ----------------------------------------------------------------------
+# Extraction (fonctions de module: exécutées dans les processus du pool)
+# ----------------------------------------------------------------------
+def count_pdf_pages(path):
+    return len(PdfReader(path).pages)
+
+
+def parse_pdf_pages(path, first_page, last_page):
+    """[(numéro de page, texte)] des pages [first_page, last_page) d'un PDF"""
+    reader = PdfReader(path)
+    return [(number + 1, reader.pages[number].extract_text() or '') for number in range(first_page, last_page)]
+
+
+def parse_docx(path, block_chars=16000):
+    """Un DOCX n'a pas de pagination: paragraphes regroupés en blocs d'environ block_chars (page 1)
+
+    Les tableaux sont repris à leur place, une ligne par rangée et cellules séparées par des
+    tabulations (détectés ensuite par TableExtractor).
+    """
+    document = docx.Document(path)
+    blocks, paragraphs, size = [], [], 0
+    for element in document.element.body.iterchildren():
+        if element.tag.endswith('}p'):
+            text = DocxParagraph(element, document).text
+        elif element.tag.endswith('}tbl'):
+            text = '\n'.join('\t'.join(cell.text.strip() for cell in row.cells)
+                             for row in DocxTable(element, document).rows)
+        else:
+            continue
+        paragraphs.append(text)
+        size += len(text) + 1
+        if size >= block_chars:
+            blocks.append((1, '\n'.join(paragraphs)))
+            paragraphs, size = [], 0
+    if paragraphs:
+        blocks.append((1, '\n'.join(paragraphs)))
+    return blocks
+
+
+def iter_text_blocks(path, block_chars=16000):
+    """Lecture paresseuse d'un fichier texte: blocs successifs (page 1) coupés sur une fin de ligne
+
+    Le fin de ligne de la coupe est omis: les blocs joints par '\n' redonnent exactement le fichier.
+    Au plus environ 2 x block_chars caractères sont en mémoire, quelle que soit la taille du fichier.
+    """
+    carry = ''
+    with open(path, encoding='utf-8', errors='replace') as f:
+        while True:
+            block = f.read(block_chars)
+            if not block:
+                break
+            text = carry + block
+            cut = text.rfind('\n')
+            if cut < 0:
+                # Ligne plus longue qu'un bloc: coupée telle quelle
+                yield 1, text
+                carry = ''
+                continue
+            yield 1, text[:cut]
+            carry = text[cut + 1:]
+    if carry:
+        yield 1, carry
+
+
+def lower_priority(niceness):
+    """Initialiseur des processus d'extraction: priorité abaissée pour ne pas ralentir le service"""
+    if niceness and hasattr(os, 'nice'):
+        os.nice(niceness)
+
+
+def timed_task(function, args):
+    """(secondes de travail, secondes CPU, résultat): durées mesurées dans le processus du pool"""
+    start, cpu_start = time.perf_counter(), time.process_time()
+    result = function(*args)
+    return time.perf_counter() - start, time.process_time() - cpu_start, result
+
+
+def _apply(patterns, text):
+    for pattern, replacement in patterns:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def clean_page(text):
+    return _apply(PAGE_CLEANUP_PATTERNS, text)
+
+
+def chunk_windows(text, chunk_size=1000, overlap=200):
+    """(position, chunk): fenêtres successives d'environ chunk_size caractères, coupées en fin de phrase ou de mot"""
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            # Dernière fin de phrase, sinon dernier espace, dans la seconde moitié de la fenêtre
+            window_start = start + chunk_size // 2
+            cut = max(text.rfind('. ', window_start, end), text.rfind('\n', window_start, end))
+            if cut < 0:
+                cut = text.rfind(' ', window_start, end)
+            if cut > start:
+                end = cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            yield start, chunk
+        if end >= len(text):
+            break
+        # Chevauchement recalé sur un début de mot
+        next_start = max(end - overlap, start + 1)
+        space = text.find(' ', next_start, end)
+        start = space + 1 if 0 <= space < end - 1 else next_start
+
+
+class SectionSplitter:
+    """Découpe le texte d'un document, reçu page par page, en sections aux frontières définies par le contenu
+
+    Une section se termine après une ligne d'ancrage (empreinte de la ligne multiple de
+    anchor_divisor) située au-delà de section_chars / 4, au plus tard vers section_chars. Une
+    modification locale ne déplace que les frontières voisines: les sections suivantes, et leurs
+    chunks, restent identiques d'une version à l'autre du document, même si la pagination change.
+    """
+
+    def __init__(self, section_chars=16000, anchor_divisor=16):
+        self.min_chars = section_chars // 4
+        self.max_chars = section_chars
+        self.anchor_divisor = anchor_divisor
+        self.buffer = ''
+        self.scan_from = 0
+        self.page = None        # page en vigueur au début du buffer
+        self.last_page = None
+        self.mark_pages = []    # page de chaque PAGE_MARK du buffer, dans l'ordre
+
+    def feed(self, page_number, text):
+        """Ajoute une page; retourne les sections complètes [(première page, pages des marques, texte)]"""
+        if self.page is None:
+            self.page = self.last_page = page_number
+            self.buffer = text
+        elif page_number == self.last_page:
+            # Bloc suivant de la même page (fichier texte, DOCX): jointure exacte
+            self.buffer += '\n' + text
+        else:
+            # Saut de page: les lignes vides en bordure de page (numéro de page retiré...) dépendent
+            # de la pagination et sont supprimées
+            self.buffer = self.buffer.rstrip() + '\n' + PAGE_MARK + text.lstrip()
+            self.scan_from = min(self.scan_from, len(self.buffer))
+            self.mark_pages.append(page_number)
+            self.last_page = page_number
+        return list(self._complete_sections())
+
+    def finish(self):
+        """Dernière section du document"""
+        return [self._take(len(self.buffer), 0)] if self.page is not None else []
+
+    def _complete_sections(self):
+        while True:
+            newline = self.buffer.find('\n', max(self.scan_from, self.min_chars))
+            if 0 <= newline < self.max_chars:
+                self.scan_from = newline + 1
+                line = self.buffer[self.buffer.rfind('\n', 0, newline) + 1:newline].replace(PAGE_MARK, '').strip()
+                if line and zlib.crc32(line.encode('utf-8')) % self.anchor_divisor == 0:
+                    yield self._take(newline, 1)
+                continue
+            if len(self.buffer) < self.max_chars:
+                return
+            # Pas d'ancre avant max_chars: coupe sur la dernière fin de ligne, sinon en milieu de ligne
+            cut = self.buffer.rfind('\n', self.min_chars, self.max_chars)
+            yield self._take(cut, 1) if cut >= 0 else self._take(self.max_chars, 0)
+
+    def _take(self, end, skip):
+        section = self.buffer[:end]
+        self.buffer = self.buffer[end + skip:]
+        self.scan_from = 0
+        marks = section.count(PAGE_MARK)
+        first_page, mark_pages = self.page, self.mark_pages[:marks]
+        self.mark_pages = self.mark_pages[marks:]
+        if mark_pages:
+            self.page = mark_pages[-1]
+        return first_page, mark_pages, section
+
+
+def section_chunks(section, chunk_size=1000, overlap=200, chunker=None):
+    """(chunk, page) d'une section produite par SectionSplitter; page = page du début du chunk
+
+    Avec un TokenChunker, les chunks suivent la limite de tokens du modèle; sinon fenêtres de
+    chunk_size caractères.
+    """
+    first_page, mark_pages, text = section
+    text = _apply(CLEANUP_PATTERNS, text).strip()
+    marks = [match.start() - position for position, match in enumerate(re.finditer(PAGE_MARK, text))]
+    text = text.replace(PAGE_MARK, '')
+    windows = chunker.split(text) if chunker is not None else chunk_windows(text, chunk_size, overlap)
+    for start, chunk in windows:
+        passed = bisect.bisect_right(marks, start)
+        yield chunk, mark_pages[passed - 1] if passed else first_page
+
+
+class StageStats:
+    """Éléments traités, temps actif et temps CPU d'une étape du pipeline
+
+    Le temps CPU est celui du thread de l'étape (et des processus d'extraction), hors threads
+    internes des bibliothèques natives (calcul des embeddings sur plusieurs cœurs).
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+
+    def report(self, wall_seconds):
+        return {
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'cpu_seconds': round(self.cpu_seconds, 3),
+            'items_per_second': round(self.items_out / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            'utilization': round(self.busy_seconds / wall_seconds, 3) if wall_seconds else 0.0
+        }
+
+
+class IngestionProgress:
+    """Avancement d'une exécution, estimé sur la part du volume d'entrée déjà extraite
+
+    Les files entre étapes étant bornées, l'extraction ne devance l'encodage que de quelques lots:
+    cette part suit l'avancement global.
+    """
+
+    def __init__(self, paths):
+        self.sizes = {}
+        for path in paths:
+            try:
+                self.sizes[path] = max(os.path.getsize(path), 1)
+            except OSError:
+                self.sizes[path] = 1
+        self.total_bytes = sum(self.sizes.values())
+        self.done = dict.fromkeys(self.sizes, 0.0)  # part extraite de chaque document
+        self.start = time.perf_counter()
+
+    def advance(self, path, share):
+        self.done[path] = min(1.0, self.done[path] + share)
+
+    def complete(self, path):
+        self.done[path] = 1.0
+
+    def snapshot(self, stats):
+        elapsed = time.perf_counter() - self.start
+        fraction = sum(self.sizes[path] * done for path, done in self.done.items()) / self.total_bytes \
+            if self.total_bytes else 1.0
+        return {
+            'documents': len(self.sizes),
+            'documents_parsed': sum(1 for done in self.done.values() if done >= 1.0),
+            'pages_parsed': stats['parse'].items_out,
+            'chunks_embedded': stats['embed'].items_out,
+            'chunks_indexed': stats['index'].items_out,
+            'fraction': round(fraction, 4),
+            'elapsed_seconds': round(elapsed, 1),
+            'eta_seconds': round(elapsed * (1 - fraction) / fraction, 1) if fraction > 0 else None
+        }
+
+
+class IncrementalRun:
+    """État d'une réingestion: manifeste (copie modifiée), prochain identifiant de chunk, documents traités"""
+
+    def __init__(self, manifest, first_chunk_id):
+        self.manifest = manifest
+        self.next_id = first_chunk_id
+        self.digests = {}
+        self.unchanged = []
+        self.updates = []
+
+
+class IngestionPipeline:
+    """Ingestion par étapes: extraction -> nettoyage -> découpage -> embeddings -> index
+
+    L'extraction est parallélisée par lots de pages sur un pool de processus; les étapes suivantes
+    tournent chacune dans un thread, reliées par des files bornées (une étape lente freine les
+    précédentes au lieu d'accumuler des pages en mémoire). Les fichiers texte sont lus par blocs
+    et les chunks produits au fil de l'eau: la mémoire de travail ne dépend pas de la taille des documents.
+    Chaque document est découpé en sections aux frontières définies par le contenu (SectionSplitter),
+    de sorte qu'une version amendée redonne les mêmes chunks hors des passages modifiés.
+    """
+
+    def __init__(self, embedder, chunk_size=1000, chunk_overlap=200, parse_workers=None,
+                 pages_per_task=8, embed_batch_size=64, queue_size=64, section_chars=16000,
+                 niceness=0, progress_interval=1.0, token_chunking=True, extract_tables=True, source_roots=()):
+        self.embedder = embedder
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # Chunks à la mesure du tokenizer de l'embedder (aucun texte tronqué à l'encodage);
+        # fenêtres de chunk_size caractères si l'embedder n'expose pas de tokenizer
+        self.chunker = TokenChunker.from_embedder(embedder) if token_chunking else None
+        # Tableaux numériques (tables de mortalité, courbes de taux) extraits dans un store colonnaire
+        self.extract_tables = extract_tables
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.pages_per_task = pages_per_task
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+        self.section_chars = section_chars
+        # Ingestion en arrière-plan: processus d'extraction moins prioritaires que le service
+        self.niceness = niceness
+        self.progress_interval = progress_interval
+        # Dossiers surveillés: un document y est désigné par son chemin relatif (a/rapport.pdf et
+        # b/rapport.pdf sont deux documents), préfixé du nom du dossier s'il y en a plusieurs
+        self.source_roots = [os.path.abspath(root) for root in source_roots]
+
+    def document_source(self, path):
+        """Clé du document dans la base (source): chemin relatif au dossier surveillé, sinon nom du fichier"""
+        path = os.path.abspath(path)
+        for root in self.source_roots:
+            if os.path.commonpath([root, path]) == root:
+                source = os.path.relpath(path, root)
+                if len(self.source_roots) > 1:
+                    source = os.path.join(os.path.basename(root), source)
+                return source.replace(os.sep, '/')
+        return os.path.basename(path)
+
+    def parse_tasks(self, path):
+        """Tâches d'extraction [(fonction, arguments)] d'un document, dans l'ordre des pages"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == '.pdf':
+            if not PDF_AVAILABLE:
+                raise RuntimeError("Extraction PDF indisponible (installer pypdf)")
+            page_count = count_pdf_pages(path)
+            return [
+                (parse_pdf_pages, (path, first, min(first + self.pages_per_task, page_count)))
+                for first in range(0, page_count, self.pages_per_task)
+            ]
+        if extension == '.docx':
+            if not DOCX_AVAILABLE:
+                raise RuntimeError("Extraction DOCX indisponible (installer python-docx)")
+            return [(parse_docx, (path, self.section_chars))]
+        if extension in SUPPORTED_EXTENSIONS:
+            return [(iter_text_blocks, (path, self.section_chars))]
+        raise ValueError(f"Format non supporté: {extension}")
+
+    def _parse_stage(self, paths, pages_queue, stats, errors, failures, progress, incremental=None):
+        """Soumet les lots de pages au pool (fenêtre bornée) et publie les pages dans l'ordre"""
+        def publish(path, pages):
+            # Les sections d'un fichier texte sont lues au fil de la publication: seul le temps
+            # de lecture compte, pas l'attente d'une place dans la file
+            pages = iter(pages)
+            while True:
+                start = time.perf_counter()
+                page = next(pages, None)
+                stats.busy_seconds += time.perf_counter() - start
+                if page is None:
+                    return
+                pages_queue.put((path,) + tuple(page))
+                stats.items_out += 1
+
+        cpu_start = time.thread_time()
+        pool = None
+        if self.parse_workers > 0:
+            pool = ProcessPoolExecutor(self.parse_workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=lower_priority, initargs=(self.niceness,))
+        pending = deque()
+        try:
+            for path in paths:
+                stats.items_in += 1
+                try:
+                    if incremental is not None:
+                        # Document identique à la version indexée: ni extraction ni encodage
+                        digest, source = file_digest(path), self.document_source(path)
+                        if incremental.manifest.is_unchanged(source, digest):
+                            incremental.unchanged.append(source)
+                            progress.complete(path)
+                            continue
+                        incremental.digests[path] = digest
+                    tasks = self.parse_tasks(path)
+                except Exception as e:
+                    errors.append({'source': self.document_source(path), 'error': str(e)})
+                    progress.complete(path)
+                    continue
+                share = 1.0 / len(tasks) if tasks else 1.0
+                if not tasks:
+                    progress.complete(path)
+                for function, args in tasks:
+                    # Fichiers texte lus sur place: le pool ne sert qu'à l'extraction PDF / DOCX
+                    if pool is None or function is iter_text_blocks:
+                        try:
+                            publish(path, function(*args))
+                        except Exception as e:
+                            errors.append({'source': self.document_source(path), 'error': str(e)})
+                            progress.complete(path)
+                            break
+                        progress.advance(path, share)
+                        continue
+                    pending.append((path, share, pool.submit(timed_task, function, args)))
+                    while len(pending) > 2 * self.parse_workers:
+                        self._collect(pending.popleft(), publish, stats, errors, progress)
+            while pending:
+                self._collect(pending.popleft(), publish, stats, errors, progress)
+        except Exception as e:
+            # Pool inutilisable (processus tué...): le pipeline échoue
+            failures.append(e)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            stats.cpu_seconds += time.thread_time() - cpu_start
+            pages_queue.put(_END)
+
+    def _collect(self, task, publish, stats, errors, progress):
+        path, share, future = task
+        progress.advance(path, share)
+        try:
+            seconds, cpu_seconds, pages = future.result()
+        except Exception as e:
+            errors.append({'source': self.document_source(path), 'error': str(e)})
+            return
+        # Temps cumulé des processus: l'utilisation peut dépasser 1 avec plusieurs workers
+        stats.busy_seconds += seconds
+        stats.cpu_seconds += cpu_seconds
+        publish(path, pages)
+
+    def _chunk_stage(self, pages_queue, chunks_queue, stats, failures, tables, incremental=None):
+        """Nettoie les pages, extrait leurs tableaux, regroupe le texte en sections par document, puis
+        découpe et transmet les chunks; tables reçoit les tableaux de chaque document"""
+        document = None  # (chemin, découpeur de sections, mise à jour du manifeste, extracteur de tableaux)
+        waited = 0.0
+        cpu_start = time.thread_time()
+
+        def close(document):
+            if document[3] is not None:
+                tables[document[3].source].extend(document[3].finish())
+            emit(document, document[1].finish())
+
+        def emit(document, sections):
+            nonlocal waited
+            path, _, update, _ = document
+            source = self.document_source(path)
+            for section in sections:
+                for chunk, page_number in section_chunks(section, self.chunk_size, self.chunk_overlap, self.chunker):
+                    if update is not None:
+                        # Chunk inchangé: identifiant et vecteur repris, rien à encoder
+                        _, kept = update.assign(chunk, incremental.next_id, page_number)
+                        if kept:
+                            continue
+                        incremental.next_id += 1
+                    # Chunks transmis dès leur découpe (temps d'attente de la file exclu)
+                    put_start = time.perf_counter()
+                    chunks_queue.put({'chunk': chunk, 'metadata': {'source': source, 'page': page_number}})
+                    waited += time.perf_counter() - put_start
+                    stats.items_out += 1
+
+        try:
+            while True:
+                item = pages_queue.get()
+                start, waited = time.perf_counter(), 0.0
+                if item is _END:
+                    if document is not None:
+                        close(document)
+                    stats.busy_seconds += time.perf_counter() - start - waited
+                    break
+                path, page_number, text = item
+                stats.items_in += 1
+                if document is None or path != document[0]:
+                    if document is not None:
+                        close(document)
+                    update = None
+                    if incremental is not None:
+                        update = incremental.manifest.begin(self.document_source(path), incremental.digests[path])
+                        incremental.updates.append(update)
+                    extractor = None
+                    if self.extract_tables:
+                        extractor = TableExtractor(self.document_source(path))
+                        tables[extractor.source] = []
+                    document = (path, SectionSplitter(self.section_chars), update, extractor)
+                text = clean_page(text)
+                if document[3] is not None:
+                    # Lignes de tableaux remplacées par un résumé dans le texte découpé
+                    text, extracted = document[3].feed(page_number, text)
+                    tables[document[3].source].extend(extracted)
+                emit(document, document[1].feed(page_number, text))
+                stats.busy_seconds += time.perf_counter() - start - waited
+        except Exception as e:
+            failures.append(e)
+            _drain(pages_queue)
+        finally:
+            stats.cpu_seconds += time.thread_time() - cpu_start
+            chunks_queue.put(_END)
+
+    def _embed_stage(self, chunks_queue, batches_queue, stats, failures):
+        def flush(batch):
+            start = time.perf_counter()
+            embeddings = self.embedder.get_embeddings([chunk['chunk'] for chunk in batch])
+            stats.busy_seconds += time.perf_counter() - start
+            stats.items_out += len(batch)
+            batches_queue.put((batch, embeddings))
+
+        batch = []
+        cpu_start = time.thread_time()
+        try:
+            while True:
+                item = chunks_queue.get()
+                if item is _END:
+                    break
+                stats.items_in += 1
+                batch.append(item)
+                if len(batch) >= self.embed_batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+        except Exception as e:
+            failures.append(e)
+            _drain(chunks_queue)
+        finally:
+            stats.cpu_seconds += time.thread_time() - cpu_start
+            batches_queue.put(_END)
+
+    def run(self, paths, on_batch=None, manifest=None, first_chunk_id=0, on_progress=None):
+        """Exécute le pipeline; on_batch(chunks, embeddings) reçoit chaque lot indexable dans l'ordre
+
+        Sans on_batch, les chunks et embeddings sont accumulés et retournés (petits volumes
+        uniquement: pour une ingestion en flux, passer l'écrivain d'index en on_batch).
+        Avec un manifeste, l'ingestion est incrémentale: seuls les chunks nouveaux ou modifiés sont
+        transmis, avec des identifiants attribués à partir de first_chunk_id, et le manifeste est mis à jour.
+        on_progress(avancement) est appelé au plus toutes les progress_interval secondes, puis en fin d'exécution.
+        """
+        paths = list(dict.fromkeys(paths))
+        incremental = IncrementalRun(manifest, first_chunk_id) if manifest is not None else None
+        progress = IngestionProgress(paths)
+        stage_names = ('parse', 'chunk', 'embed', 'index')
+        stats = {name: StageStats(name) for name in stage_names}
+        errors = []
+        failures = []
+        tables = {}
+        pages_queue = queue.Queue(self.queue_size)
+        chunks_queue = queue.Queue(self.queue_size * 8)
+        batches_queue = queue.Queue(max(2, self.queue_size // 8))
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self._parse_stage,
+                             args=(paths, pages_queue, stats['parse'], errors, failures, progress, incremental),
+                             name='ingestion-parse', daemon=True),
+            threading.Thread(target=self._chunk_stage,
+                             args=(pages_queue, chunks_queue, stats['chunk'], failures, tables, incremental),
+                             name='ingestion-chunk', daemon=True),
+            threading.Thread(target=self._embed_stage,
+                             args=(chunks_queue, batches_queue, stats['embed'], failures),
+                             name='ingestion-embed', daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Étape d'indexation dans le thread appelant (seul écrivain)
+        chunks, embeddings = [], []
+        last_progress = time.perf_counter()
+        try:
+            while True:
+                if on_progress is not None and time.perf_counter() - last_progress >= self.progress_interval:
+                    on_progress(progress.snapshot(stats))
+                    last_progress = time.perf_counter()
+                try:
+                    item = batches_queue.get(timeout=self.progress_interval)
+                except queue.Empty:
+                    continue
+                if item is _END:
+                    break
+                batch, batch_embeddings = item
+                index_start, index_cpu_start = time.perf_counter(), time.thread_time()
+                stats['index'].items_in += len(batch)
+                if on_batch is not None:
+                    on_batch(batch, batch_embeddings)
+                else:
+                    chunks.extend(batch)
+                    embeddings.append(np.asarray(batch_embeddings, dtype=np.float32))
+                stats['index'].items_out += len(batch)
+                stats['index'].busy_seconds += time.perf_counter() - index_start
+                stats['index'].cpu_seconds += time.thread_time() - index_cpu_start
+        except Exception as e:
+            failures.append(e)
+            _drain(batches_queue)
+        for thread in threads:
+            thread.join()
+        if failures:
+            raise failures[0]
+        wall_seconds = time.perf_counter() - start
+
+        committed = []
+        failed = {error['source'] for error in errors}
+        tables = {source: extracted for source, extracted in tables.items() if source not in failed}
+        if incremental is not None:
+            # Document en erreur: la version précédente reste en place, ses nouveaux chunks sont supprimés
+            tombstoned = 0
+            for update in incremental.updates:
+                if update.source in failed:
+                    manifest.discard(update)
+                else:
+                    tombstoned += manifest.commit(update)
+                    committed.append(update)
+
+        report = {
+            'documents': len(paths),
+            'pages': stats['parse'].items_out,
+            'chunks': stats['index'].items_out,
+            'tables': sum(len(extracted) for extracted in tables.values()),
+            'errors': errors,
+            'wall_seconds': round(wall_seconds, 3),
+            'pages_per_second': round(stats['parse'].items_out / wall_seconds, 1) if wall_seconds else 0.0,
+            'chunks_per_second': round(stats['index'].items_out / wall_seconds, 1) if wall_seconds else 0.0,
+            'stages': {name: stats[name].report(wall_seconds) for name in stage_names},
+            'chunk_token_limit': self.chunker.max_tokens if self.chunker is not None else None
+        }
+        if on_progress is not None:
+            on_progress(progress.snapshot(stats))
+        if incremental is not None:
+            report.update({
+                'unchanged_documents': incremental.unchanged,
+                'reused_chunks': sum(update.kept_count for update in incremental.updates),
+                'tombstoned_chunks': tombstoned
+            })
+        return {
+            'chunks': chunks,
+            'embeddings': np.concatenate(embeddings) if embeddings else None,
+            'updates': committed,
+            'tables': tables,
+            'report': report
+        }
+
+    def ingest(self, knowledge_base, paths, on_progress=None, removed=()):
+        """Ingestion incrémentale en flux dans une copie de la base: (nouvelle base, rapport)
+
+        Un document déjà ingéré n'est réencodé que pour ses chunks nouveaux ou modifiés; la base
+        d'origine reste servie. removed: documents supprimés (sources), dont les chunks deviennent
+        des tombstones et les tableaux sont retirés.
+        """
+        paths = list(paths)
+        sources = list(dict.fromkeys(self.document_source(path) for path in paths))
+        removed = [source for source in dict.fromkeys(removed) if source not in sources]
+        writer = KnowledgeBaseWriter(knowledge_base)
+        for source in sources + removed:
+            writer.manifest.adopt(source, writer.chunk_writer.base)
+        removed_chunks = sum(writer.manifest.remove(source) for source in removed)
+        result = self.run(paths, on_batch=writer.add, manifest=writer.manifest,
+                          first_chunk_id=len(writer.chunk_writer), on_progress=on_progress)
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        extended = writer.finish(result['updates'], dict(result['tables'], **{source: [] for source in removed}))
+        index_report = result['report']['stages']['index']
+        index_report['busy_seconds'] = round(index_report['busy_seconds'] + time.perf_counter() - start, 3)
+        index_report['cpu_seconds'] = round(index_report['cpu_seconds'] + time.thread_time() - cpu_start, 3)
+        result['report'].update(removed_documents=len(removed), removed_chunks=removed_chunks)
+        return extended, result['report']
+
+
+class KnowledgeBaseWriter:
+    """Étape d'indexation: chaque lot (chunks, embeddings) est écrit dès réception dans de nouveaux stores
+
+    Le texte est encodé dans le store colonnaire et les vecteurs ajoutés à l'index FAISS au fil des
+    lots; finish() retourne une copie de la base (avec une copie de son manifeste), la base
+    d'origine n'est pas modifiée.
+    """
+
+    def __init__(self, knowledge_base):
+        self.knowledge_base = knowledge_base
+        self.chunk_writer = ChunkStoreWriter(attach_chunk_store(knowledge_base))
+        vector_store = getattr(knowledge_base, 'vector_store', None)
+        self.vector_writer = VectorStoreWriter(vector_store) if vector_store is not None else None
+        manifest = getattr(knowledge_base, 'manifest', None)
+        self.manifest = manifest.copy() if manifest is not None else IngestionManifest()
+
+    def add(self, chunks, embeddings):
+        chunk_ids = self.chunk_writer.add(chunks)
+        if embeddings is not None and len(chunk_ids):
+            if self.vector_writer is None:
+                self.vector_writer = VectorStoreWriter()
+            self.vector_writer.add(embeddings, chunk_ids)
+
+    def finish(self, updates=(), tables=None):
+        """Base étendue; updates: documents réingérés dont les chunks conservés ont pu changer de page;
+        tables: tableaux extraits par document (remplacent ceux de la version précédente)"""
+        extended = copy.copy(self.knowledge_base)
+        extended.chunks = self.chunk_writer.finish()
+        for update in updates:
+            added = set(update.added_ids)
+            kept = [(chunk_id, page) for chunk_id, page in zip(update.chunk_ids, update.pages) if chunk_id not in added]
+            if kept:
+                extended.chunks.set_values('page', [chunk_id for chunk_id, _ in kept], [page for _, page in kept])
+        if self.vector_writer is not None:
+            extended.vector_store = self.vector_writer.finish()
+        extended.manifest = self.manifest
+        if tables:
+            table_store = getattr(self.knowledge_base, 'table_store', None) or TableStore()
+            extended.table_store = table_store.with_documents(tables)
+        return extended
+
+
+def extend_knowledge_base(knowledge_base, chunks, embeddings):
+    """Copie de la base avec les chunks (et leurs vecteurs) ajoutés; la base d'origine n'est pas modifiée"""
+    writer = KnowledgeBaseWriter(knowledge_base)
+    writer.add(chunks, embeddings)
+    return writer.finish()
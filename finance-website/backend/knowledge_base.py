@@ -0,0 +1,103 @@
+# backend/knowledge_base.py
+import math
+import os
+import re
+from collections import Counter
+
+# Documents de référence chargés au démarrage (texte brut ou Markdown); les PDF et DOCX passent par
+# l'ingestion (POST /api/documents, dossiers surveillés)
+KNOWLEDGE_FOLDER = os.environ.get('KNOWLEDGE_BASE_FOLDER') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'knowledge_documents'
+)
+TEXT_EXTENSIONS = ('.txt', '.md')
+
+_WORD_RE = re.compile(r'\w+')
+_PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+def paragraph_chunks(text, chunk_size=1000):
+    """Chunks d'environ chunk_size caractères formés de paragraphes entiers (un paragraphe plus long
+    est coupé sur un espace)"""
+    chunks, current = [], ''
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        while len(paragraph) > chunk_size:
+            cut = paragraph.rfind(' ', chunk_size // 2, chunk_size)
+            cut = cut if cut > 0 else chunk_size
+            paragraph_start, paragraph = paragraph[:cut].strip(), paragraph[cut:].strip()
+            if current:
+                chunks.append(current)
+                current = ''
+            chunks.append(paragraph_start)
+        if not paragraph:
+            continue
+        if current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class FinanceActuarialKnowledgeBase:
+    """Base de connaissances de départ: documents texte du dossier de référence, en chunks {'chunk', 'metadata'}
+
+    Les chunks sont ensuite repris en store colonnaire (attach_chunk_store) et indexés par le moteur
+    hybride; search_similar_chunks n'est que la recherche basique utilisée sans les modules RAG avancés.
+    """
+
+    def __init__(self, folder=None, chunk_size=1000):
+        self.folder = folder or KNOWLEDGE_FOLDER
+        self.chunks = []
+        # Index vectoriel: aucun ici (store vectoriel rattaché par le moteur hybride)
+        self.index = None
+        for path in self.document_paths():
+            self.chunks.extend(self.load_document(path, chunk_size))
+
+    def document_paths(self):
+        """Documents texte du dossier de référence (sous-dossiers compris), dans un ordre stable"""
+        if not os.path.isdir(self.folder):
+            return []
+        paths = []
+        for directory, _, names in os.walk(self.folder):
+            paths.extend(os.path.join(directory, name) for name in names
+                         if os.path.splitext(name)[1].lower() in TEXT_EXTENSIONS)
+        return sorted(paths)
+
+    def load_document(self, path, chunk_size=1000):
+        """Chunks d'un document; la source est son chemin relatif au dossier de référence"""
+        with open(path, encoding='utf-8', errors='replace') as f:
+            text = f.read()
+        source = os.path.relpath(path, self.folder).replace(os.sep, '/')
+        return [{'chunk': chunk, 'metadata': {'source': source, 'page': 1}}
+                for chunk in paragraph_chunks(text, chunk_size)]
+
+    def search_similar_chunks(self, query, top_k=5):
+        """Recherche basique par mots communs (pondérés par leur rareté), sans embeddings ni FAISS"""
+        terms = set(_WORD_RE.findall(str(query).lower()))
+        if not terms:
+            return []
+        counts = []
+        document_frequency = Counter()
+        for chunk_id in range(len(self.chunks)):
+            words = Counter(word for word in _WORD_RE.findall(self.chunks[chunk_id]['chunk'].lower()) if word in terms)
+            counts.append(words)
+            document_frequency.update(words.keys())
+        idf = {term: math.log((1 + len(counts)) / (1 + frequency)) + 1 for term, frequency in document_frequency.items()}
+        scored = []
+        for chunk_id, words in enumerate(counts):
+            if words:
+                score = sum(idf[word] * (1 + math.log(count)) for word, count in words.items())
+                scored.append((score / sum(idf.values()), chunk_id))
+        scored.sort(reverse=True)
+        results = []
+        for score, chunk_id in scored[:top_k]:
+            chunk = self.chunks[chunk_id]
+            results.append({
+                'chunk': chunk['chunk'],
+                'metadata': chunk['metadata'],
+                'similarity_score': float(score),
+                'search_type': 'keyword'
+            })
+        return results
@@ -0,0 +1,333 @@
+# backend/knowledge_snapshot.py
+"""
+Snapshot portable d'une base de connaissances indexée: chunks, vecteurs, index lexical, métadonnées,
+manifeste d'ingestion et tableaux, avec l'empreinte SHA-256 de chaque fichier.
+
+Un nœud démarré sur un snapshot relit les stores en memory-map sans réextraire ni réencoder les
+documents. L'export se fait depuis le service (POST /api/snapshots); ce module vérifie, archive et
+déballe les snapshots.
+
+Usage:
+    python knowledge_snapshot.py verify kb_snapshots/kb-20250101-120000-v3
+    python knowledge_snapshot.py pack kb_snapshots/kb-20250101-120000-v3 kb.tar
+    python knowledge_snapshot.py unpack kb.tar /data/kb_snapshots/kb
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tarfile
+import time
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from chunk_store import ColumnarChunkStore
+from citation_index import CitationIndex
+from ingestion_manifest import IngestionManifest, file_digest
+from table_store import TableStore
+from vector_store import VectorStore
+
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_FILE = 'snapshot.json'
+
+# Sous-répertoires du snapshot
+CHUNKS_DIRECTORY = 'chunks'
+VECTORS_DIRECTORY = 'vectors'
+LEXICAL_DIRECTORY = 'lexical'
+INDEX_DIRECTORY = 'index'
+
+
+class SnapshotError(ValueError):
+    """Snapshot incomplet, altéré ou incompatible avec l'embedder du nœud"""
+
+
+class SnapshotKnowledgeBase:
+    """Base de connaissances relue d'un snapshot (aucun document n'est relu)"""
+
+    def __init__(self, chunks, vector_store, manifest=None, table_store=None, snapshot=None):
+        self.chunks = chunks
+        self.vector_store = vector_store
+        self.index = None
+        self.manifest = manifest
+        self.table_store = table_store
+        # Description du snapshot d'origine (sans la liste des fichiers)
+        self.snapshot = snapshot
+
+
+def _json_value(value):
+    """Scalaires numpy des rapports convertis pour JSON"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+def embedder_identity(embedder, dimension):
+    """Identité de l'embedder: des vecteurs ne sont comparables qu'à des requêtes du même modèle"""
+    return {
+        'class': type(embedder).__name__,
+        'dimension': int(dimension),
+        'specialized_models': sorted(getattr(embedder, 'specialized_models', {}) or {})
+    }
+
+
+# ----------------------------------------------------------------------
+# Index lexical (vocabulaire JSON + idf et matrice CSR en .npy)
+# ----------------------------------------------------------------------
+def save_lexical_index(vectorizer, matrix, directory):
+    os.makedirs(directory, exist_ok=True)
+    matrix = sparse.csr_matrix(matrix)
+    np.save(os.path.join(directory, 'idf.npy'), np.asarray(vectorizer.idf_))
+    np.save(os.path.join(directory, 'matrix_data.npy'), matrix.data)
+    np.save(os.path.join(directory, 'matrix_indices.npy'), matrix.indices)
+    np.save(os.path.join(directory, 'matrix_indptr.npy'), matrix.indptr)
+    # Paramètres sérialisables seulement (tokenizer et préprocesseur personnalisés non supportés)
+    params = {key: value for key, value in vectorizer.get_params().items()
+              if isinstance(value, (str, int, float, bool, tuple, list, type(None)))}
+    with open(os.path.join(directory, 'vectorizer.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'params': params,
+            'vocabulary': {term: int(position) for term, position in vectorizer.vocabulary_.items()},
+            'shape': list(matrix.shape)
+        }, f, ensure_ascii=False)
+
+
+def load_lexical_index(directory, mmap=True):
+    """(vectorizer TF-IDF ajusté, matrice CSR dont les tableaux sont en memory-map)"""
+    mmap_mode = 'r' if mmap else None
+    with open(os.path.join(directory, 'vectorizer.json'), encoding='utf-8') as f:
+        layout = json.load(f)
+    vectorizer = TfidfVectorizer(**{key: tuple(value) if isinstance(value, list) else value
+                                    for key, value in layout['params'].items()})
+    vectorizer.vocabulary_ = layout['vocabulary']
+    vectorizer.idf_ = np.load(os.path.join(directory, 'idf.npy'))
+    matrix = sparse.csr_matrix((
+        np.load(os.path.join(directory, 'matrix_data.npy'), mmap_mode=mmap_mode),
+        np.load(os.path.join(directory, 'matrix_indices.npy'), mmap_mode=mmap_mode),
+        np.load(os.path.join(directory, 'matrix_indptr.npy'), mmap_mode=mmap_mode)
+    ), shape=tuple(layout['shape']), copy=False)
+    return vectorizer, matrix
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+def snapshot_files(directory):
+    """{chemin relatif: {'bytes', 'sha256'}} de tous les fichiers du snapshot (hors snapshot.json)"""
+    files = {}
+    for root, _, names in os.walk(directory):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, directory).replace(os.sep, '/')
+            if relative != SNAPSHOT_FILE:
+                files[relative] = {'bytes': os.path.getsize(path), 'sha256': file_digest(path)}
+    return dict(sorted(files.items()))
+
+
+def export_snapshot(engine, directory, metadata=None):
+    """Écrit le snapshot d'un moteur dans un nouveau répertoire; retourne sa description
+
+    Le snapshot est écrit dans un répertoire voisin puis renommé: un snapshot visible est complet.
+    Le moteur exporté n'est pas modifié (les snapshots servis sont immuables).
+    metadata: informations de l'appelant conservées dans la description (ex: jobs d'ingestion inclus)
+    """
+    if os.path.exists(directory):
+        raise SnapshotError(f"Le snapshot {directory} existe déjà")
+    start = time.perf_counter()
+    staging = directory + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+    knowledge_base = engine.kb
+    manifest = getattr(knowledge_base, 'manifest', None)
+    table_store = getattr(knowledge_base, 'table_store', None)
+    try:
+        engine.chunk_store.save(os.path.join(staging, CHUNKS_DIRECTORY))
+        engine.vector_store.save(os.path.join(staging, VECTORS_DIRECTORY))
+        save_lexical_index(engine.tfidf_vectorizer, engine.tfidf_matrix.tocsr(), os.path.join(staging, LEXICAL_DIRECTORY))
+
+        index_directory = os.path.join(staging, INDEX_DIRECTORY)
+        os.makedirs(index_directory)
+        np.save(os.path.join(index_directory, 'indexed_ids.npy'), np.asarray(engine.indexed_ids, dtype=np.int64))
+        with open(os.path.join(index_directory, 'duplicate_groups.json'), 'w', encoding='utf-8') as f:
+            json.dump({str(representative): members for representative, members in engine.duplicate_groups.items()},
+                      f, default=_json_value)
+        engine.citation_index.save(index_directory)
+        if engine.minhash_index is not None:
+            # Signatures MinHash: les ingestions suivantes sont dédupliquées sans relire le corpus
+            chunk_ids, signatures = engine.minhash_index.signatures(engine.minhash_count)
+            np.save(os.path.join(index_directory, 'minhash_chunk_ids.npy'), chunk_ids)
+            np.save(os.path.join(index_directory, 'minhash_signatures.npy'), signatures)
+        if manifest is not None:
+            manifest.save(staging)
+        if table_store is not None:
+            table_store.save(staging)
+
+        snapshot = {
+            'format': SNAPSHOT_FORMAT,
+            'created_at': datetime.now().isoformat(),
+            'embedder': embedder_identity(engine.embedder, engine.vector_store.dimension),
+            'counts': {
+                'chunks': len(engine.chunk_store),
+                'indexed_chunks': int(len(engine.indexed_ids)),
+                'vectors': len(engine.vector_store),
+                'documents': len(engine.chunk_store.distinct('source')),
+                'tables': len(table_store.tables) if table_store is not None else 0
+            },
+            'contents': {'manifest': manifest is not None, 'tables': table_store is not None},
+            'dedup_report': engine.dedup_report,
+            'metadata': metadata or {},
+            'files': snapshot_files(staging)
+        }
+        snapshot['bytes'] = sum(entry['bytes'] for entry in snapshot['files'].values())
+        with open(os.path.join(staging, SNAPSHOT_FILE), 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, indent=2, ensure_ascii=False, default=_json_value)
+        os.rename(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    snapshot['export_seconds'] = round(time.perf_counter() - start, 3)
+    return snapshot
+
+
+# ----------------------------------------------------------------------
+# Vérification, archive
+# ----------------------------------------------------------------------
+def read_snapshot(directory):
+    try:
+        with open(os.path.join(directory, SNAPSHOT_FILE), encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f"Description du snapshot illisible ({directory}): {e}")
+    if snapshot.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError(f"Format de snapshot non supporté: {snapshot.get('format')}")
+    return snapshot
+
+
+def verify_snapshot(directory, checksums=True):
+    """Description du snapshot après contrôle de ses fichiers (tailles, et empreintes si checksums);
+    lève SnapshotError au premier fichier manquant ou altéré"""
+    snapshot = read_snapshot(directory)
+    for relative, expected in snapshot['files'].items():
+        path = os.path.join(directory, *relative.split('/'))
+        if not os.path.isfile(path):
+            raise SnapshotError(f"Fichier manquant dans le snapshot: {relative}")
+        if os.path.getsize(path) != expected['bytes']:
+            raise SnapshotError(f"Taille inattendue: {relative}")
+        if checksums and file_digest(path) != expected['sha256']:
+            raise SnapshotError(f"Empreinte SHA-256 invalide: {relative}")
+    return snapshot
+
+
+def pack_snapshot(directory, archive_path):
+    """Archive tar (non compressée: les .npy restent lisibles tels quels) d'un snapshot vérifié"""
+    snapshot = verify_snapshot(directory)
+    with tarfile.open(archive_path, 'w') as archive:
+        archive.add(directory, arcname='.')
+    return snapshot
+
+
+def unpack_snapshot(archive_path, directory):
+    """Déballe une archive dans un nouveau répertoire et vérifie les empreintes; retourne la description"""
+    if os.path.exists(directory):
+        raise SnapshotError(f"Le répertoire {directory} existe déjà")
+    staging = directory + '.partial'
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        with tarfile.open(archive_path, 'r') as archive:
+            if hasattr(tarfile, 'data_filter'):
+                archive.extractall(staging, filter='data')
+            else:
+                for member in archive.getmembers():
+                    target = os.path.realpath(os.path.join(staging, member.name))
+                    if not target.startswith(os.path.realpath(staging)) or not (member.isfile() or member.isdir()):
+                        raise SnapshotError(f"Entrée d'archive refusée: {member.name}")
+                archive.extractall(staging)
+        snapshot = verify_snapshot(staging)
+        os.rename(staging, directory)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return snapshot
+
+
+# ----------------------------------------------------------------------
+# Import
+# ----------------------------------------------------------------------
+def load_knowledge_base(directory, verify=True, mmap=True):
+    """Base de connaissances d'un snapshot: stores relus en memory-map"""
+    snapshot = verify_snapshot(directory, checksums=verify)
+    chunks = ColumnarChunkStore.load(os.path.join(directory, CHUNKS_DIRECTORY), mmap=mmap)
+    vector_store = VectorStore.load(os.path.join(directory, VECTORS_DIRECTORY), mmap=mmap)
+    manifest = IngestionManifest.load(directory) if snapshot['contents']['manifest'] else None
+    table_store = TableStore.load(directory, mmap=mmap) if snapshot['contents']['tables'] else None
+    description = {key: value for key, value in snapshot.items() if key != 'files'}
+    description['path'] = os.path.abspath(directory)
+    return SnapshotKnowledgeBase(chunks, vector_store, manifest, table_store, description)
+
+
+def load_snapshot(directory, embedder, verify=True, mmap=True, **engine_options):
+    """Moteur de recherche prêt à servir, restauré d'un snapshot (sans réencodage ni réindexation)"""
+    from hybrid_search import AdvancedHybridSearch
+
+    start = time.perf_counter()
+    knowledge_base = load_knowledge_base(directory, verify=verify, mmap=mmap)
+    snapshot = knowledge_base.snapshot
+    # Dimension de l'embedder du nœud mesurée sur un texte témoin
+    expected = embedder_identity(embedder, np.ravel(embedder.get_embedding('snapshot')).shape[0])
+    if snapshot['embedder'] != expected:
+        raise SnapshotError(f"Snapshot encodé par {snapshot['embedder']}, embedder du nœud: {expected}")
+
+    index_directory = os.path.join(directory, INDEX_DIRECTORY)
+    indexed_ids = np.load(os.path.join(index_directory, 'indexed_ids.npy'))
+    if not np.array_equal(knowledge_base.vector_store.chunk_ids, indexed_ids):
+        raise SnapshotError("Vecteurs et chunks indexés du snapshot ne correspondent pas")
+    with open(os.path.join(index_directory, 'duplicate_groups.json'), encoding='utf-8') as f:
+        duplicate_groups = {int(representative): members for representative, members in json.load(f).items()}
+    tfidf_vectorizer, tfidf_matrix = load_lexical_index(os.path.join(directory, LEXICAL_DIRECTORY), mmap=mmap)
+    minhash = None
+    if os.path.exists(os.path.join(index_directory, 'minhash_signatures.npy')):
+        minhash = (np.load(os.path.join(index_directory, 'minhash_chunk_ids.npy')),
+                   np.load(os.path.join(index_directory, 'minhash_signatures.npy'), mmap_mode='r' if mmap else None))
+
+    engine = AdvancedHybridSearch(knowledge_base, embedder=embedder, restored={
+        'indexed_ids': indexed_ids,
+        'duplicate_groups': duplicate_groups,
+        'dedup_report': snapshot['dedup_report'],
+        'tfidf_vectorizer': tfidf_vectorizer,
+        'tfidf_matrix': tfidf_matrix,
+        'citation_index': CitationIndex.load(index_directory),
+        'minhash': minhash
+    }, **engine_options)
+    engine.build_timings['snapshot_load_s'] = time.perf_counter() - start
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vérification et archivage des snapshots de base de connaissances")
+    commands = parser.add_subparsers(dest='command', required=True)
+    verify = commands.add_parser('verify', help="contrôle les tailles et empreintes SHA-256")
+    verify.add_argument('directory')
+    pack = commands.add_parser('pack', help="archive tar d'un snapshot vérifié")
+    pack.add_argument('directory')
+    pack.add_argument('archive')
+    unpack = commands.add_parser('unpack', help="déballe et vérifie une archive")
+    unpack.add_argument('archive')
+    unpack.add_argument('directory')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if args.command == 'verify':
+            snapshot = verify_snapshot(args.directory)
+        elif args.command == 'pack':
+            snapshot = pack_snapshot(args.directory, args.archive)
+        else:
+            snapshot = unpack_snapshot(args.archive, args.directory)
+    except SnapshotError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"✅ Snapshot valide: {snapshot['counts']['chunks']} chunks, {snapshot['counts']['vectors']} vecteurs, "
+          f"{len(snapshot['files'])} fichiers ({snapshot['bytes'] / 1024 ** 2:.1f} Mo) "
+          f"en {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
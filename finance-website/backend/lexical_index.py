@@ -0,0 +1,61 @@
+# backend/lexical_index.py
+import numpy as np
+from scipy import sparse
+
+
+class SparseRowSegments:
+    """Matrice TF-IDF (une ligne par position d'index) conservée en segments CSR
+
+    Les lignes ajoutées (vectoriseur de la dernière construction complète) forment un nouveau
+    segment; les derniers segments sont fusionnés tant qu'ils ne sont pas plus grands que lui, comme
+    ceux du VectorStore. Les lignes sont normalisées L2: le produit scalaire avec une requête
+    transformée est le cosinus.
+    """
+
+    def __init__(self, segments):
+        self.segments = [sparse.csr_matrix(segment) for segment in segments]
+        self.starts = np.cumsum([0] + [segment.shape[0] for segment in self.segments])
+
+    @property
+    def shape(self):
+        columns = self.segments[0].shape[1] if self.segments else 0
+        return int(self.starts[-1]), columns
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def appended(self, matrix):
+        """Nouvelle matrice: ces lignes suivies des lignes données (cette matrice reste inchangée)"""
+        segment = sparse.csr_matrix(matrix)
+        if not segment.shape[0]:
+            return self
+        segments = list(self.segments)
+        merge = []
+        while segments and segments[-1].shape[0] <= segment.shape[0] + sum(other.shape[0] for other in merge):
+            merge.insert(0, segments.pop())
+        if merge:
+            segment = sparse.vstack(merge + [segment], format='csr')
+        return SparseRowSegments(segments + [segment])
+
+    def dot(self, query_vectors, rows=None):
+        """Scores (lignes x requêtes, dense) des lignes données, toutes les lignes par défaut"""
+        query_vectors = sparse.csr_matrix(query_vectors).T
+        if rows is None:
+            blocks = [(segment @ query_vectors).toarray() for segment in self.segments]
+        else:
+            rows = np.asarray(rows, dtype=np.int64)
+            # Lignes triées: une tranche par segment
+            bounds = np.searchsorted(rows, self.starts)
+            blocks = [
+                (segment[rows[bounds[number]:bounds[number + 1]] - self.starts[number]] @ query_vectors).toarray()
+                for number, segment in enumerate(self.segments)
+            ]
+        if not blocks:
+            return np.zeros((0 if rows is None else len(rows), query_vectors.shape[1]), dtype=np.float64)
+        return np.vstack(blocks)
+
+    def tocsr(self):
+        """Matrice CSR unique (export)"""
+        if len(self.segments) == 1:
+            return self.segments[0]
+        return sparse.vstack(self.segments, format='csr')
@@ -0,0 +1,180 @@
+# backend/near_duplicates.py
+import re
+import time
+import zlib
+from collections import defaultdict
+import numpy as np
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_RE = re.compile(r'\w+')
+
+
+class MinHashDeduplicator:
+    """Détection des chunks quasi-identiques par MinHash + LSH"""
+
+    def __init__(self, num_perm=64, bands=16, shingle_size=5, threshold=0.85, seed=42):
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+    def shingles(self, text):
+        """Hashes des n-grammes de mots (texte normalisé)"""
+        words = _WORD_RE.findall(text.lower())
+        if len(words) <= self.shingle_size:
+            grams = [' '.join(words)]
+        else:
+            grams = [' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+        return np.unique(np.fromiter(
+            (zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams)
+        ))
+
+    def signature(self, text):
+        """Signature MinHash d'un texte"""
+        hashes = self.shingles(text) % _MERSENNE_PRIME
+        return ((self._a * hashes + self._b) % _MERSENNE_PRIME).min(axis=1).astype(np.uint32)
+
+    def signatures(self, texts):
+        """Signatures MinHash des textes (une ligne par texte)"""
+        signatures = [self.signature(text) for text in texts]
+        return np.array(signatures, dtype=np.uint32).reshape(len(signatures), self.num_perm)
+
+    def find_groups(self, texts, signatures=None):
+        """Regroupe les quasi-doublons; retourne (représentants triés, {représentant: [membres]})"""
+        if signatures is None:
+            signatures = self.signatures(texts)
+        count = len(signatures)
+        if not count:
+            return np.zeros(0, dtype=np.int64), {}
+        parent = np.arange(count)
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for band in range(self.bands):
+            buckets = defaultdict(list)
+            band_slice = signatures[:, band * self.rows:(band + 1) * self.rows]
+            for chunk_id in range(count):
+                buckets[band_slice[chunk_id].tobytes()].append(chunk_id)
+
+            for members in buckets.values():
+                if len(members) < 2:
+                    continue
+                # Comparaison au premier membre du bucket: linéaire même pour le boilerplate massif
+                anchor = members[0]
+                similarities = (signatures[members[1:]] == signatures[anchor]).mean(axis=1)
+                for member, similarity in zip(members[1:], similarities):
+                    if similarity >= self.threshold:
+                        root_a, root_b = find(anchor), find(member)
+                        if root_a != root_b:
+                            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = defaultdict(list)
+        for chunk_id in range(count):
+            groups[find(chunk_id)].append(chunk_id)
+
+        representatives = np.array(sorted(groups), dtype=np.int64)
+        return representatives, {rep: members for rep, members in groups.items() if len(members) > 1}
+
+    def deduplicate(self, texts, embedding_dim=384, signatures=None):
+        """Applique la déduplication et mesure le gain d'index"""
+        start = time.time()
+        representatives, duplicate_groups = self.find_groups(texts, signatures)
+        elapsed = time.time() - start
+
+        report = deduplication_report(len(representatives), duplicate_groups, embedding_dim, elapsed)
+        return representatives, duplicate_groups, report
+
+
+class MinHashIndex:
+    """État LSH incrémental: signature de chaque chunk vu et premier chunk (ancre) de chaque bucket
+
+    Un chunk ajouté est comparé aux seules ancres de ses buckets (comme find_groups compare chaque
+    membre au premier du bucket), sans repasser sur le corpus. L'état est partagé par les moteurs
+    successifs et complété sous le verrou de construction: chaque moteur écrit à partir du nombre
+    de lignes du moteur précédent, une ligne laissée par une construction abandonnée est écrasée.
+    """
+
+    def __init__(self, deduplicator, chunk_ids, signatures):
+        self.deduplicator = deduplicator
+        count = len(chunk_ids)
+        capacity = max(1024, count)
+        self._chunk_ids = np.zeros(capacity, dtype=np.int64)
+        self._chunk_ids[:count] = chunk_ids
+        self._signatures = np.zeros((capacity, deduplicator.num_perm), dtype=np.uint32)
+        self._signatures[:count] = signatures
+        self.count = count
+        self._buckets = None  # bande -> {clé: ligne de l'ancre}, construit à la première mise à jour
+
+    def signatures(self, count):
+        """(identifiants, signatures) des count premières lignes"""
+        return self._chunk_ids[:count], self._signatures[:count]
+
+    def _ensure_buckets(self, count):
+        if self._buckets is not None:
+            return
+        rows = self.deduplicator.rows
+        self._buckets = []
+        for band in range(self.deduplicator.bands):
+            buckets = {}
+            band_slice = self._signatures[:count, band * rows:(band + 1) * rows]
+            for row in range(count):
+                buckets.setdefault(band_slice[row].tobytes(), row)
+            self._buckets.append(buckets)
+
+    def add(self, row, chunk_id, text, is_dead=None):
+        """Écrit le chunk à la ligne row; retourne l'ancre dont il est un quasi-doublon (ou None)
+
+        is_dead(chunk_id): ancres supprimées depuis, remplacées par le chunk dans leurs buckets
+        """
+        self._ensure_buckets(row)
+        if row >= len(self._chunk_ids):
+            capacity = 2 * len(self._chunk_ids)
+            self._chunk_ids = np.resize(self._chunk_ids, capacity)
+            self._signatures = np.resize(self._signatures, (capacity, self.deduplicator.num_perm))
+        signature = self.deduplicator.signature(text)
+        self._chunk_ids[row] = chunk_id
+        self._signatures[row] = signature
+        self.count = row + 1
+
+        rows = self.deduplicator.rows
+        anchor = None
+        for band, buckets in enumerate(self._buckets):
+            key = signature[band * rows:(band + 1) * rows].tobytes()
+            existing = buckets.get(key)
+            if (existing is None or existing >= row
+                    or (is_dead is not None and is_dead(int(self._chunk_ids[existing])))):
+                buckets[key] = row
+            elif anchor is None:
+                similarity = (self._signatures[existing] == signature).mean()
+                if similarity >= self.deduplicator.threshold:
+                    anchor = int(self._chunk_ids[existing])
+        return anchor
+
+
+def deduplication_report(indexed, duplicate_groups, embedding_dim=384, elapsed=0.0):
+    """Gain d'index de la déduplication: chunks indexés et groupes {représentant: membres}"""
+    total = indexed + sum(len(members) - 1 for members in duplicate_groups.values())
+    bytes_per_vector = embedding_dim * 4
+    return {
+        'chunks': total,
+        'indexed_chunks': indexed,
+        'duplicates_collapsed': total - indexed,
+        'duplicate_groups': len(duplicate_groups),
+        'index_bytes_before': total * bytes_per_vector,
+        'index_bytes_after': indexed * bytes_per_vector,
+        'index_bytes_saved': (total - indexed) * bytes_per_vector,
+        # Index plat: le coût d'une requête est linéaire en nombre de vecteurs
+        'estimated_query_time_saved_pct': round(100 * (total - indexed) / total, 2) if total else 0,
+        'dedup_seconds': round(elapsed, 3)
+    }
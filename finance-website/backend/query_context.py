@@ -0,0 +1,40 @@
+# backend/query_context.py
+
+
+def embedding_key(embedder, model_type='auto'):
+    """Clé de cache de l'embedding d'une requête pour un embedder donné"""
+    return ('embedding', id(embedder), model_type)
+
+
+class QueryContext:
+    """Requête d'une requête HTTP: normalisée une fois, domaines et embeddings calculés à la demande puis réutilisés"""
+
+    __slots__ = ('query', 'normalized', '_cache')
+
+    def __init__(self, query):
+        self.query = query
+        self.normalized = ' '.join(query.lower().split())
+        self._cache = {}
+
+    @classmethod
+    def of(cls, query):
+        """Contexte existant tel quel, sinon nouveau contexte pour la chaîne"""
+        return query if isinstance(query, cls) else cls(query)
+
+    def cached(self, key, compute):
+        """Valeur mise en cache sous key (calculée par compute() au premier appel)"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def store(self, key, value):
+        self._cache[key] = value
+
+    def __str__(self):
+        return self.query
+
+    def __len__(self):
+        return len(self.query)
+
+    def __repr__(self):
+        return f"QueryContext({self.query!r}, cached={sorted(str(key[0]) for key in self._cache)})"
@@ -0,0 +1,85 @@
+# backend/query_expansion.py
+import re
+
+# Sigles courants du domaine -> forme développée
+ACRONYMS = {
+    'scr': 'solvency capital requirement capital de solvabilité requis',
+    'mcr': 'minimum capital requirement minimum de capital requis',
+    'orsa': 'own risk and solvency assessment',
+    'csm': 'contractual service margin marge sur services contractuels',
+    'bel': 'best estimate liabilities meilleure estimation',
+    'alm': 'asset liability management gestion actif-passif',
+    'var': 'value at risk',
+    'cvar': 'conditional value at risk expected shortfall',
+    'lcr': 'liquidity coverage ratio',
+    'nsfr': 'net stable funding ratio',
+    'cet1': 'common equity tier 1',
+    'rwa': 'risk weighted assets actifs pondérés',
+    'iard': 'assurance dommages non-vie',
+    'sfcr': 'solvency and financial condition report',
+}
+
+# Termes français -> vocabulaire (anglais) de FinancialEmbedder / AdvancedPromptEngine
+FRENCH_TERMS = {
+    'marché': 'market', 'risque': 'risk', 'risques': 'risk',
+    'solvabilité': 'solvency', 'liquidité': 'liquidity', 'volatilité': 'volatility',
+    'mortalité': 'mortality', 'longévité': 'longevity', 'provisionnement': 'reserving',
+    'provisions': 'reserving', 'prime': 'premium', 'primes': 'premium', 'rente': 'annuity',
+    'rentes': 'annuity', 'souscription': 'underwriting', 'tarification': 'pricing',
+    'valorisation': 'valuation', 'couverture': 'hedging', 'dérivés': 'derivatives',
+    'réglementation': 'regulation', 'conformité': 'compliance', 'portefeuille': 'portfolio',
+    'stress': 'stress testing',
+}
+
+_TOKEN_RE = re.compile(r"[\w'-]+")
+
+
+class QueryExpander:
+    """Reformulations d'une requête courte à partir des vocabulaires de domaine existants"""
+
+    def __init__(self, finance_terms, domain_experts, max_topic_terms=3):
+        # Vocabulaires: groupes de FinancialEmbedder.finance_terms + key_topics des experts
+        self.vocabularies = {
+            name: [term.replace('_', ' ') for term in terms] for name, terms in finance_terms.items()
+        }
+        for domain, info in domain_experts.items():
+            self.vocabularies[domain] = list(info['key_topics'])
+        self.max_topic_terms = max_topic_terms
+
+    def _tokens(self, text):
+        return _TOKEN_RE.findall(text.lower())
+
+    def expand_acronyms(self, query):
+        return ' '.join(ACRONYMS.get(token, token) for token in self._tokens(query))
+
+    def translate(self, query):
+        return ' '.join(FRENCH_TERMS.get(token, token) for token in self._tokens(query))
+
+    def related_topics(self, text):
+        """Termes du vocabulaire le plus proche de la requête, absents de la requête"""
+        text_lower = text.lower()
+        best_terms, best_overlap = [], 0
+        for terms in self.vocabularies.values():
+            overlap = sum(1 for term in terms if term.lower() in text_lower)
+            if overlap > best_overlap:
+                best_terms, best_overlap = terms, overlap
+        return [term for term in best_terms if term.lower() not in text_lower][:self.max_topic_terms]
+
+    def expand(self, query, max_variants=4):
+        """Requête d'origine suivie de reformulations distinctes"""
+        expanded = self.expand_acronyms(query)
+        translated = self.translate(expanded)
+        topics = self.related_topics(translated)
+
+        candidates = [
+            query,
+            expanded,
+            translated,
+            f"{query} {' '.join(topics)}" if topics else ''
+        ]
+        variants = []
+        for candidate in candidates:
+            candidate = candidate.strip()
+            if candidate and candidate.lower() not in [variant.lower() for variant in variants]:
+                variants.append(candidate)
+        return variants[:max_variants]
@@ -0,0 +1,65 @@
+# backend/search_results.py
+
+
+class SearchHit:
+    """Enregistrement léger circulant dans le pipeline de recherche (aucun texte, aucune métadonnée)"""
+
+    __slots__ = ('chunk_id', 'score', 'search_type', 'semantic_score', 'lexical_score',
+                 'rerank_score', 'relevance_score')
+
+    def __init__(self, chunk_id, score, search_type, semantic_score=None, lexical_score=None):
+        self.chunk_id = chunk_id
+        self.score = score
+        self.search_type = search_type      # provenance: semantic, lexical, hybrid, multi_query, citation...
+        self.semantic_score = semantic_score
+        self.lexical_score = lexical_score
+        self.rerank_score = None
+        self.relevance_score = None
+
+    def __repr__(self):
+        return f"SearchHit(chunk_id={self.chunk_id}, score={self.score:.4f}, search_type={self.search_type!r})"
+
+
+class SearchResult:
+    """Résultat final matérialisé; accessible comme l'ancien dict (result['chunk'], result.get(...))"""
+
+    __slots__ = ('chunk_id', 'chunk', 'metadata', 'similarity_score', 'combined_score', 'semantic_score',
+                 'lexical_score', 'rerank_score', 'relevance_score', 'search_type', 'source_locations',
+                 'truncated')
+
+    def __init__(self, hit, chunk, metadata, truncated=False, source_locations=None):
+        self.chunk_id = hit.chunk_id
+        self.chunk = chunk
+        self.metadata = metadata
+        self.search_type = hit.search_type
+        # Score d'un seul étage de recherche vs score fusionné
+        fused = hit.search_type in ('hybrid', 'multi_query')
+        self.similarity_score = None if fused else hit.score
+        self.combined_score = hit.score if fused else None
+        self.semantic_score = hit.semantic_score
+        self.lexical_score = hit.lexical_score
+        self.rerank_score = hit.rerank_score
+        self.relevance_score = hit.relevance_score
+        self.source_locations = source_locations
+        self.truncated = truncated
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        value = getattr(self, key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if key in self.__slots__ else None
+        return default if value is None else value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__ if getattr(self, key) is not None}
+
+    def __repr__(self):
+        return f"SearchResult(chunk_id={self.chunk_id}, search_type={self.search_type!r})"
@@ -0,0 +1,436 @@
+# backend/table_store.py
+import json
+import os
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+
+# Cellule numérique: 0,00123 / 1.5e-3 / 100 000 / -2,5 % (séparateur de milliers: espace)
+_NUMBER_RE = re.compile(
+    r'^[-+\u2212]?(?:\d{1,3}(?:[ \u00a0\u202f]\d{3})+|\d+)(?:[.,]\d+)?(?:[eE][-+]?\d+)?\s*%?$'
+)
+# Séparateurs de cellules explicites (tabulations des tableaux DOCX, barres, espaces multiples)
+_CELL_SEPARATOR_RE = re.compile(r'\t|\s*\|\s*|\s{2,}')
+# Identifiant de table actuarielle réglementaire: TH00-02, TF 00-02, TGH05, TD88-90, TPRV93, TPG1993
+# (préfixes connus seulement: « TVA 20 » n'est pas une table)
+TABLE_PREFIXES = ('TGHF', 'TPRV', 'TGH', 'TGF', 'TPG', 'TH', 'TF', 'TD', 'TV')
+TABLE_ID_RE = re.compile(r'\b(?:' + '|'.join(TABLE_PREFIXES) + r') ?\d{2}(?:\d{2})?(?: ?[-–/] ?\d{2})?\b')
+# Ligne de titre de tableau
+TABLE_TITLE_RE = re.compile(r'\b(?:table|tableau|courbe|triangle|barème|bareme|grille)\b', re.IGNORECASE)
+# Clé de ligne dans une question: "à 65 ans", "âge 65", "année 2020", "maturité 10"
+QUERY_KEY_RE = re.compile(
+    r'(?:âge|age|année|annee|maturité|maturite|durée|duree|horizon|rang)\s*(?:de|=|:)?\s*(\d+)|(\d+)\s*ans?\b',
+    re.IGNORECASE
+)
+# Question qui demande une explication ou plusieurs informations: la valeur seule n'y répond pas
+REASONING_RE = re.compile(
+    r'\b(?:pourquoi|comment|impacts?|expliqu\w*|évolu\w*|evolu\w*|compar\w*|raisons?|causes?|'
+    r'conséquences?|consequences?|influen\w*|effets?)\b',
+    re.IGNORECASE
+)
+MULTI_PART_RE = re.compile(
+    r'\b(?:et|puis|ainsi que)\s+(?:quel(?:le)?s?|combien|que|qu\'|comment|pourquoi|où)',
+    re.IGNORECASE
+)
+_THOUSANDS_HEAD_RE = re.compile(r'[-+\u2212]?[1-9]\d{0,2}')
+_THOUSANDS_GROUP_RE = re.compile(r'\d{3}(?:[.,]\d+)?')
+_WORD_RE = re.compile(r'\w+')
+
+
+def normalize_identity(text):
+    """Identité comparable d'une table: 'TH 00-02' -> 'TH0002'"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9A-Z]', '', text.upper())
+
+
+def parse_number(cell):
+    """Valeur d'une cellule numérique (None si la cellule n'est pas un nombre)"""
+    cell = cell.strip()
+    if not _NUMBER_RE.match(cell):
+        return None
+    cell = re.sub('[ \u00a0\u202f%]', '', cell).replace('\u2212', '-').replace(',', '.')
+    return float(cell)
+
+
+def row_cells(line):
+    """Cellules d'une ligne de tableau (None si la ligne n'est pas entièrement numérique)
+
+    Sans séparateur explicite (texte PDF), chaque mot est une cellule: un nombre écrit avec un
+    séparateur de milliers ("100 000") est regroupé ensuite, à la largeur du tableau (group_cells).
+    """
+    line = line.strip()
+    if _CELL_SEPARATOR_RE.search(line):
+        cells = [cell for cell in _CELL_SEPARATOR_RE.split(line) if cell]
+    else:
+        cells = line.split()
+    if len(cells) < 2 or any(parse_number(cell) is None for cell in cells):
+        return None
+    return cells
+
+
+def group_cells(cells, width):
+    """Regroupe les milliers pour obtenir width cellules, premières cellules les plus courtes (None: impossible)"""
+    if len(cells) <= width:
+        return cells
+
+    def segment(first, remaining):
+        if remaining == 0:
+            return [] if first == len(cells) else None
+        # Cellule seule, puis nombre groupé: 1 à 3 chiffres suivis de groupes de 3 chiffres
+        for last in range(first, len(cells) - remaining + 1):
+            if last > first and not (_THOUSANDS_HEAD_RE.fullmatch(cells[first])
+                                     and all(_THOUSANDS_GROUP_RE.fullmatch(cell) for cell in cells[first + 1:last + 1])):
+                break
+            rest = segment(last + 1, remaining - 1)
+            if rest is not None:
+                return [' '.join(cells[first:last + 1])] + rest
+        return None
+
+    return segment(0, width)
+
+
+def is_value_question(question):
+    """Question qui demande seulement une valeur (pas d'explication, une seule question)"""
+    return (question.count('?') <= 1 and not REASONING_RE.search(question)
+            and not MULTI_PART_RE.search(question))
+
+
+class ExtractedTable:
+    """Table extraite d'un document: une colonne numpy typée par colonne du tableau
+
+    La première colonne sert de clé (âge, année, maturité) lorsqu'elle est entière et croissante:
+    une valeur est alors lue par indexation directe (row_of).
+    """
+
+    def __init__(self, name, identity, source, page, column_names, columns):
+        self.name = name
+        self.identity = identity
+        self.source = source
+        self.page = page
+        self.column_names = list(column_names)
+        self.columns = [np.asarray(column) for column in columns]
+        self._rows = None
+
+    @classmethod
+    def from_rows(cls, name, identity, source, page, column_names, rows):
+        """Table à partir de lignes de valeurs (lignes courtes complétées par NaN: triangles)"""
+        width = len(column_names)
+        data = np.full((len(rows), width), np.nan)
+        for position, row in enumerate(rows):
+            data[position, :len(row)] = row[:width]
+        columns = []
+        for column in data.T:
+            integral = not np.isnan(column).any() and np.array_equal(column, np.round(column))
+            columns.append(column.astype(np.int64) if integral else column)
+        return cls(name, identity, source, page, column_names, columns)
+
+    @property
+    def shape(self):
+        return (len(self.columns[0]) if self.columns else 0, len(self.columns))
+
+    @property
+    def has_key(self):
+        """Première colonne utilisable comme clé (entière, strictement croissante)"""
+        key = self.columns[0]
+        return key.dtype.kind == 'i' and len(key) > 1 and bool(np.all(np.diff(key) > 0))
+
+    def column_index(self, name):
+        name = name.lower()
+        for position, column_name in enumerate(self.column_names):
+            if column_name.lower() == name:
+                return position
+        return None
+
+    def row_of(self, key):
+        """Ligne de la clé (None si absente)"""
+        if not self.has_key:
+            return None
+        if self._rows is None:
+            self._rows = {int(value): position for position, value in enumerate(self.columns[0])}
+        return self._rows.get(int(key))
+
+    def value(self, column, key):
+        """Valeur de la colonne pour la clé (None si absente ou vide)"""
+        row = self.row_of(key)
+        position = self.column_index(column) if isinstance(column, str) else column
+        if row is None or position is None:
+            return None
+        value = self.columns[position][row]
+        if np.isnan(value):
+            return None
+        return int(value) if self.columns[position].dtype.kind == 'i' else float(value)
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'identity': self.identity,
+            'source': self.source,
+            'page': self.page,
+            'columns': self.column_names,
+            'dtypes': [column.dtype.name for column in self.columns],
+            'shape': list(self.shape),
+            'key_column': self.column_names[0] if self.has_key else None
+        }
+
+
+class TableExtractor:
+    """Détecte les tableaux numériques d'un document, page après page
+
+    Un tableau est une suite d'au moins min_rows lignes entièrement numériques; la ligne qui les
+    précède donne les noms de colonnes si elle en a le bon nombre, et une ligne de titre proche
+    (« Table TH00-02 », « Courbe des taux ») son nom. Un tableau qui termine une page et reprend en
+    tête de la suivante forme une seule table. Dans le texte, le tableau est précédé d'une ligne de
+    résumé et ses lignes sont réécrites cellule par cellule (« 65 | 85 000 | 0,0123 »): un chunk
+    garde les valeurs lisibles par le LLM quand la lecture directe ne s'applique pas.
+    """
+
+    def __init__(self, source, min_rows=4, title_lines=3):
+        self.source = source
+        self.min_rows = min_rows
+        self.title_lines = title_lines
+        self.count = 0
+        self._open = None  # tableau en fin de page: {'name', 'identity', 'page', 'columns', 'rows'}
+
+    def _close(self):
+        table, self._open = self._open, None
+        if table is None:
+            return []
+        return [ExtractedTable.from_rows(
+            table['name'], table['identity'], self.source, table['page'], table['columns'], table['rows']
+        )]
+
+    def _header(self, lines, rows, first_row, page_number):
+        """(nom, identité, cellules de la ligne d'en-tête, position de cette ligne) du tableau"""
+        header_cells = header_line = None
+        previous = [position for position in range(max(0, first_row - self.title_lines), first_row)
+                    if lines[position].strip() and rows[position] is None]
+        if previous and not TABLE_TITLE_RE.search(lines[previous[-1]]):
+            header_line = previous.pop()
+            line = lines[header_line].strip()
+            header_cells = [cell for cell in _CELL_SEPARATOR_RE.split(line) if cell] \
+                if _CELL_SEPARATOR_RE.search(line) else line.split()
+        for position in reversed(previous):
+            line = lines[position].strip()
+            table_id = TABLE_ID_RE.search(line)
+            if table_id or TABLE_TITLE_RE.search(line):
+                name = table_id.group(0) if table_id else line.rstrip(' :')
+                return name, normalize_identity(name), header_cells, header_line
+        self.count += 1
+        return f"{os.path.splitext(self.source)[0]} p{page_number} #{self.count}", None, header_cells, header_line
+
+    @classmethod
+    def _width(cls, block, header_cells):
+        """Nombre de colonnes: celui de l'en-tête si les lignes s'y prêtent, sinon forme des lignes"""
+        counts = [len(cells) for cells in block]
+        low, high = min(counts), max(counts)
+        if header_cells:
+            for width in (len(header_cells), len(header_cells) + 1):
+                if 2 <= width <= high and cls._values(block, width) is not None:
+                    return width
+        # Triangle (lignes de plus en plus courtes): aucune cellule à regrouper
+        staircase = len(set(counts)) >= 3 and all(a >= b for a, b in zip(counts, counts[1:]))
+        return high if staircase else low
+
+    @staticmethod
+    def _values(block, width):
+        """Valeurs des lignes à la largeur du tableau (None si une ligne ne s'y prête pas)"""
+        grouped = [group_cells(cells, width) for cells in block]
+        if any(cells is None for cells in grouped):
+            return None
+        return [[parse_number(cell) for cell in cells] for cells in grouped]
+
+    @staticmethod
+    def _render(block, width):
+        """Lignes du tableau réécrites à sa largeur, cellules séparées par « | »"""
+        rendered = []
+        for cells in block:
+            grouped = group_cells(cells, width) or cells
+            rendered.append(' | '.join(grouped))
+        return rendered
+
+    def feed(self, page_number, text):
+        """(texte de la page, tableaux réécrits, tableaux terminés)"""
+        lines = text.split('\n')
+        rows = [row_cells(line) for line in lines]
+        finished = []
+        kept = []  # indices des lignes conservées, ou résumé d'un tableau
+        first_content = next((position for position, line in enumerate(lines) if line.strip()), None)
+        if self._open is not None and (first_content is None or rows[first_content] is None):
+            finished.extend(self._close())
+        position = 0
+        while position < len(lines):
+            if rows[position] is None:
+                kept.append(position)
+                position += 1
+                continue
+            end = position
+            while end < len(lines) and rows[end] is not None:
+                end += 1
+            block = rows[position:end]
+            # Tableau de la page précédente repris si la page commence par des lignes de même largeur
+            values = None
+            if self._open is not None and position == first_content:
+                values = self._values(block, len(self._open['columns']))
+            if values is not None:
+                self._open['rows'].extend(values)
+                kept.extend(self._render(block, len(self._open['columns'])))
+            elif len(block) >= self.min_rows:
+                finished.extend(self._close())
+                name, identity, header_cells, header_line = self._header(lines, rows, position, page_number)
+                width = self._width(block, header_cells)
+                columns = [f'c{column}' for column in range(width)]
+                if header_cells and len(header_cells) in (width, width - 1):
+                    # En-tête sans libellé pour la colonne clé: 'x'
+                    columns = header_cells if len(header_cells) == width else ['x'] + header_cells
+                    kept.remove(header_line)
+                values = self._values(block, width) or [
+                    [parse_number(cell) for cell in cells[:width]] for cells in block
+                ]
+                kept.append(f"[Tableau {name}; colonnes: {', '.join(columns)}]")
+                kept.extend(self._render(block, width))
+                self._open = {'name': name, 'identity': identity, 'page': page_number,
+                              'columns': columns, 'rows': values}
+            else:
+                kept.extend(range(position, end))
+            # Tableau suivi de texte sur la même page: terminé
+            if self._open is not None and any(line.strip() for line in lines[end:]):
+                finished.extend(self._close())
+            position = end
+        return '\n'.join(item if isinstance(item, str) else lines[item] for item in kept), finished
+
+    def finish(self):
+        return self._close()
+
+
+class TableStore:
+    """Tables extraites, indexées par identité (TH0002), nom de colonne et document
+
+    Le store n'est jamais modifié en place: with_documents() retourne un nouveau store où les
+    tables des documents réingérés remplacent les anciennes (snapshot servi inchangé).
+    """
+
+    DIRECTORY = 'tables'
+
+    def __init__(self, tables=None):
+        self.tables = list(tables or [])
+        self.by_identity = defaultdict(list)
+        self.by_column = defaultdict(list)
+        self.by_source = defaultdict(list)
+        for position, table in enumerate(self.tables):
+            if table.identity:
+                self.by_identity[table.identity].append(position)
+            for name in table.column_names:
+                self.by_column[name.lower()].append(position)
+            self.by_source[table.source].append(position)
+
+    def __len__(self):
+        return len(self.tables)
+
+    def with_documents(self, tables_by_source):
+        """Nouveau store: tables des documents donnés remplacées (liste vide: tables retirées)"""
+        kept = [table for table in self.tables if table.source not in tables_by_source]
+        return TableStore(kept + [table for tables in tables_by_source.values() for table in tables])
+
+    def find(self, identity=None, column=None, min_rows=0):
+        """Tables correspondant à une identité, une colonne et une taille minimale"""
+        positions = range(len(self.tables))
+        if identity is not None:
+            positions = self.by_identity.get(normalize_identity(identity), [])
+        if column is not None:
+            with_column = set(self.by_column.get(column.lower(), []))
+            positions = [position for position in positions if position in with_column]
+        return [self.tables[position] for position in positions if self.tables[position].shape[0] >= min_rows]
+
+    def lookup(self, question):
+        """Valeur de table désignée par une question (« qx à 65 ans table TH00-02 »)
+
+        Retourne None si la question ne désigne pas une table connue et une clé présente. Sinon, le
+        résultat donne la ligne de la clé et, si elle est identifiable, la colonne demandée; direct
+        indique que la valeur suffit comme réponse: question de valeur seule (is_value_question),
+        qui nomme la colonne et désigne la clé par un libellé de ligne (« à 65 ans », « âge 65 »,
+        nom de la colonne clé suivi du nombre). Un nombre sans libellé (année, numéro d'article)
+        ne sélectionne la ligne que comme contexte pour le LLM, jamais pour une réponse directe.
+        """
+        compact = normalize_identity(question)
+        identities = sorted((identity for identity in self.by_identity if identity in compact), key=len, reverse=True)
+        if not identities:
+            return None
+        # Nombres de la question hors identifiants de tables (00-02 dans TH00-02)
+        stripped = TABLE_ID_RE.sub(' ', question)
+        words = [word.lower() for word in _WORD_RE.findall(stripped)]
+        named_keys = [
+            int(next(group for group in match.groups() if group)) for match in QUERY_KEY_RE.finditer(stripped)
+        ]
+        numbers = [int(word) for word in words if word.isdigit()]
+
+        for table in (self.tables[position] for position in self.by_identity[identities[0]]):
+            if not table.has_key:
+                continue
+            key_column = table.column_names[0]
+            # Clés désignées par un libellé de ligne; sinon, n'importe quel nombre (contexte seulement)
+            labelled_keys = named_keys + [
+                int(word) for previous, word in zip(words, words[1:])
+                if previous == key_column.lower() and word.isdigit()
+            ]
+            keys = labelled_keys or numbers
+            key = next((key for key in keys if table.row_of(key) is not None), None)
+            if key is None:
+                continue
+            named_columns = [name for name in table.column_names[1:] if name.lower() in words]
+            column = named_columns[0] if named_columns else None
+            if column is None and len(table.column_names) == 2:
+                # Seule colonne de valeurs: probable, mais non demandée explicitement
+                column = table.column_names[1]
+            key_named = key in labelled_keys
+            return {
+                'table': table.name,
+                'identity': table.identity,
+                'column': column,
+                'key_column': key_column,
+                'key': key,
+                'value': table.value(column, key) if column is not None else None,
+                'row': {name: table.value(position, key) for position, name in enumerate(table.column_names)},
+                'direct': bool(named_columns) and key_named and is_value_question(question),
+                'source': table.source,
+                'page': table.page
+            }
+        return None
+
+    def report(self):
+        return {
+            'tables': len(self.tables),
+            'identities': sorted(self.by_identity),
+            'cells': int(sum(rows * columns for rows, columns in (table.shape for table in self.tables)))
+        }
+
+    # ------------------------------------------------------------------
+    # Persistance: une colonne = un fichier .npy (relu en mmap)
+    # ------------------------------------------------------------------
+    def save(self, directory):
+        directory = os.path.join(directory, self.DIRECTORY)
+        os.makedirs(directory, exist_ok=True)
+        layout = []
+        for position, table in enumerate(self.tables):
+            files = []
+            for column_position, column in enumerate(table.columns):
+                filename = f'table_{position}_{column_position}.npy'
+                np.save(os.path.join(directory, filename), column)
+                files.append(filename)
+            layout.append(dict(table.describe(), files=files))
+        with open(os.path.join(directory, 'tables.json'), 'w', encoding='utf-8') as f:
+            json.dump(layout, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        directory = os.path.join(directory, cls.DIRECTORY)
+        with open(os.path.join(directory, 'tables.json'), encoding='utf-8') as f:
+            layout = json.load(f)
+        return cls([
+            ExtractedTable(
+                table['name'], table['identity'], table['source'], table['page'], table['columns'],
+                [np.load(os.path.join(directory, filename), mmap_mode='r' if mmap else None)
+                 for filename in table['files']]
+            )
+            for table in layout
+        ])
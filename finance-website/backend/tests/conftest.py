@@ -0,0 +1,15 @@
+# backend/tests/conftest.py
+import os
+import sys
+import pytest
+
+# Modules du backend importés à plat, comme par chat_api.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark_search import HashingEmbedder
+
+
+@pytest.fixture
+def embedder():
+    """Embedder sans modèle (mots hachés en 384 dimensions), celui des benchmarks"""
+    return HashingEmbedder()
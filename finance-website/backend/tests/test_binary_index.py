@@ -0,0 +1,45 @@
+# backend/tests/test_binary_index.py
+import numpy as np
+import pytest
+from binary_index import FAISS_BINARY_AVAILABLE, BinaryPrefilter, binarize
+
+
+def clustered_embeddings(count=2000, dimension=64, clusters=40, seed=0):
+    rng = np.random.RandomState(seed)
+    centers = rng.normal(size=(clusters, dimension))
+    embeddings = centers[rng.randint(clusters, size=count)] + 0.3 * rng.normal(size=(count, dimension))
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings.astype(np.float32)
+
+
+def test_codes_hold_one_bit_per_dimension():
+    codes = binarize(np.array([[0.5, -1, 0, 2, -3, 1, 1, -1, 0.1]]))
+    assert codes.shape == (1, 2)
+    assert list(codes[0]) == [0b10010110, 0b10000000]
+
+
+@pytest.mark.parametrize('use_faiss', [False, True])
+def test_rescored_prefilter_keeps_recall_above_threshold(use_faiss):
+    if use_faiss and not FAISS_BINARY_AVAILABLE:
+        pytest.skip('faiss.IndexBinaryFlat indisponible')
+    embeddings = clustered_embeddings()
+    prefilter = BinaryPrefilter(embeddings, candidates=300, use_faiss=use_faiss)
+    assert (prefilter.index is not None) == use_faiss
+    assert prefilter.measure_recall(embeddings, sample_size=50, top_k=10) >= 0.9
+    assert prefilter.report()['memory_reduction'] == 32.0
+
+
+def test_numpy_and_faiss_backends_rescore_alike():
+    if not FAISS_BINARY_AVAILABLE:
+        pytest.skip('faiss.IndexBinaryFlat indisponible')
+    embeddings = clustered_embeddings(count=300)
+    query = embeddings[7]
+    # Tous les codes en candidats: les égalités de distance de Hamming ne changent plus le résultat
+    with_faiss = BinaryPrefilter(embeddings, candidates=len(embeddings))
+    with_numpy = BinaryPrefilter(embeddings, candidates=len(embeddings), use_faiss=False)
+    scores_faiss, rows_faiss = with_faiss.search(query, embeddings, top_k=5)
+    scores_numpy, rows_numpy = with_numpy.search(query, embeddings, top_k=5)
+    assert rows_faiss[0][0] == 7
+    assert list(rows_faiss[0]) == list(rows_numpy[0])
+    assert np.allclose(scores_faiss, scores_numpy)
+    assert set(with_numpy.hamming_candidates(query, 300)) == set(range(300))
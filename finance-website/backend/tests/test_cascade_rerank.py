@@ -0,0 +1,74 @@
+# backend/tests/test_cascade_rerank.py
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('faiss')
+from hybrid_search import AdvancedHybridSearch
+from search_results import SearchHit
+
+
+class ReverseCrossEncoder:
+    """Cross-encoder de test: inverse l'ordre reçu et compte les paires évaluées"""
+
+    def __init__(self):
+        self.pairs = []
+
+    def predict(self, pairs):
+        self.pairs.extend(pairs)
+        return [-position for position in range(len(pairs))][::-1]
+
+
+TOPICS = [
+    "capital de solvabilité requis et risque de marché",
+    "provisions techniques et risque de mortalité",
+    "marge de service contractuelle sous IFRS 17",
+]
+
+
+@pytest.fixture
+def engine(embedder):
+    knowledge_base = SimpleNamespace(chunks=[
+        {'chunk': f"Chunk {i}: {TOPICS[i % 3]}", 'metadata': {'source': f"doc{i}.pdf"}}
+        for i in range(12)
+    ], index=None)
+    return AdvancedHybridSearch(knowledge_base, deduplicate=False, rerank_margin=0.05, rerank_band=2,
+                                embedder=embedder, cross_encoder=ReverseCrossEncoder())
+
+
+def stage1_scores(engine, scores):
+    """Remplace l'étage cosinus par des scores fixés (candidat i -> scores[i])"""
+    def cosine_rescore(query, candidates):
+        for candidate in candidates:
+            candidate.rerank_score = scores[candidate.chunk_id]
+        return sorted(candidates, key=lambda candidate: candidate.rerank_score, reverse=True)
+    engine.cosine_rescore = cosine_rescore
+
+
+def candidates(count):
+    return [SearchHit(chunk_id, 0.0, 'hybrid') for chunk_id in range(count)]
+
+
+def test_clear_margin_at_rank_k_skips_the_cross_encoder(engine):
+    stage1_scores(engine, [0.9, 0.8, 0.7, 0.4, 0.3, 0.2])
+    ranked = engine.rerank_with_cross_encoder("SCR", candidates(6), top_k=3)
+    assert [candidate.chunk_id for candidate in ranked] == [0, 1, 2, 3, 4, 5]
+    assert engine._cross_encoder.pairs == []
+    assert engine.rerank_counters['stage1_only'] == 1
+    assert engine.rerank_counters['cross_encoder_pairs_saved'] == 6
+
+
+def test_uncertain_band_alone_goes_through_the_cross_encoder(engine):
+    stage1_scores(engine, [0.9, 0.8, 0.7, 0.69, 0.3, 0.2, 0.1])
+    ranked = engine.rerank_with_cross_encoder("SCR", candidates(7), top_k=3)
+    # Bande [k - 2, k + 2): rangs 1 à 4 réordonnés, les autres gardent leur rang cosinus
+    assert [candidate.chunk_id for candidate in ranked] == [0, 4, 3, 2, 1, 5, 6]
+    assert len(engine._cross_encoder.pairs) == 4
+    assert engine.rerank_counters['stage2'] == 1
+    assert engine.rerank_counters['cross_encoder_pairs_saved'] == 3
+
+
+def test_no_more_candidates_than_k_is_stage1_only(engine):
+    stage1_scores(engine, [0.5, 0.5])
+    ranked = engine.rerank_with_cross_encoder("SCR", candidates(2), top_k=3)
+    assert len(ranked) == 2
+    assert engine._cross_encoder.pairs == []
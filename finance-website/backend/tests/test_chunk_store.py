@@ -0,0 +1,187 @@
+# backend/tests/test_chunk_store.py
+import threading
+import numpy as np
+import pytest
+import chunk_store
+from chunk_store import ColumnarChunkStore
+
+
+def make_chunks(count=50):
+    return [
+        {
+            'chunk': f"Article {i} du règlement délégué: le SCR couvre le risque de marché n°{i} à 99,5 %.",
+            'metadata': {'source': f"doc_{i % 4}.pdf", 'page': i % 7}
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=['zstd', 'zlib'])
+def codec(request, monkeypatch):
+    if request.param == 'zstd':
+        pytest.importorskip('zstandard')
+    else:
+        monkeypatch.setattr(chunk_store, 'ZSTD_AVAILABLE', False)
+    return request.param
+
+
+def test_compressed_blocks_round_trip(codec):
+    chunks = make_chunks()
+    store = ColumnarChunkStore.from_chunks(chunks)
+    store.compress(block_size=8)
+    assert store.compressed_text.codec == codec
+    assert store.text_buffer.nbytes == 0
+    assert [store.chunk(chunk_id) for chunk_id in range(len(store))] == chunks
+
+    # Un chunk ajouté puis replié garde le même codec et les mêmes paramètres
+    store.append({'chunk': 'Chunk ajouté', 'metadata': {'source': 'ajout.pdf'}})
+    assert store.text(len(store) - 1) == 'Chunk ajouté'
+    store.compact()
+    assert store.compressed_text.codec == codec
+    assert store.compressed_text.block_size == 8
+    assert store.text(len(store) - 1) == 'Chunk ajouté'
+    assert store.text(0) == chunks[0]['chunk']
+
+
+def test_block_cache_is_lru_and_counts_per_thread(codec):
+    store = ColumnarChunkStore.from_chunks(make_chunks(40))
+    compression = store.compress(block_size=10, cache_blocks=2)
+    store.take_decode_stats()
+
+    store.text(0)
+    store.text(1)
+    assert store.take_decode_stats()['blocks_decoded'] == 1
+
+    store.text(10)
+    store.text(0)   # bloc 0 devient le plus récent
+    store.text(20)  # évince le bloc 1
+    assert list(compression._cache) == [0, 2]
+    stats = store.take_decode_stats()
+    assert (stats['blocks_decoded'], stats['cache_hits']) == (2, 1)
+    # Compteurs remis à zéro par take_decode_stats
+    assert store.take_decode_stats()['blocks_decoded'] == 0
+    assert store.compression_report()['blocks_decoded'] == 3
+
+
+def test_each_thread_gets_its_own_zstd_decompressor():
+    pytest.importorskip('zstandard')
+    chunks = make_chunks(64)
+    store = ColumnarChunkStore.from_chunks(chunks)
+    compression = store.compress(block_size=4, cache_blocks=1)
+    decompressors, texts = [], {}
+
+    def read(thread_id):
+        texts[thread_id] = [store.text(chunk_id) for chunk_id in range(len(store))]
+        decompressors.append(compression._decompressors.instance)
+
+    threads = [threading.Thread(target=read, args=(thread_id,)) for thread_id in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(decompressor) for decompressor in decompressors}) == 4
+    assert all(values == [chunk['chunk'] for chunk in chunks] for values in texts.values())
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_saved_store_loads_memory_mapped(tmp_path, compress):
+    chunks = make_chunks()
+    store = ColumnarChunkStore.from_chunks(chunks)
+    if compress:
+        store.compress(block_size=8)
+    store.save(str(tmp_path))
+
+    loaded = ColumnarChunkStore.load(str(tmp_path))
+    assert len(loaded) == len(chunks)
+    assert list(loaded) == chunks
+    assert (loaded.compressed_text is not None) == compress
+    if compress:
+        assert all(isinstance(part[2], np.memmap) for part in loaded.compressed_text.parts)
+    else:
+        assert isinstance(loaded.text_buffer, np.memmap)
+    assert list(loaded.rows_where('source', 'doc_1.pdf')) == list(range(1, len(chunks), 4))
+
+
+def test_set_values_fills_a_metadata_column():
+    store = ColumnarChunkStore.from_chunks(make_chunks(6))
+    store.append({'chunk': 'Chunk non compacté', 'metadata': {}})
+    store.set_values('domain', [0, 3, 6], ['regulation', 'risk_management', 'regulation'])
+    assert store.metadata(0)['domain'] == 'regulation'
+    assert 'domain' not in store.metadata(1)
+    assert store.metadata(6) == {'domain': 'regulation'}
+    assert list(store.rows_where('domain', 'regulation')) == [0, 6]
+    store.set_values('domain', [0], [None])
+    assert 'domain' not in store.metadata(0)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_text_prefix_decodes_at_most_max_chars(compress):
+    store = ColumnarChunkStore.from_chunks([{'chunk': 'Égalité été ' * 20, 'metadata': {}},
+                                            {'chunk': 'Court', 'metadata': {}}])
+    if compress:
+        store.compress(block_size=1)
+    text, truncated = store.text_prefix(0, 12)
+    assert (text, truncated) == ('Égalité été ', True)
+    assert store.text_prefix(1, 12) == ('Court', False)
+    assert store.text_prefix(1, 5) == ('Court', False)
+
+
+def test_code_is_the_dictionary_code_of_a_metadata_value():
+    store = ColumnarChunkStore.from_chunks(make_chunks(8))
+    code = store.code('source', 'doc_2.pdf')
+    assert code is not None
+    assert store.dictionaries['source'][code] == 'doc_2.pdf'
+    assert list(np.flatnonzero(store.columns['source'] == code)) == [2, 6]
+    assert store.code('source', 'absent.pdf') is None
+    assert store.code('inconnue', 'doc_2.pdf') is None
+
+
+def test_extended_compressed_store_shares_its_blocks(codec):
+    chunks = make_chunks(40)
+    base = ColumnarChunkStore.from_chunks(chunks[:30])
+    compression = base.compress(block_size=8)
+    extended = base.extended(chunks[30:])
+    # Base inchangée; ses blocs sont repris tels quels, les ajouts forment une nouvelle partie
+    assert len(base) == 30 and base.compressed_text is compression
+    assert extended.compressed_text.parts[0] is compression.parts[0]
+    assert len(extended.compressed_text.parts) == 2
+    assert list(extended) == chunks
+
+
+def test_extended_store_appends_a_text_part(tmp_path):
+    chunks = make_chunks(40)
+    base = ColumnarChunkStore.from_chunks(chunks[:30])
+    base_text = base.text_parts[0][1]
+    extended = base.extended(chunks[30:])
+    # Texte de la base repris tel quel (aucune copie), les ajouts forment une nouvelle partie
+    assert len(base.text_parts) == 1 and base.text_parts[0][1] is base_text
+    assert extended.text_parts[0][1] is base_text
+    assert [first_chunk for first_chunk, _ in extended.text_parts] == [0, 30]
+    assert list(extended) == chunks
+
+    # Chunks ajoutés puis compactés: encore une partie; une seule à la relecture (memory-map)
+    extended.append({'chunk': 'Chunk compacté', 'metadata': {}})
+    extended.compact()
+    assert len(extended.text_parts) == 3 and extended.text(40) == 'Chunk compacté'
+    extended.save(str(tmp_path))
+    loaded = ColumnarChunkStore.load(str(tmp_path))
+    assert len(loaded.text_parts) == 1 and isinstance(loaded.text_buffer, np.memmap)
+    assert list(loaded) == list(extended)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_extended_copy_is_independent_of_the_served_store(compress):
+    chunks = make_chunks(12)
+    served = ColumnarChunkStore.from_chunks(chunks)
+    if compress:
+        served.compress(block_size=4)
+    copy = served.extended(())
+    copy.set_values('domain', [0, 5], ['regulation', 'risk_management'])
+    copy.append({'chunk': 'Chunk de la copie', 'metadata': {'source': 'copie.pdf'}})
+    copy.compact()
+    copy.compress(block_size=4)
+    assert 'domain' not in served.columns and 'domain' not in served.dictionaries
+    assert 'copie.pdf' not in served.dictionaries['source']
+    assert len(served) == 12 and list(served) == chunks
+    assert (served.compressed_text is not None) == compress
+    assert copy.metadata(5)['domain'] == 'risk_management'
@@ -0,0 +1,62 @@
+# backend/tests/test_citation_index.py
+from types import SimpleNamespace
+import pytest
+from citation_index import parse_citations
+
+
+def test_article_of_a_regulation():
+    assert parse_citations("Que prévoit l'article 101 de la directive Solvabilité II ?") == [
+        ('solvency_ii', 'article', '101')
+    ]
+
+
+def test_article_suffix_is_normalized():
+    assert parse_citations("Article 275 bis du règlement délégué 2015/35") == [
+        ('solvency_ii_delegated', 'article', '275BIS')
+    ]
+
+
+def test_dotted_ifrs_paragraph():
+    assert parse_citations("Que dit IFRS 17.B72 sur la marge ?") == [('ifrs_17', 'paragraph', 'B72')]
+
+
+def test_paragraph_and_article_of_several_regulations():
+    citations = parse_citations("Article 92 du CRR et paragraphe 3 de Bâle III")
+    assert set(citations) == {
+        ('crr', 'article', '92'), ('crr', 'paragraph', '3'),
+        ('bale_iii', 'article', '92'), ('bale_iii', 'paragraph', '3')
+    }
+
+
+def test_no_regulation_means_no_citation():
+    assert parse_citations("Quel est l'article 12 du contrat ?") == []
+    assert parse_citations("Solvabilité II et la marge de risque") == []
+
+
+def test_citation_search_reads_the_index_and_resets_the_thread_stats(embedder):
+    pytest.importorskip('faiss')
+    from hybrid_search import AdvancedHybridSearch
+    topics = ["capital de solvabilité requis et risque de marché", "provisions techniques et risque de mortalité",
+              "marge de risque et coût du capital"]
+    chunks = [{'chunk': "Directive Solvabilité II, titre premier.", 'metadata': {'source': 'solvabilite_ii.txt'}}]
+    chunks += [
+        {'chunk': f"Article {100 + i}\n{topics[i % 3]}, disposition {i}.", 'metadata': {'source': 'solvabilite_ii.txt'}}
+        for i in range(9)
+    ]
+    chunks.append({'chunk': "Le calcul suit l'article 101 de la directive Solvabilité II.",
+                   'metadata': {'source': 'note.txt'}})
+    engine = AdvancedHybridSearch(SimpleNamespace(chunks=chunks, index=None), deduplicate=False, embedder=embedder)
+
+    engine.hybrid_search("risque de marché", top_k=3)
+    assert 'timings_ms' in engine.last_search_stats
+    # Recherche dégradée: textes décodés sans que le compteur du thread soit relevé
+    engine.basic_search("provisions techniques", top_k=3)
+    results = engine.citation_search("Que prévoit l'article 101 de la directive Solvabilité II ?")
+    # Définition de l'article puis chunk qui le cite
+    assert [result.chunk_id for result in results] == [2, 10]
+    assert results[0].search_type == 'citation' and results[0].chunk.startswith("Article 101")
+    # Rien des recherches précédentes: seuls les deux chunks retournés ont été lus
+    assert set(engine.last_search_stats) == {'text_decode'}
+    decode = engine.last_search_stats['text_decode']
+    assert decode['blocks_decoded'] + decode['cache_hits'] == 2
+    assert engine.citation_search("Quel est l'article 12 du contrat ?") == []
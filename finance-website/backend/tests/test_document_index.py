@@ -0,0 +1,44 @@
+# backend/tests/test_document_index.py
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+from document_index import DocumentLevelIndex
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def index():
+    # Positions d'index 0..5, trois documents entrelacés (codes 7, 3, 5)
+    embeddings = np.array([
+        unit([1, 0.1, 0]), unit([0, 1, 0.1]), unit([1, 0, 0.1]),
+        unit([0.1, 0, 1]), unit([0.1, 1, 0]), unit([0, 0.1, 1]),
+    ])
+    return DocumentLevelIndex(embeddings, [7, 3, 7, 5, 3, 5])
+
+
+def test_rows_are_grouped_by_document(index):
+    assert len(index) == 3
+    assert list(index.document_keys) == [3, 5, 7]
+    assert [list(rows) for rows in index.rows_by_document] == [[1, 4], [3, 5], [0, 2]]
+
+
+def test_candidate_rows_come_from_the_closest_documents(index):
+    rows, best_score = index.candidate_rows(unit([1, 0, 0]), top_n=1)
+    assert list(rows) == [0, 2]
+    assert best_score > 0.9
+
+    rows, _ = index.candidate_rows(unit([1, 1, 0]), top_n=2)
+    assert sorted(rows) == [0, 1, 2, 4]
+
+
+def test_summary_embedding_replaces_the_centroid(index):
+    assert index.set_document_embedding(5, [1, 0, 0])
+    rows, _ = index.candidate_rows(unit([1, 0, 0]), top_n=2)
+    assert sorted(rows) == [0, 2, 3, 5]
+    # Document inconnu: rien n'est remplacé
+    assert not index.set_document_embedding(4, [1, 0, 0])
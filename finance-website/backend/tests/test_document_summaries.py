@@ -0,0 +1,79 @@
+# backend/tests/test_document_summaries.py
+import threading
+from document_summaries import DocumentSummarizer, SummaryCache
+
+
+class FakeClient:
+    """Client Ollama de test: résumé de longueur fixe, appels comptés"""
+
+    def __init__(self, summary_chars=100, fail_on=None):
+        self.summary_chars = summary_chars
+        self.fail_on = fail_on
+        self.prompts = []
+        self._lock = threading.Lock()
+
+    def chat(self, model, messages, options):
+        prompt = messages[0]['content']
+        with self._lock:
+            self.prompts.append(prompt)
+        if self.fail_on and self.fail_on in prompt:
+            raise ConnectionError('Ollama indisponible')
+        return {'message': {'content': 'r' * self.summary_chars}}
+
+
+def texts(count, chars=1000):
+    return {chunk_id: f"chunk {chunk_id} " + 'x' * chars for chunk_id in range(count)}
+
+
+def test_short_document_needs_a_single_map_call():
+    client = FakeClient()
+    chunks = texts(3)
+    results, errors = DocumentSummarizer(client, 'm:1', group_chars=6000).summarize_many(
+        [('a.pdf', 'd1', list(chunks))], chunks.get
+    )
+    assert not errors
+    assert results['a.pdf']['levels'] == 1
+    assert results['a.pdf']['llm_calls'] == 1
+
+
+def test_long_document_is_reduced_level_by_level():
+    client = FakeClient(summary_chars=100)
+    chunks = texts(24)
+    results, _ = DocumentSummarizer(client, 'm:1', group_chars=6000).summarize_many(
+        [('a.pdf', 'd1', list(chunks))], chunks.get
+    )
+    # 24 chunks de ~1 000 caractères -> 5 extraits (map), puis un seul résumé (reduce)
+    assert results['a.pdf']['levels'] == 2
+    assert results['a.pdf']['llm_calls'] == 6
+
+
+def test_summaries_too_long_to_group_are_reduced_in_pairs():
+    client = FakeClient(summary_chars=7000)
+    chunks = texts(24)
+    results, _ = DocumentSummarizer(client, 'm:1', group_chars=6000).summarize_many(
+        [('a.pdf', 'd1', list(chunks))], chunks.get
+    )
+    # 5 résumés -> 3 -> 2 -> 1: chaque niveau progresse malgré des résumés plus longs que group_chars
+    assert results['a.pdf']['levels'] == 4
+    assert results['a.pdf']['llm_calls'] == 5 + 3 + 2 + 1
+
+
+def test_cached_documents_are_not_summarized_again(tmp_path):
+    cache = SummaryCache(str(tmp_path))
+    chunks = texts(3)
+    documents = [('a.pdf', 'd1', list(chunks))]
+    DocumentSummarizer(FakeClient(), 'm:1', cache).summarize_many(documents, chunks.get)
+    client = FakeClient()
+    summarizer = DocumentSummarizer(client, 'm:1', cache)
+    results, _ = summarizer.summarize_many(documents, chunks.get)
+    assert 'a.pdf' in results and not client.prompts
+    assert summarizer.stats['cache_hits'] == 1
+
+
+def test_failed_document_is_reported_without_stopping_the_others():
+    chunks = texts(2)
+    results, errors = DocumentSummarizer(FakeClient(fail_on='« b.pdf »'), 'm:1').summarize_many(
+        [('a.pdf', 'd1', [0]), ('b.pdf', 'd2', [1])], chunks.get
+    )
+    assert list(results) == ['a.pdf']
+    assert 'b.pdf' in errors
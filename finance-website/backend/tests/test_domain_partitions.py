@@ -0,0 +1,52 @@
+# backend/tests/test_domain_partitions.py
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+from domain_partitions import DomainPartitions, normalize_domain_label
+from vector_store import VectorStore
+
+LABELS = ['regulation', 'risk', None, 'finance', 'ifrs']
+
+
+@pytest.fixture
+def vector_store():
+    return VectorStore.build(np.eye(4, dtype=np.float32)[[0, 1, 2, 0, 3]], np.arange(5), dimension=4)
+
+
+@pytest.fixture
+def partitions(vector_store):
+    labels = [normalize_domain_label(label) for label in LABELS]
+    return DomainPartitions(vector_store.partitioned(np.arange(5), labels), LABELS, confidence_threshold=0.6)
+
+
+def test_labels_of_both_detectors_map_to_the_same_partitions(partitions):
+    assert normalize_domain_label('risk') == 'risk_management'
+    assert normalize_domain_label('Finance/Regulation') == 'regulation'
+    assert partitions.report()['partitions'] == {'general': 1, 'ifrs': 1, 'regulation': 2, 'risk_management': 1}
+    assert partitions.report()['segmented_partitions'] == ['general', 'ifrs', 'regulation', 'risk_management']
+
+
+def test_confident_queries_are_routed_to_their_domain_and_general(partitions):
+    assert partitions.route('finance', 0.9) == ['regulation', 'general']
+    assert list(partitions.rows_for(['regulation', 'general'])) == [0, 2, 3]
+    # Confiance insuffisante ou domaine sans partition: tout le corpus
+    assert partitions.route('regulation', 0.5) is None
+    assert partitions.route('actuarial', 0.9) is None
+
+
+def test_search_returns_index_positions_across_partitions(partitions):
+    query = np.array([[1, 0, 0.5, 0]], dtype=np.float32)
+    scores, rows = partitions.search(query, ['regulation', 'general'], top_k=3)
+    assert list(rows[0]) in ([0, 3, 2], [3, 0, 2])
+    assert np.allclose(scores[0], [1, 1, 0.5])
+    scores, rows = partitions.search(query, ['ifrs'], top_k=3)
+    assert list(rows[0]) == [4]
+
+
+def test_rows_outside_their_segments_are_searched_with_a_row_filter(vector_store):
+    # Store non partitionné (lignes ajoutées depuis): repli sur un filtre de lignes
+    partitions = DomainPartitions(vector_store, LABELS)
+    assert partitions.segmented == set()
+    scores, rows = partitions.search(np.array([[1, 0, 0.5, 0]], dtype=np.float32), ['regulation', 'general'], top_k=3)
+    assert sorted(rows[0][:2]) == [0, 3] and rows[0][2] == 2
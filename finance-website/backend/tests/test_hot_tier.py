@@ -0,0 +1,56 @@
+# backend/tests/test_hot_tier.py
+import threading
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('faiss')
+import hybrid_search
+from hybrid_search import AdvancedHybridSearch
+from hot_tier import AccessTracker
+
+TOPICS = [
+    "capital de solvabilité requis et risque de marché",
+    "provisions techniques et risque de mortalité",
+    "marge de service contractuelle sous IFRS 17",
+]
+
+
+def test_most_accessed_decays_counts_and_resets_the_refresh_counter():
+    tracker = AccessTracker()
+    tracker.record([1, 2])
+    tracker.record([1])
+    assert tracker.queries_since_refresh == 2
+    assert tracker.most_accessed(1) == [1]
+    assert tracker.queries_since_refresh == 0
+
+
+def test_hot_tier_is_rebuilt_off_the_request_thread(monkeypatch, embedder):
+    knowledge_base = SimpleNamespace(chunks=[
+        {'chunk': f"Chunk {i}: {TOPICS[i % 3]}", 'metadata': {'source': f"doc{i}.pdf"}}
+        for i in range(12)
+    ], index=None)
+    engine = AdvancedHybridSearch(knowledge_base, deduplicate=False, hierarchical=False, partition_by_domain=False,
+                                  hot_tier_size=4, hot_refresh_every=2, embedder=embedder)
+    built, release = threading.Event(), threading.Event()
+    builders = []
+    build_hot_tier = hybrid_search.HotTier
+
+    def slow_hot_tier(*args):
+        builders.append(threading.current_thread().name)
+        release.wait(5)
+        hot_tier = build_hot_tier(*args)
+        built.set()
+        return hot_tier
+
+    monkeypatch.setattr(hybrid_search, 'HotTier', slow_hot_tier)
+    engine.hybrid_search("risque de marché", top_k=2)
+    engine.hybrid_search("marge de service contractuelle", top_k=2)
+    # La requête qui déclenche la reconstruction retourne avant la fin de celle-ci
+    assert engine.hot_tier is None
+    assert not engine.schedule_hot_tier_refresh()
+    release.set()
+    assert built.wait(5)
+    engine._hot_refresh_lock.acquire(timeout=5)
+    engine._hot_refresh_lock.release()
+    assert builders == ['hot-tier-refresh']
+    assert engine.hot_tier is not None and 0 < len(engine.hot_tier) <= 4
@@ -0,0 +1,133 @@
+# backend/tests/test_incremental_update.py
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+from hybrid_search import AdvancedHybridSearch
+from ingestion_pipeline import IngestionPipeline
+from knowledge_base import FinanceActuarialKnowledgeBase
+
+TOPICS = [
+    "Le SCR de marché agrège les chocs sur les actions, les taux et les spreads de crédit",
+    "La marge de risque est calculée par la méthode du coût du capital sur les SCR futurs",
+    "Les provisions techniques sont la somme de la meilleure estimation et de la marge de risque",
+    "Le rapport ORSA évalue la solvabilité prospective sur l'horizon du plan stratégique",
+    "La VaR historique à 99 % est estimée sur deux cent cinquante scénarios quotidiens",
+    "Les tables de mortalité d'expérience ajustent la mortalité réglementaire du portefeuille",
+]
+QUERIES = ["SCR de marché et chocs actions", "marge de risque coût du capital", "table de mortalité d'expérience",
+           "VaR historique scénarios", "solvabilité prospective ORSA"]
+
+
+def document_text(number, topic=None):
+    paragraphs = ["Directive Solvabilité II, extraits commentés."]
+    for offset in range(3):
+        article = 10 * number + offset + 1
+        paragraphs.append(f"Article {article}\n{topic or TOPICS[(number + offset) % len(TOPICS)]} "
+                          f"(document {number}, disposition {article}).")
+    return "\n\n".join(paragraphs)
+
+
+def write_documents(folder, numbers):
+    paths = []
+    for number in numbers:
+        path = folder / f"note_{number:02d}.txt"
+        path.write_text(document_text(number), encoding='utf-8')
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def pipeline(embedder):
+    return IngestionPipeline(embedder, chunk_size=200, chunk_overlap=0, parse_workers=0,
+                             token_chunking=False, extract_tables=False)
+
+
+@pytest.fixture
+def ingested(tmp_path, embedder, pipeline):
+    """Base de 24 documents ingérés et son moteur (index documentaire actif)"""
+    paths = write_documents(tmp_path, range(24))
+    knowledge_base, _ = pipeline.ingest(FinanceActuarialKnowledgeBase(str(tmp_path / 'vide')), paths)
+    engine = AdvancedHybridSearch(knowledge_base, embedder=embedder)
+    return tmp_path, knowledge_base, engine
+
+
+def chunk_ids_of(knowledge_base, source):
+    return set(knowledge_base.manifest.documents[source]['chunk_ids'].tolist())
+
+
+def live_partitions(engine):
+    dead = engine.vector_store.removed
+    return {
+        label: set(engine.indexed_ids[[row for row in rows if dead is None or not dead[row]]].tolist())
+        for label, rows in engine.domain_partitions.rows.items()
+    }
+
+
+def ranking(results):
+    """Scores dans l'ordre, et chunks classés au-dessus du dernier score (chunks à égalité au rang k:
+    l'ordre entre eux dépend de leur position dans les index)"""
+    scores = [round(result.rerank_score, 5) for result in results]
+    return scores, {result.chunk_id for result, score in zip(results, scores) if score > scores[-1]}
+
+
+def document_vectors(engine):
+    index = engine.document_level_index
+    return {int(key): vector for key, vector in zip(index.document_keys, index.document_vectors)}
+
+
+def test_ingest_amend_and_delete_match_a_full_rebuild(ingested, embedder, pipeline):
+    folder, knowledge_base, engine = ingested
+    deleted = chunk_ids_of(knowledge_base, 'note_05.txt')
+    # Document modifié, document ajouté, document supprimé
+    (folder / 'note_03.txt').write_text(document_text(3, TOPICS[4]), encoding='utf-8')
+    paths = [str(folder / 'note_03.txt')] + write_documents(folder, [24])
+    updated_base, report = pipeline.ingest(knowledge_base, paths, removed=['note_05.txt'])
+    assert report['removed_chunks'] == len(deleted)
+    # Chunks du document supprimé et passages remplacés du document modifié
+    tombstones = set(updated_base.manifest.tombstones.tolist())
+    assert deleted < tombstones
+
+    incremental = AdvancedHybridSearch(updated_base, embedder=embedder, previous=engine)
+    assert 'incremental_s' in incremental.build_timings
+    assert incremental.vector_store.removed is not None
+    rebuilt = AdvancedHybridSearch(updated_base, embedder=embedder)
+    assert 'incremental_s' not in rebuilt.build_timings
+
+    # Même recherche sémantique (le TF-IDF incrémental garde le vocabulaire de la construction complète)
+    for query in QUERIES:
+        expected = rebuilt.hybrid_search(query, top_k=5, semantic_weight=1.0, lexical_weight=0.0)
+        results = incremental.hybrid_search(query, top_k=5, semantic_weight=1.0, lexical_weight=0.0)
+        assert ranking(results) == ranking(expected)
+        for search in (incremental.hybrid_search, incremental.basic_search):
+            assert not tombstones & {result.chunk_id for result in search(query, top_k=10)}
+
+    # Index documentaire, partitions et citations identiques à la reconstruction
+    vectors, expected_vectors = document_vectors(incremental), document_vectors(rebuilt)
+    assert vectors.keys() == expected_vectors.keys()
+    assert all(np.allclose(vectors[key], expected_vectors[key], atol=1e-5) for key in vectors)
+    assert incremental.document_index is not None
+    assert live_partitions(incremental) == live_partitions(rebuilt)
+    for article in (31, 52, 241):
+        query = f"article {article} de la directive Solvabilité II"
+        assert incremental.citation_index.lookup(query) == rebuilt.citation_index.lookup(query)
+    assert incremental.citation_search("article 52 de la directive Solvabilité II") == []
+    assert incremental.citation_search("article 241 de la directive Solvabilité II")
+
+
+def test_too_many_deletions_fall_back_to_a_full_rebuild(ingested, embedder, pipeline):
+    _, knowledge_base, engine = ingested
+    removed = [f"note_{number:02d}.txt" for number in range(6)]
+    updated_base, _ = pipeline.ingest(knowledge_base, [], removed=removed)
+    rebuilt = AdvancedHybridSearch(updated_base, embedder=embedder, previous=engine)
+    assert 'incremental_s' not in rebuilt.build_timings
+    deleted = set().union(*(chunk_ids_of(knowledge_base, source) for source in removed))
+    assert not deleted & set(rebuilt.indexed_ids.tolist())
+
+
+def test_too_many_unfitted_rows_fall_back_to_a_full_rebuild(ingested, embedder, pipeline):
+    folder, knowledge_base, engine = ingested
+    updated_base, _ = pipeline.ingest(knowledge_base, write_documents(folder, range(24, 32)))
+    rebuilt = AdvancedHybridSearch(updated_base, embedder=embedder, previous=engine)
+    assert 'incremental_s' not in rebuilt.build_timings
+    assert rebuilt.tfidf_fitted_rows == len(rebuilt.indexed_ids)
@@ -0,0 +1,75 @@
+# backend/tests/test_ingestion_manifest.py
+import numpy as np
+from ingestion_manifest import IngestionManifest
+
+
+def ingest(manifest, source, digest, texts, next_id):
+    """Réingestion d'un document: (identifiants attribués, prochain identifiant libre, chunks retirés)"""
+    update = manifest.begin(source, digest)
+    chunk_ids = []
+    for text in texts:
+        chunk_id, kept = update.assign(text, next_id)
+        if not kept:
+            next_id += 1
+        chunk_ids.append(chunk_id)
+    removed = manifest.commit(update)
+    return chunk_ids, next_id, removed
+
+
+def test_commit_keeps_unchanged_chunks_and_tombstones_removed_ones():
+    manifest = IngestionManifest()
+    chunk_ids, next_id, removed = ingest(manifest, 'a.txt', 'h1', ['un', 'deux', 'trois'], 0)
+    assert chunk_ids == [0, 1, 2] and removed == 0
+    assert manifest.is_unchanged('a.txt', 'h1') and not manifest.is_unchanged('a.txt', 'h2')
+
+    # Version amendée: 'deux' modifié, 'quatre' ajouté; 'un' et 'trois' gardent leur identifiant
+    chunk_ids, next_id, removed = ingest(manifest, 'a.txt', 'h2', ['un', 'deux bis', 'trois', 'quatre'], next_id)
+    assert chunk_ids == [0, 3, 2, 4]
+    assert removed == 1
+    assert manifest.tombstones.tolist() == [1]
+    assert manifest.live_ids(next_id).tolist() == [0, 2, 3, 4]
+    # Ordre de lecture: le chunk modifié reprend sa place dans le document
+    assert list(manifest.reading_order(next_id)) == [0, 3, 2, 4]
+
+
+def test_copy_leaves_the_served_manifest_unchanged():
+    manifest = IngestionManifest()
+    _, next_id, _ = ingest(manifest, 'a.txt', 'h1', ['un', 'deux'], 0)
+    working = manifest.copy()
+    ingest(working, 'a.txt', 'h2', ['un'], next_id)
+    assert manifest.documents['a.txt']['hash'] == 'h1'
+    assert len(manifest.tombstones) == 0
+    assert working.tombstones.tolist() == [1]
+
+
+def test_remove_tombstones_every_chunk_of_the_document():
+    manifest = IngestionManifest()
+    _, next_id, _ = ingest(manifest, 'a.txt', 'h1', ['un', 'deux'], 0)
+    _, next_id, _ = ingest(manifest, 'b.txt', 'h1', ['trois'], next_id)
+    assert manifest.remove('a.txt') == 2
+    assert manifest.remove('absent.txt') == 0
+    assert 'a.txt' not in manifest.documents
+    assert manifest.live_ids(next_id).tolist() == [2]
+    assert manifest.report() == {'documents': 1, 'tracked_chunks': 1, 'tombstones': 2}
+
+
+def test_discard_tombstones_the_chunks_of_an_abandoned_update():
+    manifest = IngestionManifest()
+    _, next_id, _ = ingest(manifest, 'a.txt', 'h1', ['un'], 0)
+    update = manifest.begin('a.txt', 'h2')
+    update.assign('un', next_id)
+    update.assign('nouveau', next_id)
+    manifest.discard(update)
+    assert manifest.documents['a.txt']['hash'] == 'h1'
+    assert manifest.tombstones.tolist() == [next_id]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    manifest = IngestionManifest()
+    _, next_id, _ = ingest(manifest, 'a.txt', 'h1', ['un', 'deux'], 0)
+    ingest(manifest, 'a.txt', 'h2', ['un'], next_id)
+    manifest.save(str(tmp_path))
+    loaded = IngestionManifest.load(str(tmp_path))
+    assert loaded.tombstones.tolist() == [1]
+    assert loaded.documents['a.txt']['chunk_ids'].tolist() == [0]
+    assert np.array_equal(loaded.documents['a.txt']['chunk_hashes'], manifest.documents['a.txt']['chunk_hashes'])
@@ -0,0 +1,124 @@
+# backend/tests/test_ingestion_pipeline.py
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+from chunk_store import ChunkStoreWriter, ColumnarChunkStore
+from ingestion_pipeline import (CLEANUP_PATTERNS, IngestionPipeline, SectionSplitter, chunk_windows, clean_page,
+                                iter_text_blocks, section_chunks)
+
+
+def test_chunks_overlap_and_end_on_sentence_or_word_boundaries():
+    text = ' '.join(f"Phrase numéro {i} sur le capital requis." for i in range(60))
+    chunks = [chunk for _, chunk in chunk_windows(text, chunk_size=200, overlap=50)]
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.endswith('.') for chunk in chunks)
+    assert all(chunk.split(' ')[0] in text.split(' ') for chunk in chunks)
+    # Chevauchement: le début de chaque chunk reprend la fin du précédent
+    assert all(chunks[i + 1][:10] in chunks[i] for i in range(len(chunks) - 1))
+
+
+def test_text_files_are_read_in_bounded_blocks_cut_on_lines(tmp_path):
+    paragraphs = [f"Paragraphe {i}: " + 'mot ' * 40 for i in range(200)]
+    path = tmp_path / 'long.txt'
+    path.write_text('\n\n'.join(paragraphs))
+    blocks = list(iter_text_blocks(str(path), block_chars=2000))
+    assert len(blocks) > 10
+    assert all(page == 1 and len(text) <= 4000 for page, text in blocks)
+    # Blocs joints par '\n': le fichier exact
+    assert '\n'.join(text for _, text in blocks) == path.read_text()
+
+
+def test_page_numbers_and_control_characters_are_cleaned():
+    assert clean_page("Titre\x0c\n  Page 3 / 10 \nSuite   du texte") == "Titre\n\nSuite   du texte"
+
+
+def split_pages(pages, section_chars=400):
+    splitter = SectionSplitter(section_chars)
+    sections = []
+    for page_number, text in pages:
+        sections.extend(splitter.feed(page_number, text))
+    return sections + splitter.finish()
+
+
+def article_lines(count, edited=None):
+    return [f"Article {i}. " + ('Texte modifié. ' if i == edited else '') + 'Le capital requis est couvert. ' * 2
+            for i in range(count)]
+
+
+def test_sections_are_content_defined_and_stable_around_an_edit():
+    lines = article_lines(120)
+    original = split_pages([(1, '\n'.join(lines[:60])), (2, '\n'.join(lines[60:]))])
+    assert len(original) > 5
+    assert all(len(text) <= 400 for _, _, text in original)
+    # Même texte, pagination différente et une modification en tête: seuls les chunks voisins changent
+    edited_lines = article_lines(120, edited=2)
+    edited = split_pages([(1, '\n'.join(edited_lines[:30])), (2, '\n'.join(edited_lines[30:]))])
+
+    def chunks(sections):
+        return [chunk for section in sections for chunk, _ in section_chunks(section, chunk_size=200, overlap=0)]
+    assert chunks(original)[len(chunks(original[:2])):] == chunks(edited)[len(chunks(edited[:2])):]
+
+
+def test_section_chunks_report_the_page_where_they_start():
+    sections = split_pages([(3, "Début du chapitre sur le SCR."), (4, "Suite en page quatre."),
+                            (5, "Conclusion du chapitre.")],
+                           section_chars=4000)
+    assert len(sections) == 1
+    chunks = list(section_chunks(sections[0], chunk_size=30, overlap=0))
+    assert [page for _, page in chunks] == [3, 4, 5]
+    assert ' '.join(chunk for chunk, _ in chunks) == "Début du chapitre sur le SCR. Suite en page quatre. Conclusion du chapitre."
+
+
+def test_pipeline_runs_every_stage_and_keeps_document_order(tmp_path, embedder):
+    paths = []
+    for name in ('b.txt', 'a.md'):
+        path = tmp_path / name
+        path.write_text('\n\n'.join(f"{name} paragraphe {i}: provisions techniques." for i in range(30)))
+        paths.append(str(path))
+    paths.append(str(tmp_path / 'image.png'))
+
+    pipeline = IngestionPipeline(embedder, chunk_size=300, chunk_overlap=50, parse_workers=0, embed_batch_size=4)
+    batches = []
+    result = pipeline.run(paths, on_batch=lambda chunks, embeddings: batches.append((chunks, embeddings)))
+    chunks = [chunk for batch, _ in batches for chunk in batch]
+    assert [chunk['metadata']['source'] for chunk in chunks] == sorted(
+        (chunk['metadata']['source'] for chunk in chunks), key=['b.txt', 'a.md'].index
+    )
+    assert all(len(batch) <= 4 and embeddings.shape == (len(batch), 384) for batch, embeddings in batches)
+
+    report = result['report']
+    assert report['documents'] == 3
+    assert report['chunks'] == len(chunks)
+    assert [error['source'] for error in report['errors']] == ['image.png']
+    assert set(report['stages']) == {'parse', 'chunk', 'embed', 'index'}
+
+
+def test_chunk_store_writer_encodes_batches_after_an_untouched_base():
+    base = ColumnarChunkStore.from_chunks([{'chunk': "Base", 'metadata': {'source': 'base.txt'}}])
+    base.append({'chunk': "Queue non compactée", 'metadata': {'source': 'queue.txt'}})
+    writer = ChunkStoreWriter(base)
+    assert list(writer.add([{'chunk': "Lot 1", 'metadata': {'source': 'lot.txt', 'page': 2}},
+                            {'chunk': "Lot 2", 'metadata': {}}])) == [2, 3]
+    store = writer.finish()
+    assert [store.text(chunk_id) for chunk_id in range(len(store))] == ["Base", "Queue non compactée", "Lot 1", "Lot 2"]
+    assert store.metadata(2) == {'source': 'lot.txt', 'page': 2}
+    assert store.metadata(3) == {}
+    assert len(base) == 2 and base._tail
+
+
+def test_ingest_extends_a_copy_of_the_knowledge_base(tmp_path, embedder):
+    path = tmp_path / 'ifrs17.txt'
+    path.write_text("La marge de service contractuelle représente le profit non acquis.")
+    knowledge_base = SimpleNamespace(chunks=ColumnarChunkStore.from_chunks([
+        {'chunk': "Le SCR est calibré à 99,5 %.", 'metadata': {'source': 'scr.txt'}}
+    ]), index=None)
+
+    extended, report = IngestionPipeline(embedder, parse_workers=0).ingest(knowledge_base, [str(path)])
+    assert len(knowledge_base.chunks) == 1
+    assert len(extended.chunks) == 2
+    assert extended.chunks.metadata(1) == {'source': 'ifrs17.txt', 'page': 1}
+    assert list(extended.vector_store.chunk_ids) == [1]
+    assert np.allclose(extended.vector_store.embeddings[0], embedder.get_embedding(extended.chunks.text(1)))
+    assert report['chunks'] == 1
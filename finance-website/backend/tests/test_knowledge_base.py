@@ -0,0 +1,28 @@
+# backend/tests/test_knowledge_base.py
+from chunk_store import attach_chunk_store
+from knowledge_base import FinanceActuarialKnowledgeBase, paragraph_chunks
+
+
+def test_paragraphs_are_grouped_without_exceeding_the_chunk_size():
+    text = '\n\n'.join(['Article 1', 'a ' * 200, 'b ' * 200, 'c ' * 700])
+    chunks = paragraph_chunks(text, chunk_size=1000)
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert chunks[0].startswith('Article 1\n\na a')
+    assert ''.join(chunks).replace('\n', '').replace(' ', '') == text.replace('\n', '').replace(' ', '')
+
+
+def test_reference_documents_are_loaded_and_searchable(tmp_path):
+    (tmp_path / 'lois').mkdir()
+    (tmp_path / 'lois' / 'solvabilite.md').write_text("Article 101\n\nLe SCR est calibré à 99,5 %.")
+    (tmp_path / 'ifrs17.txt').write_text("La marge de service contractuelle (CSM).")
+    (tmp_path / 'image.png').write_bytes(b'\x89PNG')
+    knowledge_base = FinanceActuarialKnowledgeBase(str(tmp_path))
+    assert [chunk['metadata']['source'] for chunk in knowledge_base.chunks] == ['ifrs17.txt', 'lois/solvabilite.md']
+    # Recherche basique aussi sur le store colonnaire qui remplace la liste de chunks
+    attach_chunk_store(knowledge_base)
+    results = knowledge_base.search_similar_chunks('SCR calibré', top_k=3)
+    assert [result['metadata']['source'] for result in results] == ['lois/solvabilite.md']
+
+
+def test_missing_folder_gives_an_empty_base(tmp_path):
+    assert FinanceActuarialKnowledgeBase(str(tmp_path / 'absent')).chunks == []
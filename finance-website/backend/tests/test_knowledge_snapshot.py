@@ -0,0 +1,81 @@
+# backend/tests/test_knowledge_snapshot.py
+import io
+import json
+import os
+import tarfile
+import pytest
+
+pytest.importorskip('faiss')
+from knowledge_snapshot import (SNAPSHOT_FILE, SNAPSHOT_FORMAT, SnapshotError, pack_snapshot, snapshot_files,
+                                unpack_snapshot, verify_snapshot)
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    """Snapshot minimal: fichiers de données et description avec leurs empreintes"""
+    directory = tmp_path / 'kb'
+    (directory / 'chunks').mkdir(parents=True)
+    (directory / 'chunks' / 'text.bin').write_bytes(b'chunk de test' * 100)
+    (directory / 'manifest.json').write_text('{"documents": {}, "tombstones": []}')
+    description = {'format': SNAPSHOT_FORMAT, 'files': snapshot_files(str(directory))}
+    (directory / SNAPSHOT_FILE).write_text(json.dumps(description))
+    return directory
+
+
+def test_verify_accepts_an_intact_snapshot(snapshot):
+    assert set(verify_snapshot(str(snapshot))['files']) == {'chunks/text.bin', 'manifest.json'}
+
+
+def test_verify_detects_a_modified_file(snapshot):
+    data = bytearray((snapshot / 'chunks' / 'text.bin').read_bytes())
+    data[0] ^= 1
+    (snapshot / 'chunks' / 'text.bin').write_bytes(bytes(data))
+    with pytest.raises(SnapshotError, match='SHA-256'):
+        verify_snapshot(str(snapshot))
+    # Sans empreintes, seule la taille est contrôlée
+    verify_snapshot(str(snapshot), checksums=False)
+
+
+def test_verify_detects_a_truncated_file(snapshot):
+    (snapshot / 'chunks' / 'text.bin').write_bytes(b'tronque')
+    with pytest.raises(SnapshotError, match='Taille'):
+        verify_snapshot(str(snapshot), checksums=False)
+
+
+def test_verify_detects_a_missing_file(snapshot):
+    os.remove(snapshot / 'manifest.json')
+    with pytest.raises(SnapshotError, match='manquant'):
+        verify_snapshot(str(snapshot))
+
+
+def test_pack_and_unpack_round_trip(snapshot, tmp_path):
+    archive = str(tmp_path / 'kb.tar')
+    pack_snapshot(str(snapshot), archive)
+    target = tmp_path / 'replica'
+    unpack_snapshot(archive, str(target))
+    assert (target / 'chunks' / 'text.bin').read_bytes() == (snapshot / 'chunks' / 'text.bin').read_bytes()
+    with pytest.raises(SnapshotError, match='existe déjà'):
+        unpack_snapshot(archive, str(target))
+
+
+def test_unpack_rejects_an_altered_archive_and_leaves_nothing(snapshot, tmp_path):
+    (snapshot / 'manifest.json').write_text('{"documents": {"x": 1}, "tombstones": []}')
+    archive = str(tmp_path / 'kb.tar')
+    with tarfile.open(archive, 'w') as tar:
+        tar.add(str(snapshot), arcname='.')
+    target = tmp_path / 'replica'
+    with pytest.raises(SnapshotError):
+        unpack_snapshot(archive, str(target))
+    assert not target.exists() and not (tmp_path / 'replica.partial').exists()
+
+
+def test_unpack_refuses_entries_outside_the_snapshot(tmp_path):
+    archive = str(tmp_path / 'evil.tar')
+    with tarfile.open(archive, 'w') as tar:
+        data = b'pwned'
+        member = tarfile.TarInfo('../outside.txt')
+        member.size = len(data)
+        tar.addfile(member, io.BytesIO(data))
+    with pytest.raises((SnapshotError, tarfile.TarError)):
+        unpack_snapshot(archive, str(tmp_path / 'replica'))
+    assert not (tmp_path / 'outside.txt').exists()
@@ -0,0 +1,35 @@
+# backend/tests/test_near_duplicates.py
+from near_duplicates import MinHashDeduplicator
+
+BOILERPLATE = ("Le présent document est fourni à titre informatif. Il ne constitue pas un conseil en "
+               "investissement et ne saurait engager la responsabilité de la société de gestion. ")
+
+
+def test_near_identical_chunks_collapse_onto_the_first_occurrence():
+    texts = [
+        BOILERPLATE + "Édition 2022.",
+        "Le SCR est calibré sur une VaR à 99,5 % à horizon un an.",
+        BOILERPLATE + "Édition 2023.",
+        "La marge de service contractuelle est reconnue sur la période de couverture.",
+        BOILERPLATE + "Édition 2022.",
+    ]
+    representatives, groups = MinHashDeduplicator().find_groups(texts)
+    assert list(representatives) == [0, 1, 3]
+    assert groups == {0: [0, 2, 4]}
+
+
+def test_deduplication_report_counts_the_collapsed_vectors():
+    texts = [BOILERPLATE + "Version A."] * 3 + ["Provision pour sinistres à payer."]
+    representatives, groups, report = MinHashDeduplicator().deduplicate(iter(texts), embedding_dim=8)
+    assert list(representatives) == [0, 3]
+    assert report['chunks'] == 4
+    assert report['indexed_chunks'] == 2
+    assert report['duplicates_collapsed'] == 2
+    assert report['index_bytes_saved'] == 2 * 8 * 4
+
+
+def test_distinct_short_texts_are_kept():
+    representatives, groups = MinHashDeduplicator().find_groups(['SCR', 'MCR', 'ORSA'])
+    assert list(representatives) == [0, 1, 2]
+    assert groups == {}
+    assert MinHashDeduplicator().find_groups([])[0].size == 0
@@ -0,0 +1,56 @@
+# backend/tests/test_query_context.py
+from types import SimpleNamespace
+import pytest
+from advanced_prompts import AdvancedPromptEngine
+from query_context import QueryContext, embedding_key
+
+TOPICS = [
+    "VaR et stress testing du portefeuille de marché",
+    "provisions techniques et risque de mortalité",
+    "marge de service contractuelle sous IFRS 17",
+]
+
+
+class CountingPromptEngine(AdvancedPromptEngine):
+    """Moteur de prompts de test: compte les calculs de scores de domaine"""
+
+    def __init__(self):
+        super().__init__()
+        self.scored = []
+
+    def _topic_scores(self, text_lower, weight):
+        self.scored.append(text_lower)
+        return super()._topic_scores(text_lower, weight)
+
+
+def test_query_is_normalized_once_and_values_are_cached():
+    query = QueryContext("  Quel  SCR pour le risque de MARCHÉ ? ")
+    assert query.normalized == "quel scr pour le risque de marché ?"
+    assert QueryContext.of(query) is query
+    calls = []
+    assert query.cached('clé', lambda: calls.append(1) or 42) == 42
+    assert query.cached('clé', lambda: calls.append(1) or 0) == 42
+    assert calls == [1]
+
+
+def test_embedding_key_depends_on_the_embedder():
+    assert embedding_key(object()) != embedding_key(object())
+
+
+def test_search_and_prompt_share_the_domain_scores_of_a_query(embedder):
+    pytest.importorskip('faiss')
+    from hybrid_search import AdvancedHybridSearch
+    prompt_engine = CountingPromptEngine()
+    knowledge_base = SimpleNamespace(chunks=[
+        {'chunk': f"Chunk {i}: {TOPICS[i % 3]}", 'metadata': {'source': f"doc{i}.pdf"}}
+        for i in range(12)
+    ], index=None)
+    engine = AdvancedHybridSearch(knowledge_base, deduplicate=False, embedder=embedder, prompt_engine=prompt_engine)
+    assert engine.prompt_engine is prompt_engine
+
+    query = QueryContext("Quelle VaR en stress testing ?")
+    prompt_engine.scored.clear()
+    engine.hybrid_search(query, top_k=2)
+    # Domaine de la requête repris pour le prompt: seul le contexte est évalué
+    assert prompt_engine.detect_domain(query, "Contexte documentaire") == 'risk_management'
+    assert prompt_engine.scored.count(query.normalized) == 1
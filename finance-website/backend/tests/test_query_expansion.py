@@ -0,0 +1,50 @@
+# backend/tests/test_query_expansion.py
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip('faiss')
+from hybrid_search import AdvancedHybridSearch
+from query_expansion import QueryExpander
+
+DOMAIN_EXPERTS = {
+    'risk_management': {'key_topics': ['VaR', 'stress testing', 'market risk', 'credit risk']},
+}
+
+
+def test_variants_expand_acronyms_translate_and_add_topics():
+    expander = QueryExpander({'insurance': ['solvency', 'best_estimate']}, DOMAIN_EXPERTS)
+    variants = expander.expand("SCR risque de marché")
+    assert variants[0] == "SCR risque de marché"
+    assert variants[1] == "solvency capital requirement capital de solvabilité requis risque de marché"
+    assert variants[2] == "solvency capital requirement capital de solvency requis risk de market"
+    assert variants[3] == "SCR risque de marché best estimate"
+    assert expander.expand("SCR risque de marché", max_variants=2) == variants[:2]
+
+
+def test_identical_variants_are_dropped():
+    expander = QueryExpander({}, DOMAIN_EXPERTS)
+    assert expander.expand("provision technique") == ["provision technique"]
+
+
+def test_reciprocal_rank_fusion_over_all_variants(embedder):
+    texts = [
+        "The solvency capital requirement covers market risk at a 99.5% confidence level.",
+        "Le capital de solvabilité requis est recalculé chaque année.",
+        "The minimum capital requirement is a floor for the solvency capital requirement.",
+        "Les provisions techniques comprennent la meilleure estimation.",
+        "Market risk includes interest rate risk and equity risk.",
+        "Le taux de mortalité dépend de la table retenue.",
+    ]
+    knowledge_base = SimpleNamespace(chunks=[{'chunk': text, 'metadata': {'source': f"doc{i}.pdf"}}
+                                             for i, text in enumerate(texts)], index=None)
+    engine = AdvancedHybridSearch(knowledge_base, deduplicate=False, embedder=embedder)
+
+    hits = engine.multi_query_search("SCR", top_k=3)
+    variants = engine.query_expander.expand("SCR")
+    assert len(variants) > 1
+    # Les chunks qui citent le SCR, développé ou traduit, passent devant les autres
+    assert {hit.chunk_id for hit in hits} == {0, 1, 2}
+    scores = [hit.score for hit in hits]
+    assert scores == sorted(scores, reverse=True)
+    # Une liste sémantique et une liste lexicale par variante, au plus 1 / (rrf_k + 1) chacune
+    assert scores[0] <= 2 * len(variants) / 61
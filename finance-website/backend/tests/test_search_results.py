@@ -0,0 +1,29 @@
+# backend/tests/test_search_results.py
+import pytest
+from search_results import SearchHit, SearchResult
+
+
+def test_single_stage_hit_keeps_its_similarity_score():
+    hit = SearchHit(4, 0.82, 'semantic', semantic_score=0.82)
+    result = SearchResult(hit, "Article 101", {'source': 'directive.pdf'})
+    assert result['chunk'] == "Article 101"
+    assert result['similarity_score'] == 0.82
+    assert 'combined_score' not in result
+    assert result.get('combined_score', 0) == 0
+    with pytest.raises(KeyError):
+        result['combined_score']
+    with pytest.raises(KeyError):
+        result['inconnu']
+
+
+def test_fused_hit_exposes_the_combined_score_and_rerank_scores():
+    hit = SearchHit(7, 0.031, 'multi_query')
+    hit.rerank_score = 0.6
+    hit.relevance_score = 2.5
+    result = SearchResult(hit, "Texte", {}, truncated=True, source_locations=[{'source': 'a.pdf', 'chunk_id': 9}])
+    assert result.get('similarity_score') is None
+    assert result.to_dict() == {
+        'chunk_id': 7, 'chunk': "Texte", 'metadata': {}, 'combined_score': 0.031, 'rerank_score': 0.6,
+        'relevance_score': 2.5, 'search_type': 'multi_query',
+        'source_locations': [{'source': 'a.pdf', 'chunk_id': 9}], 'truncated': True
+    }
@@ -0,0 +1,65 @@
+# backend/tests/test_table_store.py
+import pytest
+from table_store import TableExtractor, TableStore
+
+MORTALITY_PAGE = """Arrêté du 20 décembre 2005.
+Table TH00-02
+Âge lx qx
+0 100 000 0,000400
+1 99 500 0,000436
+64 72 556 0,099393
+65 72 193 0,108338
+66 71 832 0,118089
+101 1 234 0,401000
+Ces tables s'appliquent aux contrats en cas de décès."""
+
+
+@pytest.fixture
+def store():
+    extractor = TableExtractor('tables_reglementaires.txt')
+    _, tables = extractor.feed(1, MORTALITY_PAGE)
+    return TableStore(tables + extractor.finish())
+
+
+def test_extracted_table_is_keyed_by_its_first_column(store):
+    table, = store.find(identity='TH 00-02')
+    assert table.column_names == ['Âge', 'lx', 'qx']
+    assert table.has_key
+    assert table.value('lx', 65) == 72193
+
+
+def test_value_question_is_answered_directly(store):
+    result = store.lookup("Quel est le qx à 65 ans de la table TH00-02 ?")
+    assert result['column'] == 'qx' and result['key'] == 65
+    assert result['value'] == pytest.approx(0.108338)
+    assert result['direct']
+    assert result['row'] == {'Âge': 65, 'lx': 72193, 'qx': pytest.approx(0.108338)}
+
+
+def test_reasoning_question_only_gets_the_row_as_context(store):
+    result = store.lookup("Pourquoi le qx à 65 ans de la table TH00-02 est-il plus élevé qu'à 64 ans ?")
+    assert result is not None and result['value'] == pytest.approx(0.108338)
+    assert not result['direct']
+
+
+def test_unlabelled_numbers_never_give_a_direct_answer(store):
+    # « article 101 en 2023 »: 101 est aussi une ligne de la table, mais n'est pas désigné comme âge
+    result = store.lookup("Quel est le qx par âge de la table TH00-02 selon l'article 101 en 2023 ?")
+    assert result is not None and result['key'] == 101
+    assert not result['direct']
+    # Clé désignée par le nom de la colonne clé
+    assert store.lookup("Quel est le qx de la table TH00-02 pour l'âge 101 ?")['direct']
+
+
+def test_labelled_key_without_row_does_not_fall_back_to_other_numbers(store):
+    assert store.lookup("Quel est le qx à 30 ans de la table TH00-02 selon l'article 65 ?") is None
+
+
+def test_unknown_table_or_key_is_not_looked_up(store):
+    assert store.lookup("qx à 65 ans table TF00-02") is None
+    assert store.lookup("qx à 30 ans table TH00-02") is None
+
+
+def test_with_documents_replaces_the_tables_of_a_reingested_document(store):
+    assert len(store.with_documents({'tables_reglementaires.txt': []})) == 0
+    assert len(store) == 1
@@ -0,0 +1,61 @@
+# backend/tests/test_token_chunker.py
+import re
+import numpy as np
+from chunk_store import ColumnarChunkStore
+from token_chunker import TokenChunker, fit_chunk_store
+
+_TOKEN_RE = re.compile(r'\w+|[^\w\s]')
+
+
+def count_tokens(texts):
+    """Tokenizer de test: un token par mot et par signe de ponctuation"""
+    return np.array([len(_TOKEN_RE.findall(text)) for text in texts], dtype=np.int64)
+
+
+def regulation_text():
+    articles = []
+    for number in range(1, 9):
+        sentences = [f"Le paragraphe {i} de l'article {number} précise le calcul du capital requis." for i in range(6)]
+        articles.append(f"Article {number}\n" + ' '.join(sentences))
+    # Une phrase sans ponctuation plus longue que la limite du modèle
+    articles.append("Annexe 1\n" + ' '.join(f"mot{i}" for i in range(300)))
+    return '\n\n'.join(articles)
+
+
+def test_no_chunk_exceeds_max_tokens():
+    text = regulation_text()
+    for max_tokens in (16, 40, 128):
+        chunker = TokenChunker(count_tokens, max_tokens, overlap_tokens=8)
+        chunks = chunker.split(text)
+        assert chunks
+        assert count_tokens([chunk for _, chunk in chunks]).max() <= max_tokens
+        # Chaque chunk est un extrait exact du texte, à la position annoncée
+        assert all(text[start:start + len(chunk)] == chunk for start, chunk in chunks)
+
+
+def test_chunks_end_on_sentences_and_restart_at_articles():
+    chunker = TokenChunker(count_tokens, 64, overlap_tokens=20)
+    chunks = [chunk for _, chunk in chunker.split(regulation_text())]
+    assert sum(chunk.startswith('Article ') for chunk in chunks) == 8
+    assert all(chunk.endswith('.') for chunk in chunks if not chunk.startswith('Annexe') and 'mot' not in chunk)
+    # Recouvrement au sein d'une section: le chunk suivant reprend la dernière phrase du précédent
+    article_chunks = [chunk for chunk in chunks if 'article 1 ' in chunk]
+    assert len(article_chunks) >= 2
+    assert article_chunks[0].rsplit('. ', 1)[-1] in article_chunks[1]
+
+
+def test_fit_chunk_store_splits_only_oversized_chunks():
+    store = ColumnarChunkStore.from_chunks([
+        {'chunk': "Court.", 'metadata': {'source': 'a.txt'}},
+        {'chunk': regulation_text(), 'metadata': {'source': 'b.txt', 'page': 2}},
+        {'chunk': "Fin.", 'metadata': {'source': 'c.txt'}},
+    ])
+    chunker = TokenChunker(count_tokens, 64)
+    fitted, report = fit_chunk_store(store, chunker)
+    assert report['oversized_chunks'] == 1
+    assert report['chunks_after'] == len(fitted) > 3
+    assert fitted.text(0) == "Court." and fitted.text(len(fitted) - 1) == "Fin."
+    assert all(fitted.metadata(chunk_id) == {'source': 'b.txt', 'page': 2} for chunk_id in range(1, len(fitted) - 1))
+    assert count_tokens(fitted.iter_texts()).max() <= 64
+    assert fit_chunk_store(fitted, chunker) == (None, {'chunks': len(fitted), 'oversized_chunks': 0,
+                                                       'chunks_after': len(fitted)})
@@ -0,0 +1,86 @@
+# backend/tests/test_vector_store.py
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+pytest.importorskip('faiss')
+from vector_store import FAISS_SELECTORS_AVAILABLE, VectorStore, attach_vector_store
+
+
+@pytest.fixture
+def store():
+    embeddings = np.eye(4, dtype=np.float32)[[0, 1, 2, 3, 0]]
+    return VectorStore.build(embeddings, [10, 11, 12, 13, 14], dimension=4)
+
+
+def test_embeddings_are_a_view_on_the_index_storage(store):
+    assert len(store) == 5
+    assert np.array_equal(store.embeddings[4], [1, 0, 0, 0])
+    assert not store.embeddings.flags['OWNDATA']
+    assert list(store.rows_of([12, 99, 10])) == [2, -1, 0]
+
+
+def test_search_returns_rows_and_honours_row_selectors(store):
+    scores, rows = store.search(np.array([1, 0.5, 0, 0]), top_k=2)
+    assert sorted(rows[0]) == [0, 4]
+    assert set(store.chunk_ids[rows[0]]) == {10, 14}
+    if not FAISS_SELECTORS_AVAILABLE:
+        pytest.skip('faiss sans IDSelectorBitmap')
+    selector = store.selector('no_first', [1, 2, 3, 4])
+    assert store.selector('no_first', []) is selector
+    _, rows = store.search(np.array([1, 0.5, 0, 0]), top_k=2, selector=selector)
+    assert list(rows[0]) == [4, 1]
+
+
+def test_appended_rows_form_a_segment_and_leave_the_base_unchanged(store):
+    extended = store.appended(np.eye(4, dtype=np.float32)[[1, 2]], [15, 16])
+    assert len(store) == 5 and len(store.segments) == 1
+    assert len(extended) == 7
+    assert extended.segments[0] is store.segments[0]
+    assert [list(segment.rows) for segment in extended.segments] == [[0, 1, 2, 3, 4], [5, 6]]
+    assert np.array_equal(extended.vectors([6, 0]), np.eye(4)[[2, 0]])
+    # Segments de même taille fusionnés: leur nombre reste logarithmique
+    twice = extended.appended(np.eye(4, dtype=np.float32)[[3, 3]], [17, 18])
+    assert [len(segment) for segment in twice.segments] == [5, 4]
+    _, rows = twice.search(np.array([0, 0, 1, 0]), top_k=2)
+    assert sorted(twice.chunk_ids[rows[0]]) == [12, 16]
+
+
+def test_removed_rows_are_never_returned(store):
+    removed = store.without_rows([0, 4])
+    assert removed.segments[0] is store.segments[0]
+    assert removed.live_count == 3 and store.removed is None
+    _, rows = removed.search(np.array([1, 0.5, 0, 0]), top_k=5)
+    assert list(rows[0])[0] == 1
+    assert not {0, 4} & set(rows[0])
+    assert removed.report()['removed_vectors'] == 2
+
+
+def test_partitioned_rows_are_searched_in_their_own_segments(store):
+    partitioned = store.partitioned([0, 1, 4], ['regulation', 'risk_management', 'regulation'])
+    assert list(partitioned.partition_rows('regulation')) == [0, 4]
+    assert list(partitioned.partition_rows('risk_management')) == [1]
+    # Lignes non partitionnées: segment d'origine réécrit sans les lignes déplacées
+    assert sorted(len(segment) for segment in partitioned.segments) == [1, 2, 2]
+    assert np.array_equal(partitioned.embeddings, store.embeddings)
+    _, rows = partitioned.search(np.array([1, 1, 1, 1]), top_k=5, partitions={'regulation'})
+    assert sorted(rows[0]) == [0, 4]
+    _, rows = partitioned.without_rows([4]).search(np.array([1, 0, 0, 0]), top_k=5, partitions={'regulation'})
+    assert list(rows[0]) == [0]
+
+
+def test_saved_store_keeps_removed_rows(store, tmp_path):
+    store.appended(np.eye(4, dtype=np.float32)[[1]], [15]).without_rows([1]).save(str(tmp_path))
+    loaded = VectorStore.load(str(tmp_path))
+    assert list(loaded.chunk_ids) == [10, 11, 12, 13, 14, 15]
+    assert list(np.flatnonzero(loaded.removed)) == [1]
+    assert np.array_equal(loaded.embeddings[5], [0, 1, 0, 0])
+
+
+def test_empty_store_and_knowledge_base_attachment():
+    empty = VectorStore.build(np.zeros((0, 4)), [], dimension=4)
+    scores, rows = empty.search(np.ones(4), top_k=3)
+    assert rows.shape == (1, 0)
+    knowledge_base = SimpleNamespace(index=object())
+    assert attach_vector_store(knowledge_base, empty) is empty
+    assert knowledge_base.vector_store is empty and knowledge_base.index is None
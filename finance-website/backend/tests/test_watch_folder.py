@@ -0,0 +1,53 @@
+# backend/tests/test_watch_folder.py
+from watch_folder import FolderWatcher
+
+
+class Clock:
+    """Horloge monotone pilotée par le test"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_watcher(tmp_path, monkeypatch, **options):
+    clock = Clock()
+    monkeypatch.setattr('watch_folder.time.monotonic', clock)
+    watcher = FolderWatcher([str(tmp_path)], lambda changed, deleted: None, extensions=('.txt', '.pdf'),
+                            use_watchdog=False, **options)
+    return watcher, clock
+
+
+def test_batch_waits_for_the_debounce_quiet_period(tmp_path, monkeypatch):
+    watcher, clock = make_watcher(tmp_path, monkeypatch, debounce=3.0, max_delay=60.0)
+    assert watcher._take_batch() is None
+    watcher.record(str(tmp_path / 'a.txt'))
+    clock.now += 2.0
+    watcher.record(str(tmp_path / 'b.txt'))
+    # Calme depuis 2 s seulement après le dernier événement
+    clock.now += 2.0
+    assert watcher._take_batch() is None
+    clock.now += 1.5
+    assert watcher._take_batch() == {str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')}
+    assert watcher._take_batch() is None
+
+
+def test_batch_is_released_after_max_delay_despite_continuous_events(tmp_path, monkeypatch):
+    watcher, clock = make_watcher(tmp_path, monkeypatch, debounce=3.0, max_delay=10.0)
+    for second in range(12):
+        watcher.record(str(tmp_path / f'{second}.txt'))
+        if second < 10:
+            assert watcher._take_batch() is None
+        clock.now += 1.0
+    batch = watcher._take_batch()
+    assert batch is not None and len(batch) == 12
+
+
+def test_ignored_files_are_not_batched(tmp_path, monkeypatch):
+    watcher, clock = make_watcher(tmp_path, monkeypatch, debounce=1.0)
+    for name in ('.cache.txt', '~$rapport.txt', 'copie.txt.part', 'image.png'):
+        watcher.record(str(tmp_path / name))
+    clock.now += 5.0
+    assert watcher._take_batch() is None
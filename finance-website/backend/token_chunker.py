@@ -0,0 +1,169 @@
+# backend/token_chunker.py
+import re
+import numpy as np
+from chunk_store import ChunkStoreWriter
+
+# Séparateurs de phrases: espaces après une ponctuation finale, fins de ligne
+SENTENCE_BOUNDARY_RE = re.compile(r'(?<=[.!?;:])\s+|\n+')
+# En-têtes ouvrant une section (article de loi, chapitre, numérotation 1.2.3)
+SECTION_HEADING_RE = re.compile(
+    r'(?:article|section|chapitre|chapter|titre|title|annexe|annex|partie|part)\s+[\dIVXLC]+\b|\d+(?:\.\d+)+\s',
+    re.IGNORECASE
+)
+_WORD_RE = re.compile(r'\S+')
+
+
+class TokenChunker:
+    """Chunks d'au plus max_tokens tokens du tokenizer de l'embedder, coupés en fin de phrase
+
+    Le texte est segmenté en phrases dont les tokens sont comptés par lots (un seul passage du
+    tokenizer par section), puis les phrases sont regroupées jusqu'à la limite du modèle: aucun
+    texte stocké n'est tronqué à l'encodage. Un nouveau chunk commence à chaque début de section
+    (ligne vide, en-tête d'article) dès que le chunk courant est suffisamment rempli; au sein d'une
+    section, chaque chunk reprend les dernières phrases du précédent (overlap_tokens).
+    """
+
+    def __init__(self, count_tokens, max_tokens, overlap_tokens=32, min_fill=0.25):
+        # count_tokens(textes) -> np.ndarray du nombre de tokens de chaque texte
+        self.count_tokens = count_tokens
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.min_fill = min_fill
+
+    @classmethod
+    def from_embedder(cls, embedder, overlap_tokens=32, min_fill=0.25):
+        """Chunker aligné sur les modèles de l'embedder (None si l'embedder n'a pas de tokenizer)"""
+        if not hasattr(embedder, 'count_tokens'):
+            return None
+        return cls(embedder.count_tokens, embedder.max_tokens, overlap_tokens, min_fill)
+
+    def sentences(self, text):
+        """Phrases du texte: [(début, fin, ouvre une section)]"""
+        units = []
+        start = previous_end = 0
+        boundaries = [(match.start(), match.end()) for match in SENTENCE_BOUNDARY_RE.finditer(text)]
+        for end, next_start in boundaries + [(len(text), len(text))]:
+            if text[start:end].strip():
+                opens_section = bool(units) and (
+                    '\n\n' in text[previous_end:start] or SECTION_HEADING_RE.match(text, start) is not None
+                )
+                units.append((start, end, opens_section))
+                previous_end = end
+            start = next_start
+        return units
+
+    def _split_unit(self, text, unit, count):
+        """Découpe par mots une phrase trop longue (proportionnellement à son nombre de tokens)"""
+        start, end, opens_section = unit
+        words = [match.span() for match in _WORD_RE.finditer(text, start, end)]
+        if len(words) < 2:
+            # Un seul « mot » (tableau, URL): coupe au milieu
+            middle = (start + end) // 2
+            return [(start, middle, opens_section), (middle, end, False)]
+        per_piece = max(1, int(len(words) * 0.9 * self.max_tokens / count))
+        return [
+            (words[first][0], words[min(first + per_piece, len(words)) - 1][1], opens_section and first == 0)
+            for first in range(0, len(words), per_piece)
+        ]
+
+    def _fit_units(self, text, units):
+        """Phrases comptées [(début, fin, ouvre une section, tokens)], chacune dans la limite du modèle"""
+        counts = self.count_tokens([text[start:end] for start, end, _ in units])
+        pending = [unit + (int(count),) for unit, count in zip(units, counts)]
+        while any(unit[3] > self.max_tokens for unit in pending):
+            splits = [
+                self._split_unit(text, unit[:3], unit[3]) if unit[3] > self.max_tokens else None
+                for unit in pending
+            ]
+            pieces = [piece for split in splits if split for piece in split]
+            piece_counts = iter(self.count_tokens([text[start:end] for start, end, _ in pieces]).tolist())
+            fitted = []
+            for unit, split in zip(pending, splits):
+                if split is None:
+                    fitted.append(unit)
+                else:
+                    fitted.extend(piece + (next(piece_counts),) for piece in split)
+            pending = fitted
+        return pending
+
+    def _pack(self, units):
+        """Regroupe les phrases: [(première, dernière)] indices des phrases de chaque chunk"""
+        chunks = []
+        current, tokens = [], 0
+        for index, (_, _, opens_section, count) in enumerate(units):
+            section_break = opens_section and tokens >= self.min_fill * self.max_tokens
+            if current and (section_break or tokens + count > self.max_tokens):
+                chunks.append((current[0], current[-1]))
+                overlap, overlap_tokens = [], 0
+                if not section_break:
+                    for previous in reversed(current):
+                        previous_count = units[previous][3]
+                        if overlap_tokens + previous_count > min(self.overlap_tokens, self.max_tokens - count):
+                            break
+                        overlap.insert(0, previous)
+                        overlap_tokens += previous_count
+                current, tokens = overlap, overlap_tokens
+            current.append(index)
+            tokens += count
+        if current:
+            chunks.append((current[0], current[-1]))
+        return chunks
+
+    def split(self, text):
+        """Chunks du texte: [(position de début, texte du chunk)]"""
+        units = self.sentences(text)
+        if not units:
+            return []
+        units = self._fit_units(text, units)
+        chunks = self._pack(units)
+        # Vérification sur le texte assemblé (espaces et jonctions entre phrases)
+        while True:
+            counts = self.count_tokens([text[units[first][0]:units[last][1]] for first, last in chunks])
+            overflowing = np.flatnonzero(counts > self.max_tokens)
+            if not len(overflowing):
+                break
+            overflowing = set(overflowing.tolist())
+            repacked = []
+            for position, (first, last) in enumerate(chunks):
+                if position in overflowing and last > first:
+                    middle = (first + last) // 2
+                    repacked.extend([(first, middle), (middle + 1, last)])
+                else:
+                    repacked.append((first, last))
+            if repacked == chunks:
+                break
+            chunks = repacked
+        return [(units[first][0], text[units[first][0]:units[last][1]]) for first, last in chunks]
+
+
+def fit_chunk_store(chunk_store, chunker, batch_size=512):
+    """Redécoupe les chunks plus longs que la limite du modèle: (nouveau store ou None, rapport)
+
+    Réservé à une base dont les identifiants de chunks ne sont encore référencés par aucun index
+    ni manifeste (base héritée chargée telle quelle): les chunks suivants sont renumérotés. Les
+    morceaux d'un chunk redécoupé gardent ses métadonnées.
+    """
+    report = {'chunks': len(chunk_store), 'oversized_chunks': 0, 'chunks_after': len(chunk_store)}
+    oversized = []
+    for first in range(0, len(chunk_store), batch_size):
+        chunk_ids = range(first, min(first + batch_size, len(chunk_store)))
+        counts = chunker.count_tokens([chunk_store.text(chunk_id) for chunk_id in chunk_ids])
+        oversized.extend(first + int(position) for position in np.flatnonzero(counts > chunker.max_tokens))
+    if not oversized:
+        return None, report
+
+    writer = ChunkStoreWriter()
+    oversized = set(oversized)
+    batch = []
+    for chunk_id in range(len(chunk_store)):
+        chunk = chunk_store.chunk(chunk_id)
+        if chunk_id in oversized:
+            batch.extend(dict(chunk, chunk=text) for _, text in chunker.split(chunk['chunk']))
+        else:
+            batch.append(chunk)
+        if len(batch) >= batch_size:
+            writer.add(batch)
+            batch = []
+    writer.add(batch)
+    report.update(oversized_chunks=len(oversized), chunks_after=len(writer))
+    return writer.finish(), report
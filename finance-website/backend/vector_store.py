@@ -0,0 +1,371 @@
+# backend/vector_store.py
+import os
+import faiss
+import numpy as np
+
+# Recherche restreinte à un sous-ensemble de lignes sans copier les vecteurs (faiss >= 1.7.3)
+FAISS_SELECTORS_AVAILABLE = hasattr(faiss, 'SearchParameters') and hasattr(faiss, 'IDSelectorBitmap')
+
+
+class SegmentFilter:
+    """Positions d'un segment à garder: filtre FAISS (bitmap référencé) ou masque si faiss n'a pas de sélecteurs"""
+
+    def __init__(self, mask):
+        self.mask = mask
+        self.params = None
+        if FAISS_SELECTORS_AVAILABLE:
+            self.bitmap = np.packbits(mask, bitorder='little')
+            self.params = faiss.SearchParameters(sel=faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(self.bitmap)))
+
+
+class RowSelector:
+    """Masque de lignes utilisable comme filtre de recherche FAISS (traduit segment par segment)"""
+
+    def __init__(self, rows, total_rows):
+        self.mask = np.zeros(total_rows, dtype=bool)
+        self.mask[rows] = True
+        self.segments = {}  # segment du store -> SegmentFilter (False si aucune ligne du segment)
+
+
+class VectorSegment:
+    """Groupe de lignes du store dans son propre index FAISS plat (position locale -> ligne du store)"""
+
+    def __init__(self, index, rows, partition=None):
+        self.index = index
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.partition = partition
+
+    def __len__(self):
+        return self.index.ntotal
+
+    @property
+    def vectors(self):
+        """Vue (lignes x dimension) sur les vecteurs stockés par l'index"""
+        if not self.index.ntotal:
+            return np.zeros((0, self.index.d), dtype=np.float32)
+        return faiss.rev_swig_ptr(self.index.get_xb(), self.index.ntotal * self.index.d).reshape(
+            self.index.ntotal, self.index.d
+        )
+
+    @classmethod
+    def merged(cls, segments, dimension):
+        """Segment unique regroupant les vecteurs des segments donnés (copiés une fois)"""
+        index = faiss.IndexFlatIP(dimension)
+        for segment in segments:
+            if len(segment):
+                index.add(segment.vectors)
+        return cls(index, np.concatenate([segment.rows for segment in segments]), segments[0].partition)
+
+
+class VectorStore:
+    """Unique copie des embeddings des chunks: segments FAISS plats, ligne -> identifiant du chunk
+
+    Les lignes ajoutées forment un nouveau segment: les segments existants sont partagés entre les
+    versions successives du store, jamais recopiés à l'ajout. Les segments d'une même partition sont
+    fusionnés tant que le dernier n'est pas plus grand que le nouveau (chaque vecteur n'est recopié
+    qu'un nombre logarithmique de fois, le nombre de segments reste logarithmique). Les segments
+    d'une partition de domaine (partitioned) forment un index inversé par partition. Les lignes
+    retirées (chunks supprimés) restent en place et sont exclues des recherches.
+    """
+
+    VECTORS_FILE = 'vectors.npy'
+    CHUNK_IDS_FILE = 'vector_chunk_ids.npy'
+    REMOVED_FILE = 'vector_removed.npy'
+
+    def __init__(self, segments, chunk_ids, dimension, removed=None):
+        self.segments = list(segments)
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        self.dimension = dimension
+        self.removed = removed  # masque des lignes retirées, ou None
+        self._searchable = {}   # segment -> SegmentFilter excluant les lignes retirées
+        self._selectors = {}
+
+        # Ligne du store -> (segment, position dans le segment)
+        self.segment_of = np.zeros(len(self.chunk_ids), dtype=np.int32)
+        self.local_of = np.zeros(len(self.chunk_ids), dtype=np.int64)
+        for number, segment in enumerate(self.segments):
+            self.segment_of[segment.rows] = number
+            self.local_of[segment.rows] = np.arange(len(segment.rows))
+        self._sorted_ids = bool(len(self.chunk_ids) < 2 or np.all(np.diff(self.chunk_ids) > 0))
+
+    @classmethod
+    def build(cls, embeddings, chunk_ids, dimension):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(-1, dimension)
+        index = faiss.IndexFlatIP(dimension)
+        if len(embeddings):
+            index.add(np.ascontiguousarray(embeddings))
+        return cls([VectorSegment(index, np.arange(len(embeddings)))], chunk_ids, dimension)
+
+    def __len__(self):
+        return len(self.chunk_ids)
+
+    @property
+    def shape(self):
+        return len(self.chunk_ids), self.dimension
+
+    @property
+    def live_count(self):
+        return len(self) - (int(self.removed.sum()) if self.removed is not None else 0)
+
+    def vectors(self, rows):
+        """Vecteurs des lignes données (copie, dans l'ordre des lignes)"""
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        if len(self.segments) == 1:
+            return self.segments[0].vectors[self.local_of[rows]]
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        segment_of = self.segment_of[rows]
+        for number in np.unique(segment_of):
+            selected = segment_of == number
+            vectors[selected] = self.segments[number].vectors[self.local_of[rows[selected]]]
+        return vectors
+
+    def __getitem__(self, rows):
+        return self.vectors(rows)
+
+    @property
+    def embeddings(self):
+        """Tous les vecteurs dans l'ordre des lignes (vue sans copie si un seul segment les couvre dans
+        l'ordre, copie sinon: réservé aux reconstructions complètes et à l'export)"""
+        if len(self.segments) == 1 and np.array_equal(self.segments[0].rows, np.arange(len(self))):
+            return self.segments[0].vectors
+        return self.vectors(np.arange(len(self)))
+
+    def rows_of(self, chunk_ids):
+        """Ligne de chaque chunk dans le store (-1 si le chunk n'a pas de vecteur)"""
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        rows = np.full(len(chunk_ids), -1, dtype=np.int64)
+        if not len(self.chunk_ids) or not len(chunk_ids):
+            return rows
+        order = None if self._sorted_ids else np.argsort(self.chunk_ids, kind='stable')
+        positions = np.minimum(np.searchsorted(self.chunk_ids, chunk_ids, sorter=order), len(self.chunk_ids) - 1)
+        if order is not None:
+            positions = order[positions]
+        found = self.chunk_ids[positions] == chunk_ids
+        rows[found] = positions[found]
+        return rows
+
+    def _merged_into(self, segments, segment):
+        """Segments avec le nouveau segment ajouté; les derniers segments de sa partition sont fusionnés
+        avec lui tant qu'ils ne sont pas plus grands"""
+        segments = [other for other in segments if len(other)]
+        merge = []
+        while True:
+            same = [number for number, other in enumerate(segments) if other.partition == segment.partition]
+            if not same or len(segments[same[-1]]) > len(segment) + sum(len(other) for other in merge):
+                break
+            merge.insert(0, segments.pop(same[-1]))
+        if merge:
+            segment = VectorSegment.merged(merge + [segment], self.dimension)
+        return segments + [segment]
+
+    def appended(self, vectors, chunk_ids, partition=None):
+        """Nouveau store: ces lignes suivies des vecteurs donnés (tableau ou index FAISS plat déjà rempli);
+        ce store, éventuellement servi, reste inchangé"""
+        if isinstance(vectors, faiss.Index):
+            index = vectors
+        else:
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimension)
+            index = faiss.IndexFlatIP(self.dimension)
+            if len(vectors):
+                index.add(np.ascontiguousarray(vectors))
+        if not index.ntotal:
+            return self
+        segment = VectorSegment(index, np.arange(len(self), len(self) + index.ntotal), partition)
+        segments = self._merged_into(self.segments, segment)
+
+        removed = self.removed
+        if removed is not None:
+            removed = np.concatenate([removed, np.zeros(index.ntotal, dtype=bool)])
+        chunk_ids = np.concatenate([self.chunk_ids, np.asarray(chunk_ids, dtype=np.int64)])
+        return VectorStore(segments, chunk_ids, self.dimension, removed)
+
+    def partitioned(self, rows, partitions):
+        """Nouveau store où les lignes données sont regroupées en segments par partition (un libellé par
+        ligne): une recherche limitée à des partitions ne parcourt que leurs segments. Seuls les
+        segments contenant ces lignes sont réécrits"""
+        rows = np.asarray(rows, dtype=np.int64)
+        partitions = np.array([str(partition) for partition in partitions], dtype=object)
+        if not len(rows):
+            return self
+        moved = np.zeros(len(self), dtype=bool)
+        moved[rows] = True
+
+        touched = set(np.unique(self.segment_of[rows]).tolist())
+        segments = []
+        for number, segment in enumerate(self.segments):
+            kept = ~moved[segment.rows] if number in touched else None
+            if kept is None:
+                segments.append(segment)
+            elif kept.any():
+                index = faiss.IndexFlatIP(self.dimension)
+                index.add(np.ascontiguousarray(segment.vectors[kept]))
+                segments.append(VectorSegment(index, segment.rows[kept], segment.partition))
+
+        for partition in sorted(set(partitions)):
+            selected = rows[partitions == partition]
+            index = faiss.IndexFlatIP(self.dimension)
+            index.add(self.vectors(selected))
+            segments = self._merged_into(segments, VectorSegment(index, selected, partition))
+        return VectorStore(segments, self.chunk_ids, self.dimension, self.removed)
+
+    def partition_rows(self, partition):
+        """Lignes rangées dans les segments de la partition"""
+        rows = [segment.rows for segment in self.segments if segment.partition == partition]
+        return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.int64)
+
+    def extended(self, embeddings, chunk_ids):
+        """Nouveau store: ces vecteurs suivis des vecteurs donnés (ce store reste inchangé)"""
+        return self.appended(embeddings, chunk_ids)
+
+    def without_rows(self, rows):
+        """Nouveau store dont les lignes données sont exclues des recherches (segments partagés)"""
+        removed = np.zeros(len(self), dtype=bool) if self.removed is None else self.removed.copy()
+        removed[np.asarray(rows, dtype=np.int64)] = True
+        return VectorStore(self.segments, self.chunk_ids, self.dimension, removed)
+
+    def selector(self, key, rows):
+        """Filtre de recherche (mis en cache sous key) limité aux lignes données"""
+        if key not in self._selectors:
+            self._selectors[key] = RowSelector(rows, len(self))
+        return self._selectors[key]
+
+    def _segment_filter(self, number, selector):
+        """Filtre du segment (None: rien à filtrer, False: aucune ligne à garder)"""
+        segment = self.segments[number]
+        if selector is None:
+            if self.removed is None:
+                return None
+            if number not in self._searchable:
+                keep = ~self.removed[segment.rows]
+                self._searchable[number] = SegmentFilter(keep) if not keep.all() else None
+            return self._searchable[number]
+        if number not in selector.segments:
+            keep = selector.mask[segment.rows]
+            if self.removed is not None:
+                keep &= ~self.removed[segment.rows]
+            selector.segments[number] = SegmentFilter(keep) if keep.any() else False
+        return selector.segments[number]
+
+    def search(self, query_embedding, top_k, selector=None, partitions=None):
+        """Produit scalaire exact sur les segments (ceux des partitions données si fournies), fusion des
+        meilleurs scores; retourne (scores, lignes) au format FAISS, une ligne par requête"""
+        queries = np.ascontiguousarray(np.asarray(query_embedding, dtype=np.float32).reshape(-1, self.dimension))
+        all_scores, all_rows = [], []
+        for number, segment in enumerate(self.segments):
+            if not len(segment) or (partitions is not None and segment.partition not in partitions):
+                continue
+            segment_filter = self._segment_filter(number, selector)
+            if segment_filter is False:
+                continue
+            k = min(top_k, len(segment))
+            if segment_filter is None:
+                scores, positions = segment.index.search(queries, k)
+            elif segment_filter.params is not None:
+                scores, positions = segment.index.search(queries, k, params=segment_filter.params)
+            else:
+                # faiss sans sélecteurs: tout le segment est parcouru puis filtré
+                scores, positions = segment.index.search(queries, len(segment))
+                keep = segment_filter.mask[np.maximum(positions, 0)] & (positions >= 0)
+                order = np.argsort(~keep, axis=1, kind='stable')[:, :k]
+                scores = np.take_along_axis(scores, order, axis=1)
+                positions = np.take_along_axis(np.where(keep, positions, -1), order, axis=1)
+            all_scores.append(np.where(positions >= 0, scores, -np.inf))
+            all_rows.append(np.where(positions >= 0, segment.rows[np.maximum(positions, 0)], -1))
+
+        if not all_scores:
+            return np.zeros((len(queries), 0), dtype=np.float32), np.zeros((len(queries), 0), dtype=np.int64)
+        scores = np.concatenate(all_scores, axis=1)
+        rows = np.concatenate(all_rows, axis=1)
+        if len(all_scores) > 1:
+            order = np.argsort(-scores, axis=1, kind='stable')[:, :top_k]
+            scores = np.take_along_axis(scores, order, axis=1)
+            rows = np.take_along_axis(rows, order, axis=1)
+        # Positions sans résultat (lignes filtrées) retirées en fin de liste
+        found = int((rows >= 0).sum(axis=1).max()) if rows.size else 0
+        return scores[:, :found].astype(np.float32), rows[:, :found]
+
+    def nbytes(self):
+        return int(sum(len(segment) for segment in self.segments) * self.dimension * 4
+                   + self.chunk_ids.nbytes + self.segment_of.nbytes + self.local_of.nbytes)
+
+    # ------------------------------------------------------------------
+    # Persistance (.npy, memory-mappable)
+    # ------------------------------------------------------------------
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, self.VECTORS_FILE), self.embeddings)
+        np.save(os.path.join(directory, self.CHUNK_IDS_FILE), self.chunk_ids)
+        if self.removed is not None and self.removed.any():
+            np.save(os.path.join(directory, self.REMOVED_FILE), np.flatnonzero(self.removed))
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """Charge un store sauvegardé: vecteurs lus en memory-map puis copiés d'un bloc dans l'index
+        (aucun réencodage)"""
+        mmap_mode = 'r' if mmap else None
+        embeddings = np.load(os.path.join(directory, cls.VECTORS_FILE), mmap_mode=mmap_mode)
+        chunk_ids = np.load(os.path.join(directory, cls.CHUNK_IDS_FILE))
+        store = cls.build(embeddings, chunk_ids, embeddings.shape[1])
+        removed_path = os.path.join(directory, cls.REMOVED_FILE)
+        if os.path.exists(removed_path):
+            store = store.without_rows(np.load(removed_path))
+        return store
+
+    def report(self):
+        return {
+            'vectors': int(len(self)),
+            'removed_vectors': int(len(self) - self.live_count),
+            'segments': len(self.segments),
+            'partitions': sorted({str(segment.partition) for segment in self.segments if segment.partition is not None}),
+            'dimension': int(self.dimension),
+            'bytes': self.nbytes(),
+            'row_selectors': FAISS_SELECTORS_AVAILABLE
+        }
+
+
+class VectorStoreWriter:
+    """Construction d'un store par lots: les vecteurs sont ajoutés à un index FAISS dès réception
+
+    Avec un store de base, les lots forment un nouveau segment ajouté à la base par finish(): les
+    vecteurs de la base ne sont pas recopiés et la base reste inchangée.
+    """
+
+    def __init__(self, base=None, dimension=None):
+        self.base = base
+        self.index = None
+        self._chunk_ids = []
+        if base is not None:
+            self.index = faiss.IndexFlatIP(base.dimension)
+        elif dimension is not None:
+            self.index = faiss.IndexFlatIP(dimension)
+
+    def __len__(self):
+        base_count = len(self.base) if self.base is not None else 0
+        return base_count + (self.index.ntotal if self.index is not None else 0)
+
+    def add(self, embeddings, chunk_ids):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if not len(embeddings):
+            return
+        embeddings = embeddings.reshape(len(embeddings), -1)
+        if self.index is None:
+            # Dimension connue au premier lot
+            self.index = faiss.IndexFlatIP(embeddings.shape[1])
+        self.index.add(np.ascontiguousarray(embeddings))
+        self._chunk_ids.append(np.asarray(chunk_ids, dtype=np.int64))
+
+    def finish(self):
+        """Store construit (None si aucun vecteur n'a été ajouté)"""
+        if self.index is None:
+            return None
+        chunk_ids = np.concatenate(self._chunk_ids) if self._chunk_ids else np.zeros(0, dtype=np.int64)
+        if self.base is not None:
+            return self.base.appended(self.index, chunk_ids)
+        return VectorStore([VectorSegment(self.index, np.arange(self.index.ntotal))], chunk_ids, self.index.d)
+
+
+def attach_vector_store(knowledge_base, vector_store):
+    """Rattache le store vectoriel à la base; l'index FAISS propre à la base, redondant, est libéré"""
+    knowledge_base.vector_store = vector_store
+    knowledge_base.index = None
+    return vector_store
@@ -0,0 +1,188 @@
+# backend/watch_folder.py
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    WATCHDOG_AVAILABLE = False
+
+# Fichiers temporaires des éditeurs et des copies en cours
+IGNORED_PREFIXES = ('.', '~$', '~')
+IGNORED_SUFFIXES = ('.tmp', '.part', '.crdownload', '.swp')
+
+
+class _EventHandler(FileSystemEventHandler):
+    """Événements watchdog (inotify sous Linux) transmis au FolderWatcher"""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.watcher.record(event.src_path)
+        # Renommage: l'ancien chemin disparaît, le nouveau apparaît
+        if getattr(event, 'dest_path', None):
+            self.watcher.record(event.dest_path)
+
+
+class FolderWatcher:
+    """Surveille des dossiers et transmet les fichiers modifiés ou supprimés par lots
+
+    Les événements (inotify via watchdog, sinon comparaison périodique des dates et tailles) sont
+    accumulés; un lot est transmis à on_changes(modifiés, supprimés) lorsque les dossiers sont
+    restés calmes pendant debounce secondes (copie d'un fichier terminée, dépôt de plusieurs
+    fichiers regroupé), et au plus tard max_delay secondes après le premier changement. L'état
+    final de chaque fichier fait foi: un fichier supprimé puis recréé est transmis comme modifié.
+    """
+
+    def __init__(self, directories, on_changes, extensions=None, debounce=3.0, max_delay=60.0,
+                 poll_interval=5.0, recursive=True, use_watchdog=True):
+        self.directories = [os.path.abspath(directory) for directory in directories]
+        self.on_changes = on_changes
+        self.extensions = tuple(extensions) if extensions else None
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.recursive = recursive
+        self.backend = 'watchdog' if use_watchdog and WATCHDOG_AVAILABLE else 'polling'
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._first_event = self._last_event = None
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._observer = None
+        self._files = {}  # chemin -> (mtime_ns, taille), mode polling
+        self.stats = {'batches': 0, 'files_changed': 0, 'files_deleted': 0, 'errors': 0,
+                      'last_batch_at': None, 'last_error': None}
+
+    def is_watched(self, path):
+        name = os.path.basename(path)
+        if name.startswith(IGNORED_PREFIXES) or name.lower().endswith(IGNORED_SUFFIXES):
+            return False
+        return self.extensions is None or name.lower().endswith(self.extensions)
+
+    def scan(self):
+        """Fichiers surveillés présents: {chemin: (mtime_ns, taille)}"""
+        files = {}
+        for directory in self.directories:
+            for root, subdirectories, names in os.walk(directory):
+                subdirectories[:] = [name for name in subdirectories if not name.startswith('.')] \
+                    if self.recursive else []
+                for name in names:
+                    path = os.path.join(root, name)
+                    if not self.is_watched(path):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (stat.st_mtime_ns, stat.st_size)
+        return files
+
+    def record(self, path):
+        """Changement sur un fichier (création, modification, suppression): lot différé"""
+        path = os.path.abspath(path)
+        if not self.is_watched(path):
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._pending.add(path)
+            self._first_event = self._first_event or now
+            self._last_event = now
+        self._wakeup.set()
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+    # ------------------------------------------------------------------
+    def start(self, initial_scan=True):
+        """Démarre la surveillance; initial_scan transmet d'abord les fichiers déjà présents"""
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+        self._files = self.scan()
+        if initial_scan:
+            for path in self._files:
+                self.record(path)
+        if self.backend == 'watchdog':
+            self._observer = Observer()
+            for directory in self.directories:
+                self._observer.schedule(_EventHandler(self), directory, recursive=self.recursive)
+            self._observer.start()
+        else:
+            self._start_thread(self._poll, 'watch-folder-poll')
+        self._start_thread(self._flush_loop, 'watch-folder-flush')
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _poll(self):
+        while not self._stopping.wait(self.poll_interval):
+            files = self.scan()
+            for path in set(files) | set(self._files):
+                if files.get(path) != self._files.get(path):
+                    self.record(path)
+            self._files = files
+
+    def _take_batch(self):
+        """Chemins en attente si le lot est prêt (calme depuis debounce ou max_delay atteint)"""
+        with self._lock:
+            if not self._pending:
+                return None
+            now = time.monotonic()
+            if now - self._last_event < self.debounce and now - self._first_event < self.max_delay:
+                return None
+            batch, self._pending = self._pending, set()
+            self._first_event = self._last_event = None
+            return batch
+
+    def _flush_loop(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(min(self.debounce, self.poll_interval) / 2 or 0.1)
+            self._wakeup.clear()
+            batch = self._take_batch()
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        """Transmet un lot: fichiers présents (modifiés) et disparus (supprimés)"""
+        changed = sorted(path for path in batch if os.path.exists(path))
+        deleted = sorted(path for path in batch if not os.path.exists(path))
+        try:
+            self.on_changes(changed, deleted)
+        except Exception as e:
+            traceback.print_exc()
+            self.stats['errors'] += 1
+            self.stats['last_error'] = str(e)
+            # Lot remis en attente: nouvelle tentative après debounce
+            for path in batch:
+                self.record(path)
+            return
+        self.stats['batches'] += 1
+        self.stats['files_changed'] += len(changed)
+        self.stats['files_deleted'] += len(deleted)
+        self.stats['last_batch_at'] = datetime.now().isoformat()
+
+    def report(self):
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self.stats, directories=self.directories, backend=self.backend, pending=pending,
+                    debounce_seconds=self.debounce)